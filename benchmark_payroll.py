@@ -0,0 +1,79 @@
+"""
+Compare the vectorized summary figures (payroll.PayrollEngine) with the
+per-worker path (excel_export.compute_summary_values) on a real database.
+
+Usage: python benchmark_payroll.py [--db stundenliste.db]
+       [--master-db master_data.db] [--year 2025] [--month 1 ...]
+"""
+
+import argparse
+import time
+
+from database import Database
+from excel_export import compute_summary_values
+from master_data import MasterDataCache
+from payroll import PayrollEngine
+
+
+def person_lookup_for_month(master_db, aggregates):
+    """person_lookup as build_workbook_top_to_bottom prepares it."""
+    person_lookup = {p["name"]: p for p in master_db.get_all_names()}
+    for name in master_db.get_all_names_list():
+        person_lookup[name]["aggregates"] = aggregates.for_name(name)
+    return person_lookup
+
+
+def benchmark_month(db, master_db, year, month, repeat):
+    names = master_db.get_all_names_list()
+    snapshot = db.load_month_snapshot(year, month)
+    aggregates = db.load_monthly_aggregates(year, month)
+    person_lookup = person_lookup_for_month(master_db, aggregates)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scalar = {
+            name: compute_summary_values(
+                name, person_lookup[name], year, month, master_db, db
+            )
+            for name in names
+        }
+    scalar_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        vectorized = PayrollEngine(
+            year, month, snapshot, master_db, person_lookup, names, aggregates
+        ).compute()
+    vectorized_time = (time.perf_counter() - start) / repeat
+
+    mismatches = [name for name in names if scalar[name] != vectorized[name]]
+    for name in mismatches:
+        print(f"  {name}: {scalar[name]} != {vectorized[name]}")
+    print(
+        f"{year}-{month:02d}: {len(names)} Mitarbeiter, "
+        f"einzeln {scalar_time * 1000:.1f} ms, "
+        f"vektorisiert {vectorized_time * 1000:.1f} ms, "
+        f"{'OK' if not mismatches else f'{len(mismatches)} Abweichungen'}"
+    )
+    return not mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default="stundenliste.db")
+    parser.add_argument("--master-db", default="master_data.db")
+    parser.add_argument("--year", type=int, default=time.localtime().tm_year)
+    parser.add_argument("--month", type=int, nargs="*", default=list(range(1, 13)))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    master_db = MasterDataCache(args.master_db)
+    db = Database(args.db, master_db=master_db)
+    ok = True
+    for month in args.month:
+        ok = benchmark_month(db, master_db, args.year, month, args.repeat) and ok
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
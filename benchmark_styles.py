@@ -0,0 +1,97 @@
+"""
+Per-cell cost of styling a day cell of the export: new style objects for
+every cell (as the export used to do) against the shared objects of
+excel_styles.
+
+Usage: python benchmark_styles.py [--cells 20000]
+"""
+
+import argparse
+import time
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Border, PatternFill, Side
+
+from excel_styles import (
+    ALIGN_CENTER,
+    LATTICE_BORDER,
+    SKUG_COLOR,
+    THICK,
+    apply_style,
+    edge_border,
+    merge_borders,
+    solid_fill,
+)
+
+
+def add_borders(border_one, border_two):
+    """The per-cell border merge the export used before excel_styles."""
+    sides = ["left", "right", "top", "bottom", "diagonal", "vertical", "horizontal"]
+    border_kwargs = {}
+    for side in sides:
+        side_one = getattr(border_one, side, None)
+        side_two = getattr(border_two, side, None)
+        if side_one is None and side_two is None:
+            continue
+        if side_one is not None:
+            border_kwargs[side] = side_one if side_one.style is not None else side_two
+        else:
+            border_kwargs[side] = side_two
+    return Border(**border_kwargs)
+
+
+def style_cells_new_objects(ws, cells):
+    for row, column in cells:
+        cell = ws.cell(row=row, column=column)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        cell.fill = PatternFill(
+            start_color=SKUG_COLOR, end_color=SKUG_COLOR, fill_type="solid"
+        )
+        cell.border = add_borders(cell.border, Border(left=Side(style="thick")))
+        thin = Side(style="thin")
+        cell.border = add_borders(
+            cell.border, Border(left=thin, right=thin, top=thin, bottom=thin)
+        )
+
+
+def style_cells_registry(ws, cells):
+    left = edge_border("left", THICK)
+    for row, column in cells:
+        cell = ws.cell(row=row, column=column)
+        apply_style(cell, alignment=ALIGN_CENTER, fill=solid_fill(SKUG_COLOR))
+        apply_style(cell, border=merge_borders(cell.border, left))
+        apply_style(cell, border=merge_borders(cell.border, LATTICE_BORDER))
+
+
+def measure(style_cells, cells):
+    wb = Workbook()
+    start = time.perf_counter()
+    style_cells(wb.active, cells)
+    return (time.perf_counter() - start) / len(cells), wb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cells", type=int, default=20000)
+    args = parser.parse_args()
+
+    columns = 300
+    cells = [(5 + i // columns, 1 + i % columns) for i in range(args.cells)]
+    before, wb_before = measure(style_cells_new_objects, cells)
+    after, wb_after = measure(style_cells_registry, cells)
+
+    # Style proxies don't compare equal across workbooks; compare their repr
+    same = all(
+        repr(getattr(wb_before.active.cell(row, column), name))
+        == repr(getattr(wb_after.active.cell(row, column), name))
+        for row, column in cells
+        for name in ("alignment", "fill", "border")
+    )
+    print(f"{len(cells)} Zellen")
+    print(f"  neue Stilobjekte je Zelle: {before * 1e6:.1f} µs/Zelle")
+    print(f"  excel_styles:              {after * 1e6:.1f} µs/Zelle")
+    print(f"  Faktor {before / after:.1f}, gleiche Formatierung: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Query plans of the per-day and per-month lookups before and after the
+schema version 10 migration (idx_arbeitsstunden_jahr_monat_name_tag and
+idx_tages_metadaten_jahr_monat_name_tag).
+
+Builds a version 9 database in a temporary folder, runs EXPLAIN QUERY PLAN on
+the lookups, migrates it to version 10 and runs them again. Exits with an
+AssertionError if a plan is not the expected one.
+
+Usage: python check_query_plans.py
+"""
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from database import Database
+
+DAY_LOOKUP = "WHERE jahr = ? AND monat = ? AND tag = ? AND name = ?"
+MONTH_LOOKUP = "WHERE jahr = ? AND monat = ? AND name = ?"
+LOOKUP_PARAMS = {DAY_LOOKUP: (2025, 1, 2, "Max"), MONTH_LOOKUP: (2025, 1, "Max")}
+
+NEW_INDEXES = {
+    "arbeitsstunden": "idx_arbeitsstunden_jahr_monat_name_tag",
+    "tages_metadaten": "idx_tages_metadaten_jahr_monat_name_tag",
+}
+
+
+def migrate(db_file, target_version):
+    """Create or migrate db_file to target_version without opening a Database."""
+    db = Database.__new__(Database)
+    db.db_file = str(db_file)
+    db.init_database(target_version=target_version)
+
+
+def query_plan(db_file, table, lookup):
+    conn = sqlite3.connect(db_file)
+    try:
+        rows = conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {table} {lookup}", LOOKUP_PARAMS[lookup]
+        ).fetchall()
+    finally:
+        conn.close()
+    return " | ".join(row[-1] for row in rows)
+
+
+def plans(db_file):
+    return {
+        (table, lookup): query_plan(db_file, table, lookup)
+        for table in NEW_INDEXES
+        for lookup in LOOKUP_PARAMS
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        db_file = Path(folder) / "stundenliste.db"
+        # Start at version 1 so that all migrations up to 9 run
+        conn = sqlite3.connect(db_file)
+        conn.execute(
+            "CREATE TABLE schema_version (id INTEGER PRIMARY KEY CHECK (id = 1),"
+            " version INTEGER NOT NULL, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO schema_version (id, version) VALUES (1, 1)")
+        conn.commit()
+        conn.close()
+
+        migrate(db_file, 9)
+        before = plans(db_file)
+        migrate(db_file, 10)
+        after = plans(db_file)
+
+    for (table, lookup), plan in before.items():
+        print(f"{table} {lookup}")
+        print(f"  Version 9:  {plan}")
+        print(f"  Version 10: {after[(table, lookup)]}")
+
+    for lookup in LOOKUP_PARAMS:
+        # arbeitsstunden had no index on these columns before
+        assert before[("arbeitsstunden", lookup)].startswith("SCAN"), before
+    # tages_metadaten only had its UNIQUE(jahr, monat, tag, name) index, which
+    # serves the month lookup on (jahr, monat) alone
+    assert "name=?" not in before[("tages_metadaten", MONTH_LOOKUP)], before
+
+    for (table, lookup), plan in after.items():
+        index = NEW_INDEXES[table]
+        if table == "tages_metadaten" and lookup == DAY_LOOKUP:
+            # Covered by the UNIQUE index before and after
+            assert plan.startswith("SEARCH"), after
+            continue
+        assert plan.startswith("SEARCH") and f"USING INDEX {index}" in plan, after
+        assert "name=?" in plan, after
+    print("Abfragepläne wie erwartet.")
+
+
+if __name__ == "__main__":
+    main()
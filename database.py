@@ -1,62 +1,250 @@
 import os
 import shutil
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime as dt
 from typing import List, Dict, Optional
 
 import pandas as pd
 
+from datatypes import EntryKind, TravelStatus
+from db_connection import ConnectionManager
+
+
+def parse_baustelle_nummer(kostenstelle) -> Optional[str]:
+    """Baustelle number of a kostenstelle ("Nummer - Name" -> "Nummer")."""
+    if kostenstelle is None:
+        return None
+    nummer = str(kostenstelle).strip().split("-", 1)[0].strip()
+    return nummer or None
+
+
+# Kostenstellen that book an absence instead of work on a baustelle
+ABSENCE_KOSTENSTELLEN = {
+    "Krank": EntryKind.Krank,
+    "900": EntryKind.Urlaub,
+    "940": EntryKind.Urlaub,
+}
+
+
+def entry_kind_for_kostenstelle(kostenstelle) -> EntryKind:
+    """Entry kind of an arbeitsstunden row with the given kostenstelle."""
+    return ABSENCE_KOSTENSTELLEN.get(kostenstelle, EntryKind.Work)
+
+
+def _real_or_none(value) -> Optional[float]:
+    """Value for the numeric skug/urlaub/krank columns (None if empty)."""
+    if value is None:
+        return None
+    text = str(value).strip().replace(",", ".")
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def default_metadata_row(year, month, day, name, wochentag=None) -> Dict:
+    """tages_metadaten values of a day that has no stored row."""
+    return {
+        "jahr": year,
+        "monat": month,
+        "tag": day,
+        "name": name,
+        "wochentag": wochentag,
+        "skug": None,
+        "no_skug": False,
+        "kg_8h": None,
+        "travel_status": None,
+        "fruehstueck": False,
+        "mittag": False,
+        "urlaub": None,
+        "krank": None,
+    }
+
 
 class Database:
-    SCHEMA_VERSION = 9
+    SCHEMA_VERSION = 13
 
-    def __init__(self, db_file="stundenliste.db", master_db=None):
+    def __init__(self, db_file="stundenliste.db", master_db=None, pragmas=None):
         self.db_file = db_file
-        self.master_db = master_db
+        self.master_db = None
         self.init_database()
+        self.connections = ConnectionManager(db_file, pragmas)
+        self._transaction_state = threading.local()
+        if master_db is not None:
+            self.set_master_db(master_db)
 
     def set_master_db(self, master_db):
+        """
+        Set the master database. Its file is ATTACHed to every connection as
+        "stammdaten", together with the views in _STAMMDATEN_VIEWS.
+        """
         self.master_db = master_db
+        self.connections.set_connect_hook(
+            "stammdaten", self._attach_master_db if master_db is not None else None
+        )
 
-    def _build_metadata_base(self, year: int, month: int, day: int, name: str) -> Dict:
-        return {
-            "jahr": year,
-            "monat": month,
-            "tag": day,
-            "name": name,
-            "wochentag": None,
-            "skug": None,
-            "no_skug": False,
-            "kg_8h": None,
-            "travel_status": None,
-            "fruehstueck": False,
-            "mittag": False,
-            "urlaub": None,
-            "krank": None,
-        }
+    # Views over the attached master data. SQLite only allows TEMP views to
+    # reference another database, so they are created per connection.
+    _STAMMDATEN_VIEWS = [
+        # arbeitsstunden with the baustelle of its baustelle_nummer (first
+        # match like get_baustelle_by_nummer) and the worker's
+        # effective Fahrzeit / Verpflegungsgeld (override, else baustelle).
+        """
+        CREATE TEMP VIEW IF NOT EXISTS arbeitsstunden_effektiv AS
+        SELECT
+            a.*,
+            b.id AS baustelle_id,
+            COALESCE(o.fahrzeit, b.fahrzeit) AS effektive_fahrzeit,
+            COALESCE(o.verpflegungsgeld, b.verpflegungsgeld)
+                AS effektives_verpflegungsgeld
+        FROM arbeitsstunden a
+        LEFT JOIN stammdaten.baustellen b ON b.id = (
+            SELECT id FROM stammdaten.baustellen
+            WHERE nummer = a.baustelle_nummer
+            ORDER BY nummer, name
+            LIMIT 1
+        )
+        LEFT JOIN stammdaten.names n ON n.name = a.name
+        LEFT JOIN stammdaten.baustelle_worker_overrides o
+            ON o.worker_id = n.id AND o.baustelle_id = b.id
+        """,
+        # One row per tages_metadaten day with the values kg_8h and the
+        # Verpflegungsgeld depend on; kg_8h follows _calculate_kg_8h_value.
+        """
+        CREATE TEMP VIEW IF NOT EXISTS tage_effektiv AS
+        SELECT
+            d.*,
+            CASE
+                WHEN COALESCE(d.krank, 0) != 0
+                    OR COALESCE(d.urlaub, 0) != 0
+                    OR (d.travel_status IS NOT NULL AND d.travel_status != '')
+                THEN NULL
+                ELSE d.stunden + d.hoechste_fahrzeit
+                    + CASE WHEN d.fruehstueck THEN 0.25 ELSE 0 END
+                    + CASE WHEN d.mittag THEN 0.5 ELSE 0 END <= 8.0
+            END AS kg_8h
+        FROM (
+            SELECT
+                tm.jahr, tm.monat, tm.tag, tm.name, tm.travel_status,
+                tm.fruehstueck, tm.mittag, tm.krank, tm.urlaub,
+                COALESCE(ts.stunden, 0.0) AS stunden,
+                (
+                    SELECT MAX(0.0, COALESCE(MAX(COALESCE(e.effektive_fahrzeit, 0.0)), 0.0))
+                    FROM arbeitsstunden_effektiv e
+                    WHERE e.jahr = tm.jahr AND e.monat = tm.monat
+                      AND e.name = tm.name AND e.tag = tm.tag
+                      AND e.baustelle_id IS NOT NULL
+                ) AS hoechste_fahrzeit,
+                (
+                    SELECT MAX(0.0, COALESCE(MAX(e.effektives_verpflegungsgeld), 0.0))
+                    FROM arbeitsstunden_effektiv e
+                    WHERE e.jahr = tm.jahr AND e.monat = tm.monat
+                      AND e.name = tm.name AND e.tag = tm.tag
+                      AND e.baustelle_id IS NOT NULL
+                      AND e.entry_kind = 'work'
+                ) AS hoechstes_verpflegungsgeld
+            FROM tages_metadaten tm
+            LEFT JOIN tagessummen ts
+                ON ts.jahr = tm.jahr AND ts.monat = tm.monat
+                AND ts.name = tm.name AND ts.tag = tm.tag
+        ) d
+        """,
+    ]
+
+    def _attach_master_db(self, conn):
+        try:
+            conn.execute(
+                "ATTACH DATABASE ? AS stammdaten", (self.master_db.db_file,)
+            )
+            for view_sql in self._STAMMDATEN_VIEWS:
+                conn.execute(view_sql)
+        except sqlite3.Error as e:
+            print(f"Could not attach master database: {e}")
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Return the persistent connection of the calling thread."""
+        return self.connections.get_connection()
+
+    def close(self):
+        """Close the connections of all threads."""
+        self.connections.close_all()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several writes of the calling thread as one transaction.
+
+        Write methods called inside the block don't commit on their own. The
+        block commits when it ends and rolls everything back if an exception
+        leaves it. Nested blocks join the outer transaction.
+        """
+        conn = self.get_connection()
+        depth = getattr(self._transaction_state, "depth", 0)
+        if depth == 0 and not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        self._transaction_state.depth = depth + 1
+        try:
+            yield conn
+        except BaseException as e:
+            if depth == 0:
+                print(f"Transaction rolled back: {e}")
+                conn.rollback()
+            raise
+        else:
+            if depth == 0:
+                conn.commit()
+        finally:
+            self._transaction_state.depth = depth
+
+    def _in_transaction(self) -> bool:
+        return getattr(self._transaction_state, "depth", 0) > 0
+
+    def _commit(self, conn):
+        if not self._in_transaction():
+            conn.commit()
+
+    def _rollback(self, conn):
+        # Inside transaction() the block rolls back everything once the error
+        # propagates, so write methods must re-raise there instead of
+        # returning False/0, or the block would commit a partial write.
+        if not self._in_transaction():
+            conn.rollback()
 
     def _calculate_skug_value(
-        self, year: int, month: int, day: int, metadata: Dict
+        self,
+        year: int,
+        month: int,
+        day: int,
+        metadata: Dict,
+        day_total: Optional[float] = None,
+        context: Optional[Dict] = None,
     ) -> Optional[float]:
         if month not in [12, 1, 2, 3] or metadata.get("no_skug", False):
             return None
         if self.master_db is None:
             raise Exception("Master database not set for kg_8h calculation")
         
-        name_data = self.master_db.get_name_by_name(metadata["name"])
+        if context is None:
+            name_data = self.master_db.get_name_by_name(metadata["name"])
+        else:
+            name_data = context["names"].get(metadata["name"])
         if name_data.get("kein_fzk", False):
             return None
 
         try:
             from utils import calculate_skug
 
-            total_hours = sum(
-                float(entry.get("stunden") or 0.0)
-                for entry in self.get_arbeitsstunden_for_day(
-                    year, month, day, metadata["name"]
-                )
-            )
-            skug_settings = self.master_db.get_skug_settings()
+            if day_total is None:
+                day_total = self.get_day_total(year, month, day, metadata["name"])
+            total_hours = day_total
+            if context is None:
+                skug_settings = self.master_db.get_skug_settings()
+            else:
+                skug_settings = context["skug_settings"]
             skug = calculate_skug(year, month, day, total_hours, skug_settings)
             if skug is None:
                 return None
@@ -64,7 +252,16 @@ class Database:
         except Exception:
             return metadata.get("skug")
 
-    def _calculate_kg_8h_value(self, year: int, month: int, day: int, metadata: Dict):
+    def _calculate_kg_8h_value(
+        self,
+        year: int,
+        month: int,
+        day: int,
+        metadata: Dict,
+        day_entries: Optional[List[Dict]] = None,
+        context: Optional[Dict] = None,
+        day_total: Optional[float] = None,
+    ):
         if self.master_db is None:
             raise Exception("Master database not set for kg_8h calculation")
         if metadata.get("krank") or metadata.get("urlaub"):
@@ -74,33 +271,48 @@ class Database:
         try:
             from utils import get_effective_fahrzeit
 
-            total_hours = 0.0
+            total_hours = 0.0 if day_total is None else float(day_total)
             highest_fahrzeit = 0.0
-            worker_id = self.master_db.get_worker_id_by_name(metadata["name"])
-
-            for entry in self.get_arbeitsstunden_for_day(
-                year, month, day, metadata["name"]
-            ):
-                total_hours += float(entry.get("stunden") or 0.0)
-                kostenstelle = entry.get("kostenstelle")
-                if not kostenstelle:
-                    continue
+            if context is None:
+                worker_id = self.master_db.get_worker_id_by_name(metadata["name"])
+            else:
+                worker_id = (context["names"].get(metadata["name"]) or {}).get("id")
 
-                bst_nummer = (
-                    kostenstelle.split("-")[0].strip()
-                    if "-" in kostenstelle
-                    else str(kostenstelle).strip()
+            if day_entries is None:
+                day_entries = self.get_arbeitsstunden_for_day(
+                    year, month, day, metadata["name"]
                 )
-                bst_data = self.master_db.get_baustelle_by_nummer(bst_nummer)
+            for entry in day_entries:
+                if day_total is None:
+                    total_hours += float(entry.get("stunden") or 0.0)
+                bst_nummer = entry.get("baustelle_nummer")
+                if not bst_nummer:
+                    continue
+
+                if context is None:
+                    bst_data = self.master_db.get_baustelle_by_nummer(bst_nummer)
+                else:
+                    bst_data = context["baustellen"].get(bst_nummer)
                 if not bst_data:
                     continue
 
-                fahrzeit = get_effective_fahrzeit(
-                    self.master_db,
-                    worker_id,
-                    bst_data["id"],
-                    bst_data.get("fahrzeit", 0.0),
-                )
+                if context is None:
+                    fahrzeit = get_effective_fahrzeit(
+                        self.master_db,
+                        worker_id,
+                        bst_data["id"],
+                        bst_data.get("fahrzeit", 0.0),
+                    )
+                else:
+                    override = (
+                        context["overrides"].get((worker_id, bst_data["id"]))
+                        if worker_id
+                        else None
+                    )
+                    if override and override["fahrzeit"] is not None:
+                        fahrzeit = float(override["fahrzeit"])
+                    else:
+                        fahrzeit = float(bst_data.get("fahrzeit", 0.0))
                 highest_fahrzeit = max(highest_fahrzeit, float(fahrzeit or 0.0))
 
             total_hours += highest_fahrzeit
@@ -113,24 +325,116 @@ class Database:
             return metadata.get("kg_8h")
 
     def _resolve_metadata_entry(
-        self, metadata: Optional[Dict], year: int, month: int, day: int, name: str
+        self,
+        metadata: Optional[Dict],
+        year: int,
+        month: int,
+        day: int,
+        name: str,
+        day_entries: Optional[List[Dict]] = None,
+        context: Optional[Dict] = None,
+        day_total: Optional[float] = None,
     ) -> Dict:
-        resolved = self._build_metadata_base(year, month, day, name)
+        """
+        Fill in the derived skug/kg_8h values of a metadata row.
+        day_entries are the day's arbeitsstunden rows and day_total their
+        summed stunden (from tagessummen) if the caller already has them;
+        otherwise they are queried. context is the master data from
+        _load_resolve_context(); without it master_db is queried.
+        """
+        resolved = default_metadata_row(year, month, day, name)
         if metadata:
             resolved.update(metadata)
         resolved["jahr"] = year
         resolved["monat"] = month
         resolved["tag"] = day
         resolved["name"] = name
-        resolved["skug"] = self._calculate_skug_value(year, month, day, resolved)
-        resolved["kg_8h"] = self._calculate_kg_8h_value(year, month, day, resolved)
+        if day_total is None:
+            day_total = self.get_day_total(year, month, day, name)
+        resolved["skug"] = self._calculate_skug_value(
+            year, month, day, resolved, day_total, context
+        )
+        resolved["kg_8h"] = self._calculate_kg_8h_value(
+            year, month, day, resolved, day_entries, context, day_total
+        )
         return resolved
 
+    def _load_resolve_context(self) -> Dict:
+        """Master data needed to resolve metadata rows, read once per batch."""
+        if self.master_db is None:
+            raise Exception("Master database not set for kg_8h calculation")
+        baustellen = {}
+        # get_baustelle_by_nummer returns the first match by (nummer, name)
+        for bst in self.master_db.get_all_baustellen():
+            baustellen.setdefault(str(bst["nummer"]), bst)
+        return {
+            "names": {row["name"]: row for row in self.master_db.get_all_names()},
+            "skug_settings": self.master_db.get_skug_settings(),
+            "baustellen": baustellen,
+            "overrides": {
+                (row["worker_id"], row["baustelle_id"]): row
+                for row in self.master_db.get_all_overrides()
+            },
+        }
+
+    def _load_day_entries(self, months) -> Dict:
+        """Arbeitsstunden of the given (year, month) pairs by (jahr, monat, tag, name)."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        day_entries = {}
+        for year, month in sorted(months):
+            cursor.execute(
+                """
+                SELECT * FROM arbeitsstunden
+                WHERE jahr = ? AND monat = ?
+                ORDER BY id ASC
+            """,
+                (year, month),
+            )
+            for row in cursor.fetchall():
+                key = (row["jahr"], row["monat"], row["tag"], row["name"])
+                day_entries.setdefault(key, []).append(dict(row))
+        return day_entries
+
+    def resolve_metadata_entries(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Resolve many metadata rows at once (same result as _resolve_metadata_entry
+        per row). Each row needs jahr, monat, tag and name. Master data and the
+        arbeitsstunden of all months in the batch are read once.
+        """
+        if not rows:
+            return []
+        context = self._load_resolve_context()
+        months = {(row["jahr"], row["monat"]) for row in rows}
+        day_entries = self._load_day_entries(months)
+        day_totals = {}
+        for year, month in months:
+            for (name, day), total in self.get_tagessummen_for_month(
+                year, month
+            ).items():
+                day_totals[(year, month, day, name)] = total["stunden"]
+        resolved_rows = []
+        for row in rows:
+            key = (row["jahr"], row["monat"], row["tag"], row["name"])
+            resolved_rows.append(
+                self._resolve_metadata_entry(
+                    row,
+                    row["jahr"],
+                    row["monat"],
+                    row["tag"],
+                    row["name"],
+                    day_entries=day_entries.get(key, []),
+                    context=context,
+                    day_total=day_totals.get(key, 0.0),
+                )
+            )
+        return resolved_rows
+
     def get_stored_metadata_by_date(
         self, year: int, month: int, day: int, name: str
     ) -> Optional[Dict]:
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -149,9 +453,6 @@ class Database:
             print(f"Database error: {e}")
             raise
 
-        finally:
-            conn.close()
-
     def _backup_database(self, from_version: int, to_version: int):
         backup_folder = os.path.join(
             os.path.dirname(self.db_file), f"Backup_{from_version}_to_{to_version}"
@@ -174,8 +475,13 @@ class Database:
         new_conn = sqlite3.connect(self.db_file)
         return new_conn, new_conn.cursor()
 
-    def init_database(self):
-        """Create table if it doesn't exist."""
+    def init_database(self, target_version: Optional[int] = None):
+        """
+        Create table if it doesn't exist and migrate it to target_version
+        (default SCHEMA_VERSION; older versions are for check_query_plans.py).
+        """
+        if target_version is None:
+            target_version = self.SCHEMA_VERSION
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
 
@@ -222,7 +528,7 @@ class Database:
                 UNIQUE(jahr, monat, tag, name)
             )
         """)
-        if current_version < 2:
+        if current_version < 2 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 2)
             try:
                 cursor.execute(
@@ -233,7 +539,7 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 2 WHERE id = 1")
             current_version = 2
 
-        if current_version < 3:
+        if current_version < 3 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 3)
             try:
                 cursor.execute(
@@ -247,7 +553,7 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 3 WHERE id = 1")
             current_version = 3
 
-        if current_version < 4:
+        if current_version < 4 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 4)
             # Remove UNIQUE constraint by recreating table
             cursor.execute(
@@ -286,7 +592,7 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 4 WHERE id = 1")
             current_version = 4
 
-        if current_version < 5:
+        if current_version < 5 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 5)
 
             # Create new tages_metadaten table (unique per day/worker)
@@ -453,7 +759,7 @@ class Database:
             current_version = 5
             print("Migration to schema version 5 completed successfully!")
 
-        if current_version < 6:
+        if current_version < 6 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 6)
             try:
                 cursor.execute("ALTER TABLE tages_metadaten ADD COLUMN urlaub TEXT")
@@ -466,7 +772,7 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 6 WHERE id = 1")
             current_version = 6
 
-        if current_version < 7:
+        if current_version < 7 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 7)
             try:
                 cursor.execute(
@@ -477,7 +783,7 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 7 WHERE id = 1")
             current_version = 7
 
-        if current_version < 8:
+        if current_version < 8 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 8)
             try:
                 cursor.execute("ALTER TABLE tages_metadaten ADD COLUMN urlaub TEXT")
@@ -556,7 +862,7 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 8 WHERE id = 1")
             current_version = 8
 
-        if current_version < 9:
+        if current_version < 9 <= target_version:
             conn, cursor = self._backup_and_reconnect(conn, current_version, 9)
             cursor.execute(
                 """
@@ -578,9 +884,316 @@ class Database:
             cursor.execute("UPDATE schema_version SET version = 9 WHERE id = 1")
             current_version = 9
 
+        if current_version < 10 <= target_version:
+            conn, cursor = self._backup_and_reconnect(conn, current_version, 10)
+            # Every per-day/per-month lookup filters on (jahr, monat, name[, tag]).
+            # Putting name before tag lets one index serve both access patterns.
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_arbeitsstunden_jahr_monat_name_tag
+                ON arbeitsstunden (jahr, monat, name, tag)
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tages_metadaten_jahr_monat_name_tag
+                ON tages_metadaten (jahr, monat, name, tag)
+                """
+            )
+            cursor.execute("ANALYZE")
+            cursor.execute("UPDATE schema_version SET version = 10 WHERE id = 1")
+            current_version = 10
+
+        if current_version < 11 <= target_version:
+            conn, cursor = self._backup_and_reconnect(conn, current_version, 11)
+            self._create_tagessummen(cursor)
+            self._rebuild_tagessummen(cursor)
+            cursor.execute("UPDATE schema_version SET version = 11 WHERE id = 1")
+            current_version = 11
+
+        if current_version < 12 <= target_version:
+            conn, cursor = self._backup_and_reconnect(conn, current_version, 12)
+            try:
+                cursor.execute(
+                    "ALTER TABLE arbeitsstunden ADD COLUMN baustelle_nummer TEXT"
+                )
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+            cursor.execute("SELECT id, kostenstelle FROM arbeitsstunden")
+            cursor.executemany(
+                "UPDATE arbeitsstunden SET baustelle_nummer = ? WHERE id = ?",
+                [
+                    (parse_baustelle_nummer(kostenstelle), entry_id)
+                    for entry_id, kostenstelle in cursor.fetchall()
+                ],
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_arbeitsstunden_baustelle_nummer
+                ON arbeitsstunden (baustelle_nummer, jahr, monat, tag)
+                """
+            )
+            cursor.execute("ANALYZE")
+            cursor.execute("UPDATE schema_version SET version = 12 WHERE id = 1")
+            current_version = 12
+
+        if current_version < 13 <= target_version:
+            conn, cursor = self._backup_and_reconnect(conn, current_version, 13)
+            try:
+                cursor.execute(
+                    """
+                    ALTER TABLE arbeitsstunden ADD COLUMN entry_kind TEXT NOT NULL
+                    DEFAULT 'work'
+                    CHECK (entry_kind IN ('work', 'krank', 'urlaub', 'feiertag'))
+                    """
+                )
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+            cursor.executemany(
+                "UPDATE arbeitsstunden SET entry_kind = ? WHERE kostenstelle = ?",
+                [
+                    (kind.value, kostenstelle)
+                    for kostenstelle, kind in ABSENCE_KOSTENSTELLEN.items()
+                ],
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_arbeitsstunden_abwesenheit
+                ON arbeitsstunden (jahr, monat, name, tag, entry_kind)
+                WHERE entry_kind != 'work'
+                """
+            )
+
+            # skug/urlaub/krank were TEXT; SQLite can't change a column type,
+            # so tages_metadaten is rebuilt with REAL columns.
+            cursor.execute("""
+                CREATE TABLE tages_metadaten_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    jahr INTEGER NOT NULL,
+                    monat INTEGER NOT NULL,
+                    tag INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    wochentag TEXT,
+                    skug REAL,
+                    no_skug BOOLEAN DEFAULT 0,
+                    kg_8h BOOLEAN,
+                    travel_status TEXT,
+                    fruehstueck BOOLEAN,
+                    mittag BOOLEAN,
+                    urlaub REAL,
+                    krank REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(jahr, monat, tag, name)
+                )
+            """)
+            cursor.execute(
+                """
+                INSERT INTO tages_metadaten_new
+                (id, jahr, monat, tag, name, wochentag, skug, no_skug, kg_8h,
+                 travel_status, fruehstueck, mittag, urlaub, krank, created_at, updated_at)
+                SELECT id, jahr, monat, tag, name, wochentag,
+                    CASE WHEN TRIM(COALESCE(skug, '')) = '' THEN NULL
+                         ELSE CAST(skug AS REAL) END,
+                    no_skug, kg_8h, travel_status, fruehstueck, mittag,
+                    CASE WHEN TRIM(COALESCE(urlaub, '')) = '' THEN NULL
+                         ELSE CAST(urlaub AS REAL) END,
+                    CASE WHEN TRIM(COALESCE(krank, '')) = '' THEN NULL
+                         ELSE CAST(krank AS REAL) END,
+                    created_at, updated_at
+                FROM tages_metadaten
+                """
+            )
+            cursor.execute("DROP TABLE tages_metadaten")
+            cursor.execute(
+                "ALTER TABLE tages_metadaten_new RENAME TO tages_metadaten"
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tages_metadaten_jahr_monat_name_tag
+                ON tages_metadaten (jahr, monat, name, tag)
+                """
+            )
+            # Absence statistics only read the few Urlaub/Krank days
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tages_metadaten_urlaub
+                ON tages_metadaten (jahr, monat, name, urlaub)
+                WHERE urlaub > 0
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_tages_metadaten_krank
+                ON tages_metadaten (jahr, monat, name, krank)
+                WHERE krank > 0
+                """
+            )
+            cursor.execute("ANALYZE")
+            cursor.execute("UPDATE schema_version SET version = 13 WHERE id = 1")
+            current_version = 13
+
         conn.commit()
         conn.close()
 
+    # Recomputes the tagessummen row of one worker-day from arbeitsstunden.
+    # {key} is NEW or OLD inside the trigger bodies.
+    _TAGESSUMMEN_REFRESH_SQL = """
+            DELETE FROM tagessummen
+            WHERE jahr = {key}.jahr AND monat = {key}.monat
+              AND tag = {key}.tag AND name = {key}.name;
+            INSERT INTO tagessummen (jahr, monat, tag, name, stunden, anzahl)
+            SELECT jahr, monat, tag, name, TOTAL(stunden), COUNT(*)
+            FROM arbeitsstunden
+            WHERE jahr = {key}.jahr AND monat = {key}.monat
+              AND tag = {key}.tag AND name = {key}.name
+            GROUP BY jahr, monat, tag, name;
+    """
+
+    def _create_tagessummen(self, cursor):
+        """
+        Create the tagessummen table (total stunden and number of entries per
+        worker-day) and the triggers that keep it in sync with arbeitsstunden.
+        """
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tagessummen (
+                jahr INTEGER NOT NULL,
+                monat INTEGER NOT NULL,
+                tag INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                stunden REAL NOT NULL DEFAULT 0,
+                anzahl INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (jahr, monat, name, tag)
+            ) WITHOUT ROWID
+        """
+        )
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_arbeitsstunden_tagessummen_insert
+            AFTER INSERT ON arbeitsstunden
+            BEGIN
+                {self._TAGESSUMMEN_REFRESH_SQL.format(key="NEW")}
+            END
+        """
+        )
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_arbeitsstunden_tagessummen_delete
+            AFTER DELETE ON arbeitsstunden
+            BEGIN
+                {self._TAGESSUMMEN_REFRESH_SQL.format(key="OLD")}
+            END
+        """
+        )
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_arbeitsstunden_tagessummen_update
+            AFTER UPDATE OF jahr, monat, tag, name, stunden ON arbeitsstunden
+            BEGIN
+                {self._TAGESSUMMEN_REFRESH_SQL.format(key="OLD")}
+                {self._TAGESSUMMEN_REFRESH_SQL.format(key="NEW")}
+            END
+        """
+        )
+
+    def _rebuild_tagessummen(self, cursor):
+        cursor.execute("DELETE FROM tagessummen")
+        cursor.execute(
+            """
+            INSERT INTO tagessummen (jahr, monat, tag, name, stunden, anzahl)
+            SELECT jahr, monat, tag, name, TOTAL(stunden), COUNT(*)
+            FROM arbeitsstunden
+            GROUP BY jahr, monat, tag, name
+        """
+        )
+
+    def check_tagessummen(self, rebuild: bool = False) -> List[Dict]:
+        """
+        Compare tagessummen with the totals computed from arbeitsstunden.
+        Returns the worker-days that differ; with rebuild=True the table is
+        rebuilt when there are any.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT jahr, monat, tag, name, TOTAL(stunden) AS stunden, COUNT(*) AS anzahl
+            FROM arbeitsstunden
+            GROUP BY jahr, monat, tag, name
+        """
+        )
+        expected = {
+            (row["jahr"], row["monat"], row["tag"], row["name"]): (
+                row["stunden"],
+                row["anzahl"],
+            )
+            for row in cursor.fetchall()
+        }
+        cursor.execute("SELECT * FROM tagessummen")
+        stored = {
+            (row["jahr"], row["monat"], row["tag"], row["name"]): (
+                row["stunden"],
+                row["anzahl"],
+            )
+            for row in cursor.fetchall()
+        }
+
+        mismatches = []
+        for key in sorted(set(expected) | set(stored), key=str):
+            if expected.get(key) != stored.get(key):
+                jahr, monat, tag, name = key
+                mismatches.append(
+                    {
+                        "jahr": jahr,
+                        "monat": monat,
+                        "tag": tag,
+                        "name": name,
+                        "expected": expected.get(key),
+                        "stored": stored.get(key),
+                    }
+                )
+
+        if mismatches:
+            print(f"tagessummen: {len(mismatches)} abweichende Tage gefunden.")
+            if rebuild:
+                with self.transaction():
+                    self._rebuild_tagessummen(cursor)
+                print("tagessummen neu aufgebaut.")
+        return mismatches
+
+    def get_day_total(self, year: int, month: int, day: int, name: str) -> float:
+        """Total stunden of a worker-day (from tagessummen)."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT stunden FROM tagessummen
+            WHERE jahr = ? AND monat = ? AND name = ? AND tag = ?
+        """,
+            (year, month, name, day),
+        )
+        row = cursor.fetchone()
+
+        return row[0] if row else 0.0
+
+    def get_tagessummen_for_month(self, year: int, month: int) -> Dict:
+        """tagessummen rows of a month for all workers, by (name, tag)."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT * FROM tagessummen
+            WHERE jahr = ? AND monat = ?
+        """,
+            (year, month),
+        )
+
+        return {(row["name"], row["tag"]): dict(row) for row in cursor.fetchall()}
+
     def add_arbeitsstunden(self, data: Dict) -> int:
         """
         Add a work hours entry to arbeitsstunden table.
@@ -592,43 +1205,171 @@ class Database:
         Returns:
             ID of the inserted row
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute(
-                """
-                INSERT INTO arbeitsstunden
-                (jahr, monat, tag, name, wochentag, kostenstelle, stunden)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    data.get("jahr"),
-                    data.get("monat"),
-                    data.get("tag"),
-                    data.get("name"),
-                    data.get("wochentag"),
-                    data.get("kostenstelle"),
-                    data.get("stunden", 0.0),
-                ),
-            )
-
-            conn.commit()
-            return cursor.lastrowid
+            entry_id = self._insert_arbeitsstunden(cursor, data)
+            self._commit(conn)
+            return entry_id
 
         except sqlite3.Error as e:
             print(f"Database error adding arbeitsstunden: {e}")
-            conn.rollback()
+            self._rollback(conn)
             raise
-        finally:
-            conn.close()
+
+    def add_arbeitsstunden_many(self, entries: List[Dict]) -> List[int]:
+        """
+        Add several arbeitsstunden entries in one transaction.
+
+        Returns:
+            IDs of the inserted rows, in the order of entries
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            return [self._insert_arbeitsstunden(cursor, data) for data in entries]
+
+    def _insert_arbeitsstunden(self, cursor, data: Dict) -> int:
+        cursor.execute(
+            """
+            INSERT INTO arbeitsstunden
+            (jahr, monat, tag, name, wochentag, kostenstelle, baustelle_nummer,
+             entry_kind, stunden)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            (
+                data.get("jahr"),
+                data.get("monat"),
+                data.get("tag"),
+                data.get("name"),
+                data.get("wochentag"),
+                data.get("kostenstelle"),
+                parse_baustelle_nummer(data.get("kostenstelle")),
+                entry_kind_for_kostenstelle(data.get("kostenstelle")).value,
+                data.get("stunden", 0.0),
+            ),
+        )
+        return cursor.lastrowid
+
+    def get_fahrstunden_for_month(
+        self, year: int, month: int, name: Optional[str] = None
+    ) -> Dict[str, float]:
+        """
+        Fahrstunden (effective Fahrzeit x 2 per baustelle entry) per worker for
+        a month, from one GROUP BY over arbeitsstunden_effektiv. Restrict to
+        one worker with name.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        query = """
+            SELECT name, TOTAL(effektive_fahrzeit * 2) AS fahrstunden
+            FROM arbeitsstunden_effektiv
+            WHERE jahr = ? AND monat = ?
+              AND baustelle_id IS NOT NULL
+              AND kostenstelle != ''
+              AND entry_kind = 'work'
+        """
+        params = [year, month]
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        query += " GROUP BY name"
+        cursor.execute(query, params)
+
+        return {row["name"]: round(row["fahrstunden"], 2) for row in cursor.fetchall()}
+
+    def get_verpflegungsgeld_for_month(
+        self, year: int, month: int, name: Optional[str] = None
+    ) -> Dict[str, float]:
+        """
+        Verpflegungsgeld (V.-Zuschuss) per worker for a month, from one GROUP BY
+        over tage_effektiv. Same rules as utils.get_verpflegungsgeld_for_name.
+        """
+        from utils import AN_ODER_ABREISE_VERPFLEGUNG, AWAY_24H_VERPFLEGUNG
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        query = """
+            SELECT name, TOTAL(
+                CASE
+                    WHEN travel_status IS NOT NULL AND travel_status != '' THEN
+                        CASE WHEN travel_status = ? THEN ? ELSE ? END
+                    WHEN kg_8h THEN 0.0
+                    ELSE hoechstes_verpflegungsgeld
+                END
+            ) AS verpflegungsgeld
+            FROM tage_effektiv
+            WHERE jahr = ? AND monat = ?
+        """
+        params = [
+            TravelStatus.Away24h.value,
+            AWAY_24H_VERPFLEGUNG,
+            AN_ODER_ABREISE_VERPFLEGUNG,
+            year,
+            month,
+        ]
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        query += " GROUP BY name"
+        cursor.execute(query, params)
+
+        return {
+            row["name"]: round(row["verpflegungsgeld"], 2) for row in cursor.fetchall()
+        }
+
+    def get_baustelle_rates_for_month(self, year: int, month: int) -> Dict:
+        """
+        Highest effective Fahrzeit and Verpflegungsgeld of the baustellen each
+        worker booked per day, keyed by (name, day). Same values as
+        hoechste_fahrzeit / hoechstes_verpflegungsgeld in tage_effektiv.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT
+                name,
+                tag,
+                MAX(0.0, COALESCE(MAX(
+                    CASE WHEN baustelle_id IS NOT NULL
+                    THEN COALESCE(effektive_fahrzeit, 0.0) END
+                ), 0.0)) AS fahrzeit,
+                MAX(0.0, COALESCE(MAX(
+                    CASE WHEN baustelle_id IS NOT NULL AND entry_kind = 'work'
+                    THEN effektives_verpflegungsgeld END
+                ), 0.0)) AS verpflegungsgeld
+            FROM arbeitsstunden_effektiv
+            WHERE jahr = ? AND monat = ?
+            GROUP BY name, tag
+        """,
+            (year, month),
+        )
+
+        return {
+            (row["name"], row["tag"]): {
+                "fahrzeit": row["fahrzeit"],
+                "verpflegungsgeld": row["verpflegungsgeld"],
+            }
+            for row in cursor.fetchall()
+        }
+
+    def load_month_snapshot(self, year: int, month: int) -> "MonthSnapshot":
+        """Load all rows of a month for all workers (see MonthSnapshot)."""
+        return MonthSnapshot(self, year, month)
+
+    def load_monthly_aggregates(self, year: int, month: int) -> "MonthlyAggregates":
+        """Summary figures of a month for all workers (see MonthlyAggregates)."""
+        return MonthlyAggregates(self, year, month)
 
     def get_arbeitsstunden_for_day(
         self, year: int, month: int, day: int, name: str
     ) -> List[Dict]:
         """Get all arbeitsstunden entries for a specific person on a specific date."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -640,16 +1381,31 @@ class Database:
         )
 
         rows = cursor.fetchall()
-        conn.close()
 
         return [dict(row) for row in rows]
 
+    def has_absence_entry(self, year: int, month: int, day: int, name: str) -> bool:
+        """Check if a person has a Krank/Urlaub entry on a specific date."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT 1 FROM arbeitsstunden
+            WHERE jahr = ? AND monat = ? AND name = ? AND tag = ?
+              AND entry_kind != 'work'
+            LIMIT 1
+        """,
+            (year, month, name, day),
+        )
+
+        return cursor.fetchone() is not None
+
     def get_arbeitsstunden_for_month(
         self, year: int, month: int, name: str
     ) -> List[Dict]:
         """Get all arbeitsstunden entries for a specific person in a specific month."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -661,40 +1417,33 @@ class Database:
         )
 
         rows = cursor.fetchall()
-        conn.close()
 
         return [dict(row) for row in rows]
 
     def get_used_baustellen_numbers_for_year(self, year: int) -> List[str]:
         """Get distinct baustellen numbers used in arbeitsstunden for a year."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
             """
-            SELECT DISTINCT
-                CASE
-                    WHEN instr(kostenstelle, ' - ') > 0
-                    THEN trim(substr(kostenstelle, 1, instr(kostenstelle, ' - ') - 1))
-                    ELSE trim(kostenstelle)
-                END AS baustelle_nummer
+            SELECT DISTINCT baustelle_nummer
             FROM arbeitsstunden
             WHERE jahr = ?
-              AND trim(COALESCE(kostenstelle, '')) != ''
-              AND trim(kostenstelle) NOT IN ('Krank', '900', '940')
+              AND baustelle_nummer IS NOT NULL
+              AND entry_kind = 'work'
             ORDER BY baustelle_nummer ASC
         """,
             (year,),
         )
 
         rows = cursor.fetchall()
-        conn.close()
 
         return [row[0] for row in rows if row[0]]
 
     def update_arbeitsstunden(self, entry_id: int, data: Dict) -> bool:
         """Update an arbeitsstunden entry by ID."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -707,6 +1456,11 @@ class Database:
                 if data_key in data:
                     updates.append(f"{db_col}=?")
                     params.append(data[data_key])
+            if "Kostenstelle" in data:
+                updates.append("baustelle_nummer=?")
+                params.append(parse_baustelle_nummer(data["Kostenstelle"]))
+                updates.append("entry_kind=?")
+                params.append(entry_kind_for_kostenstelle(data["Kostenstelle"]).value)
 
             updates.append("updated_at=CURRENT_TIMESTAMP")
 
@@ -714,21 +1468,20 @@ class Database:
                 query = f"UPDATE arbeitsstunden SET {', '.join(updates)} WHERE id = ?"
                 params.append(entry_id)
                 cursor.execute(query, params)
-                conn.commit()
+                self._commit(conn)
                 return True
             return False
 
         except sqlite3.Error as e:
             print(f"Database error updating arbeitsstunden: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            if self._in_transaction():
+                raise
             return False
-        finally:
-            conn.close()
 
     def get_arbeitsstunden_by_id(self, entry_id: int) -> Optional[Dict]:
         """Get a single arbeitsstunden entry by ID."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -740,12 +1493,11 @@ class Database:
         )
 
         row = cursor.fetchone()
-        conn.close()
 
         return dict(row) if row else None
 
     def delete_arbeitsstunden(self, entry_id: int) -> bool:
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -761,7 +1513,7 @@ class Database:
 
             cursor.execute("DELETE FROM arbeitsstunden WHERE id = ?", (entry_id,))
             if cursor.rowcount == 0:
-                conn.rollback()
+                self._rollback(conn)
                 return False
 
             cursor.execute(
@@ -782,101 +1534,109 @@ class Database:
                     (jahr, monat, tag, name),
                 )
 
-            conn.commit()
+            self._commit(conn)
             return True
         except sqlite3.Error as e:
             print(f"Database error deleting arbeitsstunden: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            if self._in_transaction():
+                raise
             return False
-        finally:
-            conn.close()
 
     def add_or_update_metadata(self, data: Dict) -> tuple[int, bool]:
         """
         Add a new entry or update if the combination of jahr, monat, tag, name exists.
         Returns (row_id, was_updated) where was_updated is True if existing row was updated.
         """
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            jahr = data.get("jahr")
-            monat = data.get("monat")
-            tag = data.get("tag")
-            name = data.get("name")
-            wochentag = data.get("wochentag")
-
-            # Handle tages_metadaten (unique per day/worker)
-            metadata_fields = {
-                "no_skug": data.get("no_skug"),
-                "travel_status": data.get("travel_status"),
-                "fruehstueck": data.get("fruehstueck"),
-                "mittag": data.get("mittag"),
-                "urlaub": data.get("urlaub"),
-                "krank": data.get("krank"),
-            }
+            result = self._upsert_metadata(cursor, data)
+            self._commit(conn)
+            return result
 
-            # Check if metadata entry exists
-            cursor.execute(
-                """
-                SELECT id FROM tages_metadaten 
-                WHERE jahr = ? AND monat = ? AND tag = ? AND name = ?
-            """,
-                (jahr, monat, tag, name),
-            )
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            self._rollback(conn)
+            raise
 
-            existing_metadata = cursor.fetchone()
+    def upsert_metadata_many(self, rows: List[Dict]) -> List[tuple[int, bool]]:
+        """
+        add_or_update_metadata for several rows in one transaction.
+        Returns one (row_id, was_updated) tuple per row.
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            return [self._upsert_metadata(cursor, data) for data in rows]
+
+    def _upsert_metadata(self, cursor, data: Dict) -> tuple[int, bool]:
+        jahr = data.get("jahr")
+        monat = data.get("monat")
+        tag = data.get("tag")
+        name = data.get("name")
+        wochentag = data.get("wochentag")
+
+        # Handle tages_metadaten (unique per day/worker)
+        metadata_fields = {
+            "no_skug": data.get("no_skug"),
+            "travel_status": data.get("travel_status"),
+            "fruehstueck": data.get("fruehstueck"),
+            "mittag": data.get("mittag"),
+            "urlaub": _real_or_none(data.get("urlaub")),
+            "krank": _real_or_none(data.get("krank")),
+        }
 
-            if existing_metadata:
-                # Update metadata
-                metadata_id = existing_metadata[0]
-                updates = []
-                params = []
+        # Check if metadata entry exists
+        cursor.execute(
+            """
+            SELECT id FROM tages_metadaten 
+            WHERE jahr = ? AND monat = ? AND tag = ? AND name = ?
+        """,
+            (jahr, monat, tag, name),
+        )
 
-                for field, value in metadata_fields.items():
-                    updates.append(f"{field}=?")
-                    params.append(value)
+        existing_metadata = cursor.fetchone()
 
-                if updates:
-                    updates.append("updated_at=CURRENT_TIMESTAMP")
-                    query = (
-                        f"UPDATE tages_metadaten SET {', '.join(updates)} WHERE id = ?"
-                    )
-                    params.append(metadata_id)
-                    cursor.execute(query, params)
-            else:
-                # Insert new metadata
-                cursor.execute(
-                    """
-                    INSERT INTO tages_metadaten
-                    (jahr, monat, tag, name, wochentag, no_skug, travel_status, fruehstueck, mittag, urlaub, krank)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        jahr,
-                        monat,
-                        tag,
-                        name,
-                        wochentag,
-                        metadata_fields["no_skug"],
-                        metadata_fields["travel_status"],
-                        metadata_fields["fruehstueck"],
-                        metadata_fields["mittag"],
-                        metadata_fields["urlaub"],
-                        metadata_fields["krank"],
-                    ),
-                )
-                metadata_id = cursor.lastrowid
-            conn.commit()
-            return (metadata_id, existing_metadata is not None)
+        if existing_metadata:
+            # Update metadata
+            metadata_id = existing_metadata[0]
+            updates = []
+            params = []
 
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            conn.rollback()
-            raise
+            for field, value in metadata_fields.items():
+                updates.append(f"{field}=?")
+                params.append(value)
 
-        finally:
-            conn.close()
+            if updates:
+                updates.append("updated_at=CURRENT_TIMESTAMP")
+                query = f"UPDATE tages_metadaten SET {', '.join(updates)} WHERE id = ?"
+                params.append(metadata_id)
+                cursor.execute(query, params)
+        else:
+            # Insert new metadata
+            cursor.execute(
+                """
+                INSERT INTO tages_metadaten
+                (jahr, monat, tag, name, wochentag, no_skug, travel_status, fruehstueck, mittag, urlaub, krank)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    jahr,
+                    monat,
+                    tag,
+                    name,
+                    wochentag,
+                    metadata_fields["no_skug"],
+                    metadata_fields["travel_status"],
+                    metadata_fields["fruehstueck"],
+                    metadata_fields["mittag"],
+                    metadata_fields["urlaub"],
+                    metadata_fields["krank"],
+                ),
+            )
+            metadata_id = cursor.lastrowid
+        return (metadata_id, existing_metadata is not None)
 
     def get_metadata_by_date(
         self, year: int, month: int, day: int, name: str
@@ -888,9 +1648,25 @@ class Database:
                 return None
         return self._resolve_metadata_entry(metadata, year, month, day, name)
 
+    def get_stored_metadata_for_month(
+        self, year: int, month: int, name: str
+    ) -> List[Dict]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT * FROM tages_metadaten
+            WHERE jahr = ? AND monat = ? AND name = ?
+            ORDER BY tag ASC
+        """,
+            (year, month, name),
+        )
+
+        return [dict(row) for row in cursor.fetchall()]
+
     def get_metadata_for_month(self, year: int, month: int, name: str) -> List[Dict]:
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -903,22 +1679,15 @@ class Database:
             )
 
             rows = cursor.fetchall()
-            conn.close()
-            return [
-                self._resolve_metadata_entry(dict(row), year, month, row["tag"], name)
-                for row in rows
-            ]
+            return self.resolve_metadata_entries([dict(row) for row in rows])
 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             raise
 
-        finally:
-            conn.close()
-
     def update_entry_metadata(self, entry_id: int, data: Dict) -> bool:
         """Update an existing metadata entry by ID (tages_metadaten table)."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -937,10 +1706,15 @@ class Database:
                 "krank": "krank",
             }
 
+            numeric_cols = {"skug", "urlaub", "krank"}
+
             for data_key, db_col in fields_map.items():
                 if data_key in data:
                     updates.append(f"{db_col}=?")
-                    params.append(data[data_key])
+                    if db_col in numeric_cols:
+                        params.append(_real_or_none(data[data_key]))
+                    else:
+                        params.append(data[data_key])
 
             updates.append("updated_at=CURRENT_TIMESTAMP")
 
@@ -948,21 +1722,20 @@ class Database:
                 query = f"UPDATE tages_metadaten SET {', '.join(updates)} WHERE id = ?"
                 params.append(entry_id)
                 cursor.execute(query, params)
-                conn.commit()
+                self._commit(conn)
                 return True
             return False
 
         except sqlite3.Error as e:
             print(f"Database error updating entry: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            if self._in_transaction():
+                raise
             return False
-        finally:
-            conn.close()
 
     def get_all_entries(self) -> List[Dict]:
         """Retrieve all entries from the database (joins both tables)."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         # Join both tables to get complete data
@@ -981,41 +1754,24 @@ class Database:
         """)
 
         rows = cursor.fetchall()
-        conn.close()
 
-        resolved_rows = []
-        for row in rows:
-            entry = dict(row)
-            resolved_rows.append(
-                self._resolve_metadata_entry(
-                    entry,
-                    entry["jahr"],
-                    entry["monat"],
-                    entry["tag"],
-                    entry["name"],
-                )
-            )
-
-        return resolved_rows
+        return self.resolve_metadata_entries([dict(row) for row in rows])
 
     def get_entries_by_month_and_name(
         self, year: int, month: int, name: str
     ) -> List[Dict]:
         """Get all entries for a specific person in a specific month (joins both tables)."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
         # {arbeitsstunden_data, "metadata":{metadata}}
 
         rows = cursor.fetchall()
-        conn.close()
 
         return [dict(row) for row in rows]
 
     def get_entry(self, year: int, month: int, day: int, name: str) -> Optional[Dict]:
         """Get a single entry for a specific person on a specific date (joins both tables)."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         # Get metadata
@@ -1030,7 +1786,6 @@ class Database:
         metadata = cursor.fetchone()
 
         if not metadata:
-            conn.close()
             return None
 
         result = self._resolve_metadata_entry(dict(metadata), year, month, day, name)
@@ -1047,12 +1802,11 @@ class Database:
         arbeitsstunden = cursor.fetchall()
         result["arbeitsstunden"] = [dict(row) for row in arbeitsstunden]
 
-        conn.close()
         return result
 
     def clear_entries_for_day(self, year: int, month: int, day: int, name: str) -> int:
         """Clear all entries for a specific day (both metadata and arbeitsstunden)."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
         print("Clear entries for day:", year, month, day, name)
         try:
@@ -1076,15 +1830,15 @@ class Database:
             )
             metadata_count = cursor.rowcount
 
-            conn.commit()
+            self._commit(conn)
             return arbeitsstunden_count + metadata_count
 
         except sqlite3.Error as e:
             print(f"Database error clearing entries: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            if self._in_transaction():
+                raise
             return 0
-        finally:
-            conn.close()
 
     def get_entries_for_day(
         self, year: int, month: int, day: int, name: str
@@ -1098,34 +1852,43 @@ class Database:
         self, year: int, month: int, day: int, kostenstelle: str
     ) -> List[Dict]:
         """Get all entries for a specific construction site (kostenstelle) on a specific date."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        return self.get_entries_by_baustelle_in_range(year, month, [day], kostenstelle)
+
+    def get_entries_by_baustelle_in_range(
+        self, year: int, month: int, days, kostenstelle: str
+    ) -> List[Dict]:
+        """
+        Entries of a construction site (kostenstelle) on several days of a
+        month, ordered by day and name, with their resolved metadata. One
+        statement for all days instead of one get_entries_by_date_and_baustelle
+        per day.
+        """
+        days = sorted({int(day) for day in days})
+        if not days:
+            return []
+        conn = self.get_connection()
         cursor = conn.cursor()
 
-        # Query arbeitsstunden table with kostenstelle
-        # Try exact match first, then partial match (for "Nummer - Name" format)
+        # kostenstelle may be "Nummer - Name" or just the number
+        placeholders = ", ".join("?" * len(days))
         cursor.execute(
-            """
+            f"""
             SELECT a.*, tm.skug, tm.kg_8h, tm.travel_status, tm.fruehstueck, tm.mittag,
                    tm.no_skug, tm.urlaub, tm.krank, tm.id as metadata_id, tm.wochentag as metadata_wochentag
             FROM arbeitsstunden a
             LEFT JOIN tages_metadaten tm ON 
                 a.jahr = tm.jahr AND a.monat = tm.monat AND 
                 a.tag = tm.tag AND a.name = tm.name
-            WHERE a.jahr = ? AND a.monat = ? AND a.tag = ? 
-                AND (a.kostenstelle = ? OR a.kostenstelle LIKE ?)
-            ORDER BY a.name ASC
+            WHERE a.jahr = ? AND a.monat = ? AND a.tag IN ({placeholders})
+                AND a.baustelle_nummer = ?
+            ORDER BY a.tag ASC, a.name ASC, a.id ASC
         """,
-            (year, month, day, kostenstelle, f"{kostenstelle}%"),
+            (year, month, *days, parse_baustelle_nummer(kostenstelle)),
         )
 
-        rows = cursor.fetchall()
-        conn.close()
-
-        resolved_rows = []
-        for row in rows:
-            entry = dict(row)
-            resolved_metadata = self._resolve_metadata_entry(
+        entries = [dict(row) for row in cursor.fetchall()]
+        resolved_metadata_rows = self.resolve_metadata_entries(
+            [
                 {
                     "id": entry.get("metadata_id"),
                     "wochentag": entry.get("metadata_wochentag"),
@@ -1137,12 +1900,17 @@ class Database:
                     "no_skug": entry.get("no_skug"),
                     "urlaub": entry.get("urlaub"),
                     "krank": entry.get("krank"),
-                },
-                entry["jahr"],
-                entry["monat"],
-                entry["tag"],
-                entry["name"],
-            )
+                    "jahr": entry["jahr"],
+                    "monat": entry["monat"],
+                    "tag": entry["tag"],
+                    "name": entry["name"],
+                }
+                for entry in entries
+            ]
+        )
+
+        resolved_rows = []
+        for entry, resolved_metadata in zip(entries, resolved_metadata_rows):
             entry["skug"] = resolved_metadata.get("skug")
             entry["kg_8h"] = resolved_metadata.get("kg_8h")
             entry["travel_status"] = resolved_metadata.get("travel_status")
@@ -1160,8 +1928,7 @@ class Database:
 
     def get_entries_by_date(self, year: int, month: int) -> List[Dict]:
         """Get entries for a specific month (joins both tables)."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -1183,38 +1950,290 @@ class Database:
         )
 
         rows = cursor.fetchall()
-        conn.close()
-
-        resolved_rows = []
-        for row in rows:
-            entry = dict(row)
-            resolved_rows.append(
-                self._resolve_metadata_entry(
-                    entry,
-                    entry["jahr"],
-                    entry["monat"],
-                    entry["tag"],
-                    entry["name"],
-                )
-            )
 
-        return resolved_rows
+        return self.resolve_metadata_entries([dict(row) for row in rows])
 
     def delete_entry_metadata(self, entry_id: int) -> bool:
         """Delete a metadata entry by ID (tages_metadaten table)."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
             cursor.execute("DELETE FROM tages_metadaten WHERE id = ?", (entry_id,))
-            conn.commit()
+            self._commit(conn)
             success = cursor.rowcount > 0
             return success
 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            if self._in_transaction():
+                raise
             return False
 
-        finally:
-            conn.close()
+
+class MonthSnapshot:
+    """
+    Read-only view of one month of data for all workers.
+
+    All arbeitsstunden, tages_metadaten and tagessummen rows of (year, month)
+    are loaded with one query each and indexed by (name, day). The read methods mirror the
+    signatures of Database, so a snapshot can be passed wherever only these
+    are used (export, preview, summary functions). Requests for another
+    month fall through to the database. Writes made after loading are not
+    visible; load a new snapshot instead.
+    """
+
+    def __init__(self, db: Database, year: int, month: int):
+        self.db = db
+        self.db_file = db.db_file
+        self.master_db = db.master_db
+        self.year = int(year)
+        self.month = int(month)
+        self.arbeitsstunden = {}
+        self.metadata = {}
+        self.day_totals = {}
+        self._resolved_metadata = {}
+        self._days_by_name = {}
+        self._resolve_context = None
+        self.load()
+
+    def load(self):
+        cursor = self.db.get_connection().cursor()
+        cursor.execute(
+            """
+            SELECT * FROM arbeitsstunden
+            WHERE jahr = ? AND monat = ?
+            ORDER BY id ASC
+        """,
+            (self.year, self.month),
+        )
+        arbeitsstunden = {}
+        for row in cursor.fetchall():
+            entry = dict(row)
+            arbeitsstunden.setdefault((entry["name"], entry["tag"]), []).append(entry)
+
+        cursor.execute(
+            """
+            SELECT * FROM tages_metadaten
+            WHERE jahr = ? AND monat = ?
+        """,
+            (self.year, self.month),
+        )
+        metadata = {(row["name"], row["tag"]): dict(row) for row in cursor.fetchall()}
+
+        day_totals = {
+            key: total["stunden"]
+            for key, total in self.db.get_tagessummen_for_month(
+                self.year, self.month
+            ).items()
+        }
+
+        days_by_name = {}
+        for name, day in set(arbeitsstunden) | set(metadata):
+            days_by_name.setdefault(name, []).append(day)
+        for days in days_by_name.values():
+            days.sort()
+
+        self.arbeitsstunden = arbeitsstunden
+        self.metadata = metadata
+        self.day_totals = day_totals
+        self._days_by_name = days_by_name
+        self._resolved_metadata = {}
+        self._resolve_context = None
+
+    def get_fahrstunden_for_month(
+        self, year: int, month: int, name: Optional[str] = None
+    ) -> Dict[str, float]:
+        return self.db.get_fahrstunden_for_month(year, month, name)
+
+    def get_verpflegungsgeld_for_month(
+        self, year: int, month: int, name: Optional[str] = None
+    ) -> Dict[str, float]:
+        return self.db.get_verpflegungsgeld_for_month(year, month, name)
+
+    def load_monthly_aggregates(self, year: int, month: int) -> "MonthlyAggregates":
+        return self.db.load_monthly_aggregates(year, month)
+
+    def get_baustelle_rates_for_month(self, year: int, month: int) -> Dict:
+        return self.db.get_baustelle_rates_for_month(year, month)
+
+    def covers(self, year: int, month: int) -> bool:
+        return int(year) == self.year and int(month) == self.month
+
+    def get_connection(self):
+        return self.db.get_connection()
+
+    def get_arbeitsstunden_for_day(
+        self, year: int, month: int, day: int, name: str
+    ) -> List[Dict]:
+        if not self.covers(year, month):
+            return self.db.get_arbeitsstunden_for_day(year, month, day, name)
+        return [dict(e) for e in self.arbeitsstunden.get((name, int(day)), [])]
+
+    def get_arbeitsstunden_for_month(
+        self, year: int, month: int, name: str
+    ) -> List[Dict]:
+        if not self.covers(year, month):
+            return self.db.get_arbeitsstunden_for_month(year, month, name)
+        entries = []
+        for day in self._days_by_name.get(name, []):
+            entries.extend(dict(e) for e in self.arbeitsstunden.get((name, day), []))
+        return entries
+
+    def get_day_total(self, year: int, month: int, day: int, name: str) -> float:
+        if not self.covers(year, month):
+            return self.db.get_day_total(year, month, day, name)
+        return self.day_totals.get((name, int(day)), 0.0)
+
+    def get_stored_metadata_by_date(
+        self, year: int, month: int, day: int, name: str
+    ) -> Optional[Dict]:
+        if not self.covers(year, month):
+            return self.db.get_stored_metadata_by_date(year, month, day, name)
+        metadata = self.metadata.get((name, int(day)))
+        return dict(metadata) if metadata else None
+
+    def get_stored_metadata_for_month(
+        self, year: int, month: int, name: str
+    ) -> List[Dict]:
+        if not self.covers(year, month):
+            return self.db.get_stored_metadata_for_month(year, month, name)
+        return [
+            dict(self.metadata[(name, day)])
+            for day in self._days_by_name.get(name, [])
+            if (name, day) in self.metadata
+        ]
+
+    def get_metadata_by_date(
+        self, year: int, month: int, day: int, name: str
+    ) -> Optional[Dict]:
+        if not self.covers(year, month):
+            return self.db.get_metadata_by_date(year, month, day, name)
+        resolved = self._resolve(name, int(day))
+        return dict(resolved) if resolved else None
+
+    def get_metadata_for_month(self, year: int, month: int, name: str) -> List[Dict]:
+        if not self.covers(year, month):
+            return self.db.get_metadata_for_month(year, month, name)
+        return [
+            dict(self._resolve(name, day))
+            for day in self._days_by_name.get(name, [])
+            if (name, day) in self.metadata
+        ]
+
+    def _get_resolve_context(self) -> Dict:
+        if self._resolve_context is None:
+            self._resolve_context = self.db._load_resolve_context()
+        return self._resolve_context
+
+    def _resolve(self, name: str, day: int) -> Optional[Dict]:
+        key = (name, day)
+        if key not in self._resolved_metadata:
+            metadata = self.metadata.get(key)
+            day_entries = self.arbeitsstunden.get(key, [])
+            if metadata is None and not day_entries:
+                resolved = None
+            else:
+                resolved = self.db._resolve_metadata_entry(
+                    dict(metadata) if metadata else None,
+                    self.year,
+                    self.month,
+                    day,
+                    name,
+                    day_entries=day_entries,
+                    context=self._get_resolve_context(),
+                    day_total=self.day_totals.get(key, 0.0),
+                )
+            self._resolved_metadata[key] = resolved
+        return self._resolved_metadata[key]
+
+
+class MonthlyAggregates:
+    """
+    Summary figures of one month for all workers: Urlaub/Krank days and
+    hours, worked hours and Verpflegungsgeld.
+
+    The tages_metadaten and arbeitsstunden figures come from one GROUP BY
+    statement, the Verpflegungsgeld from get_verpflegungsgeld_for_month,
+    instead of one aggregate query per worker and figure. Values match
+    utils.get_days_of_urlaub, get_hours_of_urlaub, etc.
+    """
+
+    EMPTY = {
+        "urlaub_tage": 0,
+        "urlaub_stunden": 0,
+        "krank_tage": 0,
+        "krank_stunden": 0,
+        "stunden": 0,
+        "arbeitsstunden": 0,
+        "hat_baustellenarbeit": False,
+        "verpflegungsgeld": 0.0,
+    }
+
+    def __init__(self, db: Database, year: int, month: int):
+        self.year = int(year)
+        self.month = int(month)
+        self.rows = {}
+        self.load(db)
+
+    def load(self, db: Database):
+        cursor = db.get_connection().cursor()
+        cursor.execute(
+            """
+            WITH tage AS (
+                SELECT
+                    name,
+                    SUM(urlaub > 0) AS urlaub_tage,
+                    SUM(CASE WHEN urlaub > 0 THEN urlaub END) AS urlaub_stunden,
+                    SUM(krank > 0) AS krank_tage,
+                    SUM(CASE WHEN krank > 0 THEN krank END) AS krank_stunden
+                FROM tages_metadaten
+                WHERE jahr = ? AND monat = ?
+                GROUP BY name
+            ),
+            stunden AS (
+                SELECT
+                    name,
+                    SUM(stunden) AS stunden,
+                    SUM(CASE WHEN entry_kind = 'work' THEN stunden END)
+                        AS arbeitsstunden,
+                    MAX(entry_kind = 'work' AND COALESCE(kostenstelle, '') != '')
+                        AS hat_baustellenarbeit
+                FROM arbeitsstunden
+                WHERE jahr = ? AND monat = ?
+                GROUP BY name
+            )
+            SELECT
+                n.name,
+                COALESCE(t.urlaub_tage, 0) AS urlaub_tage,
+                COALESCE(t.urlaub_stunden, 0) AS urlaub_stunden,
+                COALESCE(t.krank_tage, 0) AS krank_tage,
+                COALESCE(t.krank_stunden, 0) AS krank_stunden,
+                COALESCE(s.stunden, 0) AS stunden,
+                COALESCE(s.arbeitsstunden, 0) AS arbeitsstunden,
+                COALESCE(s.hat_baustellenarbeit, 0) AS hat_baustellenarbeit
+            FROM (SELECT name FROM tage UNION SELECT name FROM stunden) n
+            LEFT JOIN tage t ON t.name = n.name
+            LEFT JOIN stunden s ON s.name = n.name
+        """,
+            (self.year, self.month, self.year, self.month),
+        )
+        rows = {}
+        for row in cursor.fetchall():
+            figures = dict(row)
+            name = figures.pop("name")
+            figures["hat_baustellenarbeit"] = bool(figures["hat_baustellenarbeit"])
+            rows[name] = figures
+
+        if db.master_db is not None:
+            for name, amount in db.get_verpflegungsgeld_for_month(
+                self.year, self.month
+            ).items():
+                rows.setdefault(name, dict(self.EMPTY))["verpflegungsgeld"] = amount
+
+        self.rows = rows
+
+    def for_name(self, name: str) -> Dict:
+        """Figures of one worker (zeros if they have no entries)."""
+        return {**self.EMPTY, **self.rows.get(name, {})}
@@ -10,4 +10,10 @@ class TravelStatus(StrEnum):
     Anreise = "Anreise"
     Abreise = "Abreise"
     Away24h = "24h_away"
-    Nicht = "Entfernen"
\ No newline at end of file
+    Nicht = "Entfernen"
+
+class EntryKind(StrEnum):
+    Work = "work"
+    Krank = "krank"
+    Urlaub = "urlaub"
+    Feiertag = "feiertag"
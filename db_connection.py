@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional
+
+
+class ConnectionManager:
+    """
+    Keeps one SQLite connection per thread for a database file.
+
+    Connections are opened lazily on first use in a thread and reused for all
+    following calls from that thread, so the Tk main thread and the preview
+    worker thread each get their own connection.
+
+    The PRAGMAs in DEFAULT_PRAGMAS can be overridden per instance. The
+    defaults are safe for a database on a network share (SMB/NFS), where
+    several computers open the same file: a rollback journal and no memory
+    mapping. WAL and mmap need shared memory between all clients; enable them
+    only if the file is on a local disk, e.g. with the sqlite_pragmas setting
+    {"journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": 134217728}.
+    """
+
+    DEFAULT_PRAGMAS = {
+        # Set explicitly so a file switched to WAL before goes back
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -16000,  # negative = KiB, i.e. ~16 MB page cache
+        "mmap_size": 0,
+        "busy_timeout": 5000,  # ms
+    }
+
+    def __init__(self, db_file: str, pragmas: Optional[Dict] = None):
+        self.db_file = db_file
+        self.pragmas = dict(self.DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._connect_hooks = {}
+
+    def set_connect_hook(self, key: str, hook: Optional[Callable]):
+        """
+        Run hook(conn) on every newly opened connection (e.g. to ATTACH
+        another database). Setting a hook closes the open connections so all
+        threads reopen with it; call it before handing out work to threads.
+        Passing None removes the hook.
+        """
+        if hook is None:
+            self._connect_hooks.pop(key, None)
+        else:
+            self._connect_hooks[key] = hook
+        self.close_all()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Return the connection of the calling thread, opening it if needed."""
+        conn = getattr(self._local, "connection", None)
+        thread_id = threading.get_ident()
+        with self._lock:
+            # close_all() drops the registry entry, so a stale thread-local
+            # connection is detected here and replaced.
+            if conn is not None and self._connections.get(thread_id) is conn:
+                return conn
+
+        conn = self._open_connection()
+        self._local.connection = conn
+        with self._lock:
+            self._connections[thread_id] = conn
+        return conn
+
+    def _open_connection(self) -> sqlite3.Connection:
+        busy_timeout = self.pragmas.get("busy_timeout") or 0
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=float(busy_timeout) / 1000.0,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma, value in self.pragmas.items():
+            if value is None:
+                continue
+            try:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            except sqlite3.Error as e:
+                print(f"Could not set PRAGMA {pragma}={value}: {e}")
+        for hook in list(self._connect_hooks.values()):
+            hook(conn)
+        return conn
+
+    def close_thread_connection(self):
+        """Close the connection of the calling thread (if any)."""
+        conn = getattr(self._local, "connection", None)
+        self._local.connection = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        if conn is not None:
+            self._close(conn)
+
+    def close_all(self):
+        """Close the connections of all threads."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            self._close(conn)
+
+    def _close(self, conn: sqlite3.Connection):
+        try:
+            conn.rollback()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error closing database connection: {e}")
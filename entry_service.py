@@ -1,3 +1,7 @@
+import sqlite3
+
+from database import default_metadata_row, entry_kind_for_kostenstelle
+from datatypes import EntryKind
 from utils import (
     get_weekday_abbr,
     handle_krank_urlaub,
@@ -20,26 +24,6 @@ class EntryService:
             )
         )
 
-    def preview_day_will_have_work_entry(self, year, month, day, name, edit_ops):
-        if self.day_has_work_entry(year, month, day, name):
-            return True
-        return any(
-            op_year == year
-            and op_month == month
-            and op_day == day
-            and op_name == name
-            and values.get("stunden") is not None
-            and values.get("kostenstelle")
-            for (
-                op_year,
-                op_month,
-                op_day,
-                op_name,
-                _entry_id,
-                _wb_row,
-            ), values in edit_ops.items()
-        )
-
     def parse_hours_input(self, raw_value):
         if raw_value is None:
             return None
@@ -58,81 +42,41 @@ class EntryService:
     def is_valid_kostenstelle(self, kostenstelle_input):
         if not kostenstelle_input:
             return False
-        if kostenstelle_input in ["Krank", "900", "940"]:
+        if entry_kind_for_kostenstelle(kostenstelle_input) != EntryKind.Work:
             return True
         return any(
             f"{b['nummer']} - {b['name']}" == kostenstelle_input
             for b in self.master_db.get_all_baustellen()
         )
 
-    def normalize_kostenstelle_input(self, raw_value):
-        if raw_value is None:
-            return None
-        text = str(raw_value).strip()
-        if not text:
-            return None
-        if text in ["Krank", "900", "940"]:
-            return text
-        if text.isdigit():
-            bst = self.master_db.get_baustelle_by_nummer(int(text))
-            if bst:
-                return f"{bst['nummer']} - {bst['name']}"
-        if self.is_valid_kostenstelle(text):
-            return text
-        return None
+    def apply_preview_changes(self, pending_edits, pending_flags):
+        unit_of_work = PreviewUnitOfWork(self)
+        unit_of_work.collect(pending_edits, pending_flags)
+        errors = unit_of_work.validate()
+        if errors:
+            return errors, set()
+        return unit_of_work.flush()
 
-    def create_entry_from_preview(self, year, month, day, name, stunden, kostenstelle):
-        if kostenstelle in ["Krank", "900", "940"]:
-            skug_settings = self.master_db.get_skug_settings()
-            handle_krank_urlaub(
-                year,
-                month,
-                day,
-                name,
-                self.db,
-                self.master_db,
-                kostenstelle == "Krank",
-                kostenstelle in ["900", "940"],
-                skug_settings,
-            )
-            return True
-        wochentag = get_weekday_abbr(year, month, str(day)) or ""
-        entry_data = {
-            "jahr": year,
-            "monat": month,
-            "tag": str(day),
-            "name": name,
-            "wochentag": wochentag,
-            "stunden": stunden,
-            "kostenstelle": kostenstelle,
-        }
-        self.db.add_arbeitsstunden(entry_data)
-        return False
-
-    def ensure_metadata_row_exists(self, year, month, day, name):
-        metadata_entry = self.db.get_stored_metadata_by_date(year, month, day, name)
-        if metadata_entry is not None:
-            return metadata_entry
-
-        metadata_entry = {
-            "jahr": year,
-            "monat": month,
-            "tag": str(day),
-            "name": name,
-            "wochentag": get_weekday_abbr(year, month, str(day)) or "",
-            "no_skug": False,
-            "travel_status": None,
-            "fruehstueck": False,
-            "mittag": False,
-            "urlaub": None,
-            "krank": None,
-        }
-        self.db.add_or_update_metadata(metadata_entry)
-        return metadata_entry
 
-    def apply_preview_changes(self, pending_edits, pending_flags):
-        errors = []
-        edit_ops = {}
+class PreviewUnitOfWork:
+    """
+    Collects the edits and flag changes of the preview, validates them against
+    month snapshots loaded once and writes them in a single transaction.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.db = service.db
+        self.master_db = service.master_db
+        self.errors = []
+        self.edit_ops = {}
+        self.pending_flags = {}
+        self._snapshots = {}
+        self._kostenstellen = None
+        self._baustellen_by_nummer = None
+
+    def collect(self, pending_edits, pending_flags):
+        self.pending_flags = pending_flags
 
         krank_urlaub_keys = {
             key
@@ -141,59 +85,59 @@ class EntryService:
         }
 
         for key, data in pending_edits.items():
-            cell_info = data.get("cell_info", {})
+            cell_info = data["cell_info"]  # month_report.CellInfo
             value = data.get("value")
-            field = cell_info.get("field")
-            year = cell_info.get("year")
-            month = cell_info.get("month")
-            day = cell_info.get("day")
-            name = cell_info.get("name")
-            entry_id = cell_info.get("entry_id")
+            field = cell_info.field
+            year, month, day, name = cell_info.day_key()
+            entry_id = cell_info.entry_id
             wb_row = key[0] + 1
 
             if not all([year, month, day, name]):
-                errors.append("Ungültige Zellzuordnung.")
+                self.errors.append("Ungültige Zellzuordnung.")
                 continue
 
             if (year, month, day, name) in krank_urlaub_keys:
                 continue
 
             op_key = (year, month, day, name, entry_id, wb_row)
-            if op_key not in edit_ops:
-                edit_ops[op_key] = {}
+            if op_key not in self.edit_ops:
+                self.edit_ops[op_key] = {}
 
             if field == "Stunden":
-                stunden = self.parse_hours_input(value)
+                stunden = self.service.parse_hours_input(value)
                 if stunden is None:
-                    errors.append(
+                    self.errors.append(
                         f"Ungültige Stunden bei {name} am {day}.{month}.{year}."
                     )
                     continue
-                edit_ops[op_key]["stunden"] = stunden
+                self.edit_ops[op_key]["stunden"] = stunden
             elif field == "Kostenstelle":
                 bst_value = self.normalize_kostenstelle_input(value)
                 if not bst_value:
-                    errors.append(
+                    self.errors.append(
                         f"Kostenstelle fehlt/ungültig bei {name} am {day}.{month}.{year}."
                     )
                     continue
-                if bst_value in ["Krank", "900", "940"]:
-                    errors.append(
+                if entry_kind_for_kostenstelle(bst_value) != EntryKind.Work:
+                    self.errors.append(
                         f"Krank/Urlaub bitte per Rechtsklick setzen: {name} am {day}.{month}.{year}."
                     )
                     continue
-                edit_ops[op_key]["kostenstelle"] = bst_value
+                self.edit_ops[op_key]["kostenstelle"] = bst_value
             else:
-                errors.append("Nicht editierbare Zelle geändert.")
+                self.errors.append("Nicht editierbare Zelle geändert.")
 
-        for key, flags in pending_flags.items():
+    def validate(self):
+        errors = self.errors
+
+        for key, flags in self.pending_flags.items():
             year, month, day, name = key
             if flags.get("krank") and flags.get("urlaub"):
                 errors.append(
                     f"Krank und Urlaub gleichzeitig bei {name} am {day}.{month}.{year}."
                 )
 
-        for op_key, values in edit_ops.items():
+        for op_key, values in self.edit_ops.items():
             year, month, day, name, entry_id, wb_row = op_key
             if entry_id is None and (
                 "stunden" not in values or "kostenstelle" not in values
@@ -202,7 +146,7 @@ class EntryService:
                     f"Stunden und Kostenstelle erforderlich bei {name} am {day}.{month}.{year}."
                 )
 
-        for key, flags in pending_flags.items():
+        for key, flags in self.pending_flags.items():
             year, month, day, name = key
             wants_day_metadata = (
                 flags.get("fruehstueck") is True
@@ -211,81 +155,204 @@ class EntryService:
             )
             if not wants_day_metadata:
                 continue
-            if not self.preview_day_will_have_work_entry(
-                year, month, day, name, edit_ops
-            ):
+            if not self.day_will_have_work_entry(year, month, day, name):
                 errors.append(
                     f"Fruehstueck, Mittag und Reise sind nur mit einem Arbeitseintrag erlaubt: {name} am {day}.{month}.{year}."
                 )
 
-        if errors:
-            return errors, set()
+        return errors
 
+    def flush(self):
+        """Write all collected changes. Returns (errors, affected_days)."""
         affected_days = set()
-        for key, flags in pending_flags.items():
-            year, month, day, name = key
-            if flags.get("krank") or flags.get("urlaub"):
-                skug_settings = self.master_db.get_skug_settings()
-                handle_krank_urlaub(
-                    year,
-                    month,
-                    day,
-                    name,
-                    self.db,
-                    self.master_db,
-                    bool(flags.get("krank")),
-                    bool(flags.get("urlaub")),
-                    skug_settings,
-                )
-                affected_days.add((year, month, day, name))
+        metadata_rows = {}
+        dirty_metadata_keys = []
+        new_entries = []
 
-        for op_key, values in edit_ops.items():
-            year, month, day, name, entry_id, wb_row = op_key
-            if (year, month, day, name) in affected_days:
-                continue
+        def mark_metadata_dirty(key):
+            if key not in dirty_metadata_keys:
+                dirty_metadata_keys.append(key)
+
+        try:
+            with self.db.transaction():
+                skug_settings = None
+                for key, flags in self.pending_flags.items():
+                    year, month, day, name = key
+                    if flags.get("krank") or flags.get("urlaub"):
+                        if skug_settings is None:
+                            skug_settings = self.master_db.get_skug_settings()
+                        handle_krank_urlaub(
+                            year,
+                            month,
+                            day,
+                            name,
+                            self.db,
+                            self.master_db,
+                            bool(flags.get("krank")),
+                            bool(flags.get("urlaub")),
+                            skug_settings,
+                        )
+                        affected_days.add((year, month, day, name))
+
+                for op_key, values in self.edit_ops.items():
+                    year, month, day, name, entry_id, wb_row = op_key
+                    day_key = (year, month, day, name)
+                    if day_key in affected_days:
+                        continue
 
-            if entry_id is None:
-                self.create_entry_from_preview(
-                    year, month, day, name, values["stunden"], values["kostenstelle"]
+                    if entry_id is None:
+                        new_entries.append(
+                            {
+                                "jahr": year,
+                                "monat": month,
+                                "tag": str(day),
+                                "name": name,
+                                "wochentag": get_weekday_abbr(year, month, str(day))
+                                or "",
+                                "stunden": values["stunden"],
+                                "kostenstelle": values["kostenstelle"],
+                            }
+                        )
+                    else:
+                        update_data = {}
+                        if "stunden" in values:
+                            update_data["Stunden"] = values["stunden"]
+                        if "kostenstelle" in values:
+                            update_data["Kostenstelle"] = values["kostenstelle"]
+                        if update_data:
+                            if not self.db.update_arbeitsstunden(entry_id, update_data):
+                                raise _FlushError(
+                                    "Änderung konnte nicht gespeichert werden."
+                                )
+
+                    # Every day with an entry gets a tages_metadaten row
+                    if day_key not in metadata_rows:
+                        stored = self.get_stored_metadata(year, month, day, name)
+                        if stored is None:
+                            stored = self.new_metadata_row(year, month, day, name)
+                            mark_metadata_dirty(day_key)
+                        metadata_rows[day_key] = stored
+                    affected_days.add(day_key)
+
+                for key, flags in self.pending_flags.items():
+                    year, month, day, name = key
+                    if flags.get("krank") or flags.get("urlaub"):
+                        continue
+                    metadata_entry = metadata_rows.get(key)
+                    if metadata_entry is None:
+                        metadata_entry = self.get_stored_metadata(year, month, day, name)
+                    if metadata_entry is None:
+                        metadata_entry = self.new_metadata_row(year, month, day, name)
+                    metadata_entry.update(
+                        {
+                            "jahr": year,
+                            "monat": month,
+                            "tag": str(day),
+                            "name": name,
+                            "wochentag": get_weekday_abbr(year, month, str(day)) or "",
+                        }
+                    )
+                    if "fruehstueck" in flags:
+                        metadata_entry["fruehstueck"] = flags["fruehstueck"]
+                    if "mittag" in flags:
+                        metadata_entry["mittag"] = flags["mittag"]
+                    if "no_skug" in flags:
+                        metadata_entry["no_skug"] = flags["no_skug"]
+                    if "travel_status" in flags:
+                        metadata_entry["travel_status"] = flags["travel_status"]
+                    metadata_rows[key] = metadata_entry
+                    mark_metadata_dirty(key)
+                    affected_days.add(key)
+
+                self.db.add_arbeitsstunden_many(new_entries)
+                self.db.upsert_metadata_many(
+                    [metadata_rows[key] for key in dirty_metadata_keys]
                 )
-            else:
-                update_data = {}
-                if "stunden" in values:
-                    update_data["Stunden"] = values["stunden"]
-                if "kostenstelle" in values:
-                    update_data["Kostenstelle"] = values["kostenstelle"]
-                if update_data:
-                    if not self.db.update_arbeitsstunden(entry_id, update_data):
-                        return ["Änderung konnte nicht gespeichert werden."], set()
-
-            self.ensure_metadata_row_exists(year, month, day, name)
-            affected_days.add((year, month, day, name))
-
-        for key, flags in pending_flags.items():
-            year, month, day, name = key
-            if flags.get("krank") or flags.get("urlaub"):
-                continue
-            metadata_entry = self.db.get_stored_metadata_by_date(year, month, day, name)
-            if metadata_entry is None:
-                metadata_entry = {}
-            metadata_entry.update(
-                {
-                    "jahr": year,
-                    "monat": month,
-                    "tag": str(day),
-                    "name": name,
-                    "wochentag": get_weekday_abbr(year, month, str(day)) or "",
-                }
-            )
-            if "fruehstueck" in flags:
-                metadata_entry["fruehstueck"] = flags["fruehstueck"]
-            if "mittag" in flags:
-                metadata_entry["mittag"] = flags["mittag"]
-            if "no_skug" in flags:
-                metadata_entry["no_skug"] = flags["no_skug"]
-            if "travel_status" in flags:
-                metadata_entry["travel_status"] = flags["travel_status"]
-            self.db.add_or_update_metadata(metadata_entry)
-            affected_days.add((year, month, day, name))
-
-        return errors, affected_days
+        except _FlushError as e:
+            return [str(e)], set()
+        except sqlite3.Error as e:
+            # transaction() rolled back everything
+            return [f"Datenbankfehler: {e}"], set()
+
+        return [], affected_days
+
+    # --- Lookups served from the snapshots / master data loaded once ---
+    def get_snapshot(self, year, month):
+        key = (int(year), int(month))
+        if key not in self._snapshots:
+            self._snapshots[key] = self.db.load_month_snapshot(*key)
+        return self._snapshots[key]
+
+    def get_stored_metadata(self, year, month, day, name):
+        return self.get_snapshot(year, month).get_stored_metadata_by_date(
+            year, month, day, name
+        )
+
+    def day_has_work_entry(self, year, month, day, name):
+        """EntryService.day_has_work_entry, answered from the snapshot."""
+        snapshot = self.get_snapshot(year, month)
+        if not snapshot.get_arbeitsstunden_for_day(year, month, day, name):
+            return False
+        return not any(
+            (metadata.get("krank") or 0) > 0 or (metadata.get("urlaub") or 0) > 0
+            for metadata in snapshot.get_stored_metadata_for_month(year, month, name)
+        )
+
+    def day_will_have_work_entry(self, year, month, day, name):
+        if self.day_has_work_entry(year, month, day, name):
+            return True
+        return any(
+            op_year == year
+            and op_month == month
+            and op_day == day
+            and op_name == name
+            and values.get("stunden") is not None
+            and values.get("kostenstelle")
+            for (
+                op_year,
+                op_month,
+                op_day,
+                op_name,
+                _entry_id,
+                _wb_row,
+            ), values in self.edit_ops.items()
+        )
+
+    def new_metadata_row(self, year, month, day, name):
+        return default_metadata_row(
+            year, month, day, name, get_weekday_abbr(year, month, str(day)) or ""
+        )
+
+    def normalize_kostenstelle_input(self, raw_value):
+        """
+        Kostenstelle as "Nummer - Name" for a Baustelle number or name, the
+        input itself for Krank/Urlaub/Feiertag, None if it is unknown.
+        """
+        if raw_value is None:
+            return None
+        text = str(raw_value).strip()
+        if not text:
+            return None
+        if entry_kind_for_kostenstelle(text) != EntryKind.Work:
+            return text
+        self._load_baustellen()
+        if text.isdigit():
+            bst = self._baustellen_by_nummer.get(str(int(text)))
+            if bst:
+                return f"{bst['nummer']} - {bst['name']}"
+        if text in self._kostenstellen:
+            return text
+        return None
+
+    def _load_baustellen(self):
+        if self._kostenstellen is not None:
+            return
+        self._kostenstellen = set()
+        self._baustellen_by_nummer = {}
+        for bst in self.master_db.get_all_baustellen():
+            self._kostenstellen.add(f"{bst['nummer']} - {bst['name']}")
+            self._baustellen_by_nummer.setdefault(str(bst["nummer"]), bst)
+
+
+class _FlushError(Exception):
+    pass
@@ -1,51 +1,54 @@
 from openpyxl import Workbook
-import openpyxl
-from openpyxl.styles import Border, Side, Alignment, Font
+from openpyxl.styles import Border
 from openpyxl.utils import get_column_letter
 import calendar
+import csv
 from database import Database
 from master_data import MasterDataDatabase
 from utils import (
     get_days_of_krank,
     get_days_of_urlaub,
-    get_fahrstunden_for_name,
     get_normal_hours_per_month,
-    get_verpflegungsgeld_for_name,
     is_holiday,
     is_weekend,
     calculate_skug,
-    has_baustellen_arbeitsstunden
 )
 from utils import (
-    get_hours_of_krank,
-    get_hours_of_urlaub,
     get_days_of_feiertag,
     get_hours_of_feiertag,
 )
 from utils import get_skug_hours_for_name
 from datatypes import WorkerTypes
+from month_report import (
+    DayLine,
+    MonthReport,
+    ReportSection,
+    WorkerDay,
+    build_month_report,
+)
+from xlsx_stream import SheetBuffer
+from excel_styles import (
+    ALIGN_CENTER,
+    ALIGN_LEFT,
+    AN_AB_COLOR,
+    FONT_BOLD,
+    BorderPlan,
+    FREE_DAY_COLOR,
+    LATTICE_BORDER,
+    SKUG_COLOR,
+    THICK,
+    THICK_BORDER,
+    UNTER_8H_COLOR,
+    apply_style,
+    edge_border,
+    legend_font,
+    merge_borders,
+    solid_fill,
+)
 
 
 def AddBorders(border_one: Border, border_two: Border) -> Border:
-    sides = ["left", "right", "top", "bottom", "diagonal", "vertical", "horizontal"]
-    border_kwargs = {}
-    for side in sides:
-        try:
-            side_one = getattr(border_one, side)
-        except AttributeError:
-            side_one = None
-        try:
-            side_two = getattr(border_two, side)
-        except AttributeError:
-            side_two = None
-        if side_one is None and side_two is None:
-            continue
-
-        if side_one is not None:
-            border_kwargs[side] = side_one if side_one.style is not None else side_two
-        else:
-            border_kwargs[side] = side_two
-    return Border(**border_kwargs)
+    return merge_borders(border_one, border_two)
 
 
 def addLattice(min_row, max_row, min_col, max_col, ws: Workbook):
@@ -53,44 +56,34 @@ def addLattice(min_row, max_row, min_col, max_col, ws: Workbook):
         min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col
     ):
         for cell in row:
-            cell.border = AddBorders(
-                cell.border,
-                Border(
-                    left=Side(style="thin"),
-                    right=Side(style="thin"),
-                    top=Side(style="thin"),
-                    bottom=Side(style="thin"),
-                ),
-            )
+            apply_style(cell, border=AddBorders(cell.border, LATTICE_BORDER))
 
 
 def set_create_border(min_row, max_row, min_col, max_col, side_style, ws: Workbook):
+    top = edge_border("top", side_style)
+    bottom = edge_border("bottom", side_style)
+    left = edge_border("left", side_style)
+    right = edge_border("right", side_style)
     for row in ws.iter_rows(
         min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col
     ):
         for cell in row:
             if cell.row == min_row:
-                cell.border = AddBorders(cell.border, Border(top=side_style))
+                apply_style(cell, border=AddBorders(cell.border, top))
             if cell.row == max_row:
-                cell.border = AddBorders(cell.border, Border(bottom=side_style))
+                apply_style(cell, border=AddBorders(cell.border, bottom))
             if cell.column == min_col:
-                cell.border = AddBorders(cell.border, Border(left=side_style))
+                apply_style(cell, border=AddBorders(cell.border, left))
             if cell.column == max_col:
-                cell.border = AddBorders(cell.border, Border(right=side_style))
-
+                apply_style(cell, border=AddBorders(cell.border, right))
 
-SKUG_COLOR = "92d050"
-UNTER_8H_COLOR = "b8cce4"
-AN_AB_COLOR = "ff0000"
-FREE_DAY_COLOR = "ffc000"  # Orange color for weekends and holidays
 
-# Define thick border style
-thick_border = Border(
-    left=Side(style="thick"),
-    right=Side(style="thick"),
-    top=Side(style="thick"),
-    bottom=Side(style="thick"),
-)
+# Highlights of a worker's day lines (month_report.WorkerDay.flags)
+FLAG_COLORS = {
+    "unter_8h": UNTER_8H_COLOR,
+    "skug": SKUG_COLOR,
+    "an_ab": AN_AB_COLOR,
+}
 
 summary_labels = [
     "Gesamtstunden",
@@ -111,81 +104,45 @@ def build_workbook_top_to_bottom(
     master_db: MasterDataDatabase,
     cell_map: dict | None = None,
 ):
-    unique_names = master_db.get_all_names_list()
-
-    all_persons = master_db.get_all_names()
-    person_lookup = {p["name"]: p for p in all_persons}
-    for name in unique_names:
-        person_lookup[name]["arbeits_entries"] = db.get_arbeitsstunden_for_month(
-            year, month, name
-        )
-        person_lookup[name]["h_flag"] = has_baustellen_arbeitsstunden(
-            name, month, year, db, master_db, exclude_baustellen=["900"]
-        ) and person_lookup[name]["worker_type"] == WorkerTypes.Fest
-        
-
-    if not unique_names:
-        print("No names found in entries")
-        return None
-
-    names_for_normal_table = [
-        name for name in unique_names if not person_lookup[name]["extra_table"]
-    ]
-    names_for_extra_table = [
-        name for name in unique_names if person_lookup[name]["extra_table"]
-    ]
-
     wb = Workbook()
-    ws = wb.active
-    ws.title = f"{year}-{month:02d}"
-    current_col = 1
-    names_per_section = 99
-    next_column = 1
-
-    num_sections = (
-        len(names_for_normal_table) + names_per_section - 1
-    ) // names_per_section
-
-    for section_idx in range(num_sections):
-        start_idx = section_idx * names_per_section
-        end_idx = min(start_idx + names_per_section, len(names_for_normal_table))
-        section_names = names_for_normal_table[start_idx:end_idx]
-        datum_col = section_idx * 2 * (names_per_section + 1) + 1
-        info_cell = ws.cell(row=1, column=datum_col)
-        info_cell.value = f"Stundenliste - {calendar.month_name[month]} {year}"
-        add_section(
-            datum_col,
-            3,
-            ws,
-            year,
-            month,
-            section_names,
-            person_lookup,
-            db,
-            master_db,
-            cell_map,
-        )
-        next_column = datum_col + len(section_names) * 2 + 2
+    if not draw_month_top_to_bottom(wb.active, year, month, db, master_db, cell_map):
+        return None
+    return wb
 
-    for i, name in enumerate(names_for_extra_table):
-        add_section(
-            next_column + 2 + i * 6,
-            3,
-            ws,
-            year,
-            month,
-            [name],
-            person_lookup,
-            db,
-            master_db,
-            cell_map,
-        )
 
-    for col in range(1, next_column + 2 + len(names_for_extra_table) * 6):
+def draw_month_top_to_bottom(
+    ws,
+    year: int,
+    month: int,
+    db: Database,
+    master_db: MasterDataDatabase,
+    cell_map: dict | None = None,
+) -> bool:
+    """
+    Draw the Stundenliste of a month into ws (an openpyxl Worksheet or a
+    xlsx_stream.SheetBuffer). Returns False if there are no names.
+    """
+    report = build_month_report(year, month, db, master_db)
+    if report is None:
+        return False
+    draw_month_report(ws, report)
+    if cell_map is not None:
+        cell_map.update(report.cell_map)
+    return True
+
+
+def draw_month_report(ws, report: MonthReport):
+    """Draw a MonthReport into ws (an openpyxl Worksheet or a SheetBuffer)."""
+    ws.title = report.title
+    for section in report.sections:
+        if section.title is not None:
+            info_cell = ws.cell(row=1, column=section.col)
+            info_cell.value = section.title
+        add_section(ws, report, section)
+
+    for col in range(1, report.num_columns + 1):
         ws.column_dimensions[get_column_letter(col)].width = 12
 
-    return wb
-
 
 def export_to_excel_top_to_bottom(
     year: int,
@@ -193,10 +150,14 @@ def export_to_excel_top_to_bottom(
     db: Database,
     master_db: MasterDataDatabase,
     filename: str = None,
+    streaming: bool = False,
 ):
     if filename is None:
         filename = f"stundenliste_{year}_{month:02d}.xlsx"
 
+    if streaming:
+        return export_year_to_excel(year, db, master_db, filename, months=[month])
+
     wb = build_workbook_top_to_bottom(year, month, db, master_db)
     if wb is None:
         return False
@@ -209,25 +170,87 @@ def export_to_excel_top_to_bottom(
         return False
 
 
-def add_section(
-    col,
-    row,
-    ws,
-    year,
-    month,
-    section_names,
-    person_lookup,
+def export_year_to_excel(
+    year: int,
     db: Database,
     master_db: MasterDataDatabase,
-    cell_map: dict | None = None,
+    filename: str = None,
+    months=range(1, 13),
 ):
-    add_datum_header(col, 3, ws, year, month)
-    num_days = calendar.monthrange(year, month)[1]
-    name_to_col_map = {}
+    """
+    Export the months into one workbook, one sheet per month, with the
+    streaming backend (see xlsx_stream). Only the month being drawn is kept
+    in memory. Months without names are skipped.
+    """
+    if filename is None:
+        filename = f"stundenliste_{year}.xlsx"
+
+    wb = Workbook(write_only=True)
+    styles = {}
+    sheets = 0
+    for month in months:
+        sheet = SheetBuffer()
+        if not draw_month_top_to_bottom(sheet, year, month, db, master_db):
+            continue
+        sheet.write_to(wb, styles)
+        sheets += 1
+    if not sheets:
+        return False
+
+    try:
+        wb.save(filename)
+        return True
+    except Exception as e:
+        print(f"Error saving Excel file: {e}")
+        return False
 
-    for i, name in enumerate(section_names):
-        name_col = col + 2 + i * 2
-        name_to_col_map[name] = name_col
+
+def export_report_to_csv(report: MonthReport, filename: str = None):
+    """
+    Write the cell values of a MonthReport as CSV (semicolon separated, with
+    decimal commas) in the layout of the Excel sheet.
+    """
+    if filename is None:
+        filename = f"stundenliste_{report.year}_{report.month:02d}.csv"
+
+    sheet = SheetBuffer()
+    draw_month_report(sheet, report)
+    try:
+        with open(filename, "w", newline="", encoding="utf-8-sig") as csv_file:
+            writer = csv.writer(csv_file, delimiter=";")
+            for row in sheet.iter_rows(1, sheet.max_row, 1, sheet.max_column):
+                writer.writerow([_csv_value(cell) for cell in row])
+        return True
+    except Exception as e:
+        print(f"Error saving CSV file: {e}")
+        return False
+
+
+def _csv_value(cell):
+    value = cell.value
+    if value is None:
+        return ""
+    if isinstance(value, float) or (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and cell.number_format == "0.00"
+    ):
+        return f"{float(value):.2f}".replace(".", ",")
+    return value
+
+
+def add_section(ws, report: MonthReport, section: ReportSection):
+    col = section.col
+    year, month = report.year, report.month
+    section_names = section.names
+    person_lookup = report.person_lookup
+
+    # Borders are planned while laying out the section and drawn once at the end
+    borders = BorderPlan()
+    add_datum_header(col, 3, ws, year, month, borders)
+
+    for name in section_names:
+        name_col = section.name_cols[name]
 
         # Write name (1x2 merged cell in row 3)
         ws.merge_cells(
@@ -236,373 +259,296 @@ def add_section(
 
         name_cell = ws.cell(row=3, column=name_col)
         name_cell.value = name
-        name_cell.alignment = Alignment(horizontal="center", vertical="center")
-        name_cell.font = Font(bold=True)
+        apply_style(name_cell, alignment=ALIGN_CENTER)
+        apply_style(name_cell, font=FONT_BOLD)
         person_data = person_lookup.get(name, {})
         kein_verpflegung = bool(person_data.get("kein_verpflegungsgeld", 0))
 
         if not kein_verpflegung:
-            name_cell.fill = openpyxl.styles.PatternFill(
-                start_color=UNTER_8H_COLOR, end_color=UNTER_8H_COLOR, fill_type="solid"
-            )
+            apply_style(name_cell, fill=solid_fill(UNTER_8H_COLOR))
 
-        # Apply thick border to name header
-        set_create_border(
-            min_row=3,
-            max_row=4,
-            min_col=name_col,
-            max_col=name_col + 1,
-            side_style=Side(style="thick"),
-            ws=ws,
-        )
+        # Thick border around name header
+        borders.thick_box(3, 4, name_col, name_col + 1)
 
         # Write "Std." and "Bst." in row 4
         std_cell = ws.cell(row=4, column=name_col)
         std_cell.value = "Std."
-        std_cell.alignment = Alignment(horizontal="center", vertical="center")
+        apply_style(std_cell, alignment=ALIGN_CENTER)
 
         bst_cell = ws.cell(row=4, column=name_col + 1)
         bst_cell.value = "Bst."
-        bst_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    row = 5
-    for day in range(1, num_days + 1):
-        arbeits_entries = {
-            name: db.get_arbeitsstunden_for_day(year, month, day, name)
-            for name in section_names
-        }
-        max_entries = max(
-            max([len(entries) for entries in arbeits_entries.values()]), 1
-        )
-        if cell_map is not None:
-            for name in arbeits_entries:
-                entries = arbeits_entries[name]
-                name_col = name_to_col_map[name]
-                for j in range(max_entries):
-                    entry = entries[j] if j < len(entries) else None
-                    entry_id = entry.get("id") if entry else None
-                    row_for_entry = row + j
-                    cell_map[(row_for_entry, name_col)] = {
-                        "year": year,
-                        "month": month,
-                        "day": day,
-                        "name": name,
-                        "field": "Stunden",
-                        "entry_id": entry_id,
-                    }
-                    cell_map[(row_for_entry, name_col + 1)] = {
-                        "year": year,
-                        "month": month,
-                        "day": day,
-                        "name": name,
-                        "field": "Kostenstelle",
-                        "entry_id": entry_id,
-                    }
-        for j in range(max_entries):
+        apply_style(bst_cell, alignment=ALIGN_CENTER)
+
+    for report_day in section.days:
+        row = report_day.row
+        for j in range(report_day.num_lines):
             date_cell = ws.cell(row=row + j, column=col)
             ws.merge_cells(
                 start_row=row + j, start_column=col, end_row=row + j, end_column=col + 1
             )
 
-            date_cell.value = f"{day}."
-            date_cell.alignment = Alignment(horizontal="center", vertical="center")
-            # Color date cell if it's a weekend or holiday
-            color_cell_weekend(
-                col, row + j, ws, year, month, day, 2 * len(section_names) + 2
-            )
+            date_cell.value = f"{report_day.day}."
+            apply_style(date_cell, alignment=ALIGN_CENTER)
+            # Color date row if it's a weekend or holiday
+            if report_day.free_day:
+                fill = solid_fill(FREE_DAY_COLOR)
+                for col_ in range(col, section.max_col + 1):
+                    apply_style(ws.cell(row=row + j, column=col_), fill=fill)
 
-        if is_holiday(year, month, day) and not is_weekend(year, month, day):
-            for name in arbeits_entries:
-                person_data = person_lookup.get(name, {})
-                worker_type = person_data.get("worker_type", "Fest")
-                std_cell_data = ws.cell(row=row + j, column=name_to_col_map[name])
-                bst_cell_data = ws.cell(row=row + j, column=name_to_col_map[name] + 1)
-                std_cell_data.alignment = Alignment(
-                    horizontal="center", vertical="center"
-                )
-                bst_cell_data.alignment = Alignment(
-                    horizontal="center", vertical="center"
-                )
-
-                if (
-                    worker_type == WorkerTypes.Gewerblich
-                    and not person_lookup[name]["keine_feiertagssstunden"]
-                ):
-                    std_cell_data.value = "F"
-                    bst_cell_data.value = "940"
-                elif person_data.get("h_flag", False):
-                    weekly_hours = person_data.get("weekly_hours", 0.0)
-                    std_cell_data.number_format = "0.00"
-                    std_cell_data.value = weekly_hours / 5.0
-                    bst_cell_data.value = "F"
-                elif worker_type == WorkerTypes.Fest:
-                    std_cell_data.value = "F"
-                    bst_cell_data.value = "900"
-
-        for name in arbeits_entries:
-            meta_data = db.get_metadata_by_date(year, month, day, name)
-            if meta_data is None:
-                meta_data = {}
-            person_data = person_lookup.get(name, {})
-            worker_type = person_data.get("worker_type", "Fest")
-            h_flag = person_data.get("h_flag", False)
-            kein_verpflegung = bool(person_data.get("kein_verpflegungsgeld", 0))
-
-            for j, entry in enumerate(arbeits_entries[name]):
-                std_cell_data = ws.cell(row=row + j, column=name_to_col_map[name])
-                bst_cell_data = ws.cell(row=row + j, column=name_to_col_map[name] + 1)
-                std_cell_data.alignment = Alignment(
-                    horizontal="center", vertical="center"
-                )
-                bst_cell_data.alignment = Alignment(
-                    horizontal="center", vertical="center"
-                )
-                kostenstelle = entry.get("kostenstelle", "")
-                if meta_data.get("kg_8h", False) and not kein_verpflegung:
-                    std_cell_data.fill = openpyxl.styles.PatternFill(
-                        start_color=UNTER_8H_COLOR,
-                        end_color=UNTER_8H_COLOR,
-                        fill_type="solid",
-                    )
-                    bst_cell_data.fill = openpyxl.styles.PatternFill(
-                        start_color=UNTER_8H_COLOR,
-                        end_color=UNTER_8H_COLOR,
-                        fill_type="solid",
-                    )
-                skug_value = meta_data.get("skug")
-                try:
-                    skug_value = float(skug_value)
-                except (TypeError, ValueError):
-                    skug_value = 0.0
-                if skug_value >= 1:
-                    std_cell_data.fill = openpyxl.styles.PatternFill(
-                        start_color=SKUG_COLOR, end_color=SKUG_COLOR, fill_type="solid"
-                    )
-                    bst_cell_data.fill = openpyxl.styles.PatternFill(
-                        start_color=SKUG_COLOR, end_color=SKUG_COLOR, fill_type="solid"
-                    )
-                if meta_data.get("travel_status", False):
-                    std_cell_data.fill = openpyxl.styles.PatternFill(
-                        start_color=AN_AB_COLOR,
-                        end_color=AN_AB_COLOR,
-                        fill_type="solid",
-                    )
-                    bst_cell_data.fill = openpyxl.styles.PatternFill(
-                        start_color=AN_AB_COLOR,
-                        end_color=AN_AB_COLOR,
-                        fill_type="solid",
-                    )
-
-                if meta_data.get("krank", False):
-                    if h_flag:
-                        weekly_hours = person_data.get("weekly_hours", 0.0)
-                        std_cell_data.number_format = "0.00"
-                        std_cell_data.value = weekly_hours / 5.0
-                        bst_cell_data.value = "K"
-                    else:
-                        std_cell_data.value = f"K"
-                        bst_cell_data.value = 900 if worker_type == WorkerTypes.Fest else "930"
-                elif meta_data.get("urlaub", False):
-                    if h_flag:
-                        weekly_hours = person_data.get("weekly_hours", 0.0)
-                        std_cell_data.number_format = "0.00"
-                        std_cell_data.value = weekly_hours / 5.0
-                        bst_cell_data.value = "U"
-                    else:
-                        std_cell_data.value = "U"
-                        bst_cell_data.value = 900 if worker_type == WorkerTypes.Fest else "940"
-
-                else:
-                    std_cell_data.value = entry.get("stunden", 0)
-                    std_cell_data.number_format = "0.00"
-                    bst_cell_data.value = int(kostenstelle.split(" - ")[0])
-        row += max_entries
+        for name in section_names:
+            draw_worker_day(
+                ws,
+                row,
+                report_day.num_lines,
+                section.name_cols[name],
+                report.workers[name].days[report_day.day],
+            )
 
     # Thick border around dates
+    row = section.summary_row
     for i in range(len(section_names) + 1):
-        set_create_border(
-            min_row=5,
-            max_row=row - 1,
-            min_col=col + i * 2,
-            max_col=col + i * 2 + 1,
-            side_style=Side(style="thick"),
-            ws=ws,
-        )
+        borders.thick_box(5, row - 1, col + i * 2, col + i * 2 + 1)
 
-    # Add summary rows under this section
-    add_summary_rows(col, row, ws)
+    # Add summary rows under this section; the values come from the report
+    add_summary_rows(col, row, ws, borders)
     fill_summary_rows(
-        col + 2, row, ws, section_names, person_lookup, year, month, master_db, db
+        col + 2,
+        row,
+        ws,
+        section_names,
+        person_lookup,
+        year,
+        month,
+        borders,
     )
     add_legend(col, row + len(summary_labels), ws)
-    max_row = row + len(summary_labels) - 1
-    max_col = col + len(section_names) * 2 + 1
-    addLattice(3, max_row, col, max_col, ws)
+    # Thick boxes as planned, thin lattice everywhere else
+    borders.write(ws, 3, section.max_row, col, section.max_col)
 
 
-def color_cell_weekend(col, row, ws, year, month, day, num_cols):
-    if is_weekend(year, month, day) or is_holiday(year, month, day):
-        for col_ in range(col, col + num_cols):
-            ws.cell(row=row, column=col_).fill = openpyxl.styles.PatternFill(
-                start_color=FREE_DAY_COLOR, end_color=FREE_DAY_COLOR, fill_type="solid"
-            )
-
+def draw_worker_cells(ws, report: MonthReport, name, days) -> list:
+    """
+    Draw only a worker's cells of the given days and its summary values, as
+    add_section draws them. Returns the (row, column) of all cells of these
+    blocks, drawn or empty, e.g. to patch a shown report.
+    """
+    section = report.section_by_name[name]
+    name_col = section.name_cols[name]
+    columns = (name_col, name_col + 1)
+    coordinates = []
+    for report_day in section.days:
+        if report_day.day not in days:
+            continue
+        rows = range(report_day.row, report_day.row + report_day.num_lines)
+        if report_day.free_day:
+            fill = solid_fill(FREE_DAY_COLOR)
+            for row in rows:
+                for col_ in columns:
+                    apply_style(ws.cell(row=row, column=col_), fill=fill)
+        draw_worker_day(
+            ws,
+            report_day.row,
+            report_day.num_lines,
+            name_col,
+            report.workers[name].days[report_day.day],
+        )
+        coordinates.extend((row, col_) for row in rows for col_ in columns)
 
-def add_datum_header(col, row, ws, year, month):
+    summary_row = section.summary_row
+    fill_summary_rows(
+        name_col,
+        summary_row,
+        ws,
+        [name],
+        report.person_lookup,
+        report.year,
+        report.month,
+        BorderPlan(),
+    )
+    coordinates.extend(
+        (row, col_)
+        for row in range(summary_row, summary_row + len(summary_labels))
+        for col_ in columns
+    )
+    return coordinates
+
+
+def draw_worker_day(ws, row, num_lines, name_col, worker_day: WorkerDay):
+    """Draw a worker's day (see month_report.WorkerDay) from sheet row row on."""
+    if worker_day.holiday_line is not None:
+        draw_day_line(ws, row + num_lines - 1, name_col, worker_day.holiday_line)
+    for j, line in enumerate(worker_day.lines):
+        std_cell, bst_cell = draw_day_line(ws, row + j, name_col, line)
+        for flag in worker_day.flags:
+            fill = solid_fill(FLAG_COLORS[flag])
+            apply_style(std_cell, fill=fill)
+            apply_style(bst_cell, fill=fill)
+
+
+def draw_day_line(ws, row, name_col, line: DayLine):
+    std_cell = ws.cell(row=row, column=name_col)
+    bst_cell = ws.cell(row=row, column=name_col + 1)
+    apply_style(std_cell, alignment=ALIGN_CENTER)
+    apply_style(bst_cell, alignment=ALIGN_CENTER)
+    if line.number_format is not None:
+        std_cell.number_format = line.number_format
+    std_cell.value = line.stunden
+    bst_cell.value = line.kostenstelle
+    return std_cell, bst_cell
+
+
+def add_datum_header(col, row, ws, year, month, borders: BorderPlan):
     ws.merge_cells(start_row=row, start_column=col, end_row=row + 1, end_column=col + 1)
     datum_cell = ws.cell(row=row, column=col)
     datum_cell.value = "Datum"
-    datum_cell.alignment = Alignment(horizontal="center", vertical="center")
-    datum_cell.font = Font(bold=True)
+    apply_style(datum_cell, alignment=ALIGN_CENTER)
+    apply_style(datum_cell, font=FONT_BOLD)
     for row_ in range(row, row + 2):
         for col_ in range(col, col + 2):
-            ws.cell(row=row_, column=col_).border = thick_border
+            borders.thick_box(row_, row_, col_, col_)
 
 
-def add_summary_rows(col, row, ws):
+def add_summary_rows(col, row, ws, borders: BorderPlan):
     summary_start_row = row
-    # Apply thick border to summary labels
-    set_create_border(
-        min_row=summary_start_row,
-        max_row=summary_start_row + len(summary_labels) - 1,
-        min_col=col,
-        max_col=col,
-        side_style=Side(style="thick"),
-        ws=ws,
-    )
+    summary_end_row = summary_start_row + len(summary_labels) - 1
+    # Thick border around the merged summary labels; the label column keeps
+    # its own thick right edge
+    borders.thick_box(summary_start_row, summary_end_row, col, col)
+    borders.thick_box(summary_start_row, summary_end_row, col, col + 1)
 
     # Write summary labels under Datum column
     for idx, label in enumerate(summary_labels):
         row = summary_start_row + idx
         label_cell = ws.cell(row=row, column=col)
         label_cell.value = label
-        label_cell.font = Font(bold=True)
-        label_cell.alignment = Alignment(horizontal="left", vertical="center")
+        apply_style(label_cell, font=FONT_BOLD)
+        apply_style(label_cell, alignment=ALIGN_LEFT)
         ws.merge_cells(start_row=row, start_column=col, end_row=row, end_column=col + 1)
 
 
-def fill_summary_rows(
-    col, row, ws, section_names, person_lookup, year, month, master_db, db
-):
-    # Calculate and write summary values for each name
-    for name_idx, name in enumerate(section_names):
-        name_col = col + (name_idx * 2)
-
-        # Apply thick border to summary numbers
-        set_create_border(
-            min_row=row,
-            max_row=row + len(summary_labels) - 1,
-            min_col=name_col,
-            max_col=name_col + 1,
-            side_style=Side(style="thick"),
-            ws=ws,
+def compute_summary_values(name, person_data, year, month, master_db, db):
+    """Summary values (summary_labels) of one worker, one figure at a time."""
+    worker_type = person_data.get("worker_type", "Fest")
+    kein_verpflegung = bool(person_data.get("kein_verpflegungsgeld", 0))
+    keine_feiertag = bool(person_data.get("keine_feiertagssstunden", 0))
+    weekly_hours = person_data.get("weekly_hours", 0.0)
+    aggregates = person_data["aggregates"]
+    has_normal_bst = aggregates["hat_baustellenarbeit"]
+    
+    h_case = worker_type == WorkerTypes.Fest and has_normal_bst
+
+    # Get SKUG settings for calculating Feiertag hours
+    # skug_settings = master_db.get_skug_settings()
+
+    # Calculate totals
+    if worker_type == WorkerTypes.Fest:
+        urlaubsstunden = aggregates["urlaub_tage"]
+    else:
+        urlaubsstunden = aggregates["urlaub_stunden"]
+    if worker_type == WorkerTypes.Fest:
+        krankstunden = aggregates["krank_tage"]
+    else:
+        krankstunden = aggregates["krank_stunden"]
+
+    if keine_feiertag:
+        feiertag = 0
+    elif worker_type == WorkerTypes.Fest:
+        feiertag = get_days_of_feiertag(month, year)
+    else:
+        feiertag = get_hours_of_feiertag(
+            name, month, year, master_db.get_skug_settings(), person_data
         )
-        person_data = person_lookup.get(name, {})
-        worker_type = person_data.get("worker_type", "Fest")
-        kein_verpflegung = bool(person_data.get("kein_verpflegungsgeld", 0))
-        keine_feiertag = bool(person_data.get("keine_feiertagssstunden", 0))
-        weekly_hours = person_data.get("weekly_hours", 0.0)
-        arbeits_entries = person_data.get("arbeits_entries", [])
-        has_normal_bst = any(
-            e.get("kostenstelle")
-            and e.get("kostenstelle") not in ["Krank", "900", "940"]
-            for e in arbeits_entries
+
+    if h_case:
+        base_work_hours = aggregates["arbeitsstunden"]
+        daily_target = weekly_hours / 5.0 if weekly_hours else 0.0
+        urlaub_hours = urlaubsstunden * daily_target
+        krank_hours = krankstunden * daily_target
+        feiertag_hours = feiertag * daily_target
+        gesamtstunden = base_work_hours + urlaub_hours + krank_hours + feiertag_hours
+       # sum(e.get("stunden", 0) for e in arbeits_entries)
+
+    else:
+        gesamtstunden = (
+            aggregates["stunden"]
+            - aggregates["urlaub_stunden"]
+            - aggregates["krank_stunden"]
         )
+    skug_total = (
+        get_skug_hours_for_name(name, month, year, db)
+        if month in [12, 1, 2, 3]
+        else 0
+    )
+    if h_case:
         
-        h_case = worker_type == WorkerTypes.Fest and has_normal_bst
-
-        # Get SKUG settings for calculating Feiertag hours
-        # skug_settings = master_db.get_skug_settings()
-
-        # Calculate totals
-        if worker_type == WorkerTypes.Fest:
-            urlaubsstunden = get_days_of_urlaub(name, month, year, db)
-        else:
-            urlaubsstunden = get_hours_of_urlaub(name, month, year, db)
-        if worker_type == WorkerTypes.Fest:
-            krankstunden = get_days_of_krank(name, month, year, db)
-        else:
-            krankstunden = get_hours_of_krank(name, month, year, db)
-
-        if keine_feiertag:
-            feiertag = 0
-        elif worker_type == WorkerTypes.Fest:
-            feiertag = get_days_of_feiertag(month, year)
-        else:
-            feiertag = get_hours_of_feiertag(
+        #summe = (
+        #    gesamtstunden + skug_total + urlaub_hours + krank_hours + feiertag_hours
+        #)
+        summe = weekly_hours * 52.0 / 12.0
+    else:
+        summe = (
+            gesamtstunden
+            + get_hours_of_feiertag(
                 name, month, year, master_db.get_skug_settings(), person_data
             )
-
-        if h_case:
-            base_work_hours = sum(
-                e.get("stunden", 0)
-                for e in arbeits_entries
-                if e.get("kostenstelle") not in ["Krank", "900", "940"]
-            )
-            daily_target = weekly_hours / 5.0 if weekly_hours else 0.0
-            urlaub_hours = urlaubsstunden * daily_target
-            krank_hours = krankstunden * daily_target
-            feiertag_hours = feiertag * daily_target
-            gesamtstunden = base_work_hours + urlaub_hours + krank_hours + feiertag_hours
-           # sum(e.get("stunden", 0) for e in arbeits_entries)
-
-        else:
-            gesamtstunden = (
-                sum(e.get("stunden", 0) for e in arbeits_entries)
-                - get_hours_of_urlaub(name, month, year, db)
-                - get_hours_of_krank(name, month, year, db)
-            )
-        skug_total = (
-            get_skug_hours_for_name(name, month, year, db)
-            if month in [12, 1, 2, 3]
-            else 0
+            + skug_total
+            + aggregates["urlaub_stunden"]
+            + aggregates["krank_stunden"]
         )
-        if h_case:
-            
-            #summe = (
-            #    gesamtstunden + skug_total + urlaub_hours + krank_hours + feiertag_hours
-            #)
-            summe = weekly_hours * 52.0 / 12.0
-        else:
-            summe = (
-                gesamtstunden
-                + get_hours_of_feiertag(
-                    name, month, year, master_db.get_skug_settings(), person_data
-                )
-                + skug_total
-                + get_hours_of_urlaub(name, month, year, db)
-                + get_hours_of_krank(name, month, year, db)
-            )
-        if worker_type == WorkerTypes.Fest and gesamtstunden == 0:
-            summe = 0
-            
-        ## Mehr Minder Stunden ##
-        if h_case:
-            mehr_minder = gesamtstunden - summe
-        else:
-            mehr_minder = summe - get_normal_hours_per_month(year, month, master_db, h_flag=h_case, weekly_hours=weekly_hours)
-        ## --- ##
+    if worker_type == WorkerTypes.Fest and gesamtstunden == 0:
+        summe = 0
         
-        if kein_verpflegung:
-            v_zuschuss = 0
-        else:
-            v_zuschuss = get_verpflegungsgeld_for_name(name, month, year, master_db, db)
-        summary_values = [
-            gesamtstunden,
-            feiertag,
-            urlaubsstunden,
-            krankstunden,
-            skug_total,
-            summe,
-            mehr_minder,
-            v_zuschuss,
-        ]
+    ## Mehr Minder Stunden ##
+    if h_case:
+        mehr_minder = gesamtstunden - summe
+    else:
+        mehr_minder = summe - get_normal_hours_per_month(year, month, master_db, h_flag=h_case, weekly_hours=weekly_hours)
+    ## --- ##
+    
+    if kein_verpflegung:
+        v_zuschuss = 0
+    else:
+        v_zuschuss = aggregates["verpflegungsgeld"]
+    return [
+        gesamtstunden,
+        feiertag,
+        urlaubsstunden,
+        krankstunden,
+        skug_total,
+        summe,
+        mehr_minder,
+        v_zuschuss,
+    ]
+
+
+def fill_summary_rows(col, row, ws, section_names, person_lookup, year, month, borders):
+    # Write the summary values of each name
+    for name_idx, name in enumerate(section_names):
+        name_col = col + (name_idx * 2)
 
+        # Thick border around summary numbers
+        borders.thick_box(row, row + len(summary_labels) - 1, name_col, name_col + 1)
+        person_data = person_lookup.get(name, {})
+        worker_type = person_data.get("worker_type", "Fest")
+        weekly_hours = person_data.get("weekly_hours", 0.0)
+        aggregates = person_data["aggregates"]
+        # Set for all workers by PayrollEngine in build_month_report and
+        # load_worker_patches; with the aggregates no database is needed
+        summary_values = person_data["summary_values"]
 
         ## Summary ##
         if worker_type == WorkerTypes.Gewerblich:
             create_zeitarbeiter_summary(
-                ws, person_lookup, name,month,year, summary_values, db, row, name_col
+                ws,
+                person_lookup,
+                name,
+                month,
+                year,
+                summary_values,
+                None,
+                row,
+                name_col,
+                borders,
             )
         elif worker_type == WorkerTypes.Fest:
             create_fest_summary(
@@ -614,32 +560,34 @@ def fill_summary_rows(
                 row,
                 name_col,
                 worker_type,
-                master_db,
-                db,
+                None,
+                None,
                 weekly_hours,
+                aggregates,
+                borders,
             )
 
 
 def add_legend(col, row, ws):
     cell = ws.cell(row=row, column=col)
     cell.value = "Wochenende/Feiertag"
-    cell.font = Font(italic=True, color=FREE_DAY_COLOR)
-    cell.alignment = Alignment(horizontal="left", vertical="center")
+    apply_style(cell, font=legend_font(FREE_DAY_COLOR))
+    apply_style(cell, alignment=ALIGN_LEFT)
 
     cell = ws.cell(row=row + 1, column=col)
     cell.value = "diesen Tag mit SKUG auffüllen"
-    cell.font = Font(italic=True, color=SKUG_COLOR)
-    cell.alignment = Alignment(horizontal="left", vertical="center")
+    apply_style(cell, font=legend_font(SKUG_COLOR))
+    apply_style(cell, alignment=ALIGN_LEFT)
 
     cell = ws.cell(row=row + 2, column=col)
     cell.value = "weniger oder gleich als 8 Stunden von zu Hause abwesend"
-    cell.font = Font(italic=True, color=UNTER_8H_COLOR)
-    cell.alignment = Alignment(horizontal="left", vertical="center")
+    apply_style(cell, font=legend_font(UNTER_8H_COLOR))
+    apply_style(cell, alignment=ALIGN_LEFT)
 
     cell = ws.cell(row=row + 3, column=col)
     cell.value = "An+Ab/>24"
-    cell.font = Font(italic=True, color=AN_AB_COLOR)
-    cell.alignment = Alignment(horizontal="left", vertical="center")
+    apply_style(cell, font=legend_font(AN_AB_COLOR))
+    apply_style(cell, alignment=ALIGN_LEFT)
 
 
 def export_to_excel(
@@ -683,14 +631,6 @@ def export_to_excel(
     ws = wb.active
     ws.title = f"{year}-{month:02d}"
 
-    # Define thick border style
-    thick_border = Border(
-        left=Side(style="thick"),
-        right=Side(style="thick"),
-        top=Side(style="thick"),
-        bottom=Side(style="thick"),
-    )
-
     # Track current column position
     current_col = 1  # Start at column A
     names_per_section = 9
@@ -711,8 +651,8 @@ def export_to_excel(
         )
         datum_cell = ws.cell(row=3, column=datum_col)
         datum_cell.value = "Datum"
-        datum_cell.alignment = Alignment(horizontal="center", vertical="center")
-        datum_cell.font = Font(bold=True)
+        apply_style(datum_cell, alignment=ALIGN_CENTER)
+        apply_style(datum_cell, font=FONT_BOLD)
 
         info_cell = ws.cell(row=1, column=datum_col)
         info_cell.value = f"Stundenliste - {calendar.month_name[month]} {year}"
@@ -720,7 +660,7 @@ def export_to_excel(
         # Apply thick border to Datum header
         for row in range(3, 5):
             for col in range(datum_col, datum_col + 2):
-                ws.cell(row=row, column=col).border = thick_border
+                apply_style(ws.cell(row=row, column=col), border=THICK_BORDER)
 
         # Write dates (starting at row 5)
         for day in range(1, num_days + 1):
@@ -733,16 +673,12 @@ def export_to_excel(
             )
             date_cell = ws.cell(row=row, column=datum_col)
             date_cell.value = f"{day}."
-            date_cell.alignment = Alignment(horizontal="center", vertical="center")
+            apply_style(date_cell, alignment=ALIGN_CENTER)
 
             # Color date cell if it's a weekend or holiday
             if is_weekend(year, month, day) or is_holiday(year, month, day):
                 for col in range(datum_col, datum_col + 2):
-                    ws.cell(row=row, column=col).fill = openpyxl.styles.PatternFill(
-                        start_color=FREE_DAY_COLOR,
-                        end_color=FREE_DAY_COLOR,
-                        fill_type="solid",
-                    )
+                    apply_style(ws.cell(row=row, column=col), fill=solid_fill(FREE_DAY_COLOR))
 
         # Apply thick border around all dates
         set_create_border(
@@ -750,7 +686,7 @@ def export_to_excel(
             max_row=5 + num_days - 1,
             min_col=datum_col,
             max_col=datum_col + 1,
-            side_style=Side(border_style="thick"),
+            side_style=THICK,
             ws=ws,
         )
 
@@ -767,19 +703,15 @@ def export_to_excel(
             )
             name_cell = ws.cell(row=3, column=name_col)
             name_cell.value = name
-            name_cell.alignment = Alignment(horizontal="center", vertical="center")
-            name_cell.font = Font(bold=True)
+            apply_style(name_cell, alignment=ALIGN_CENTER)
+            apply_style(name_cell, font=FONT_BOLD)
             person_data = person_lookup.get(name, {})
             worker_type = person_data.get("worker_type", "Fest")
             kein_verpflegung = bool(person_data.get("kein_verpflegungsgeld", 0))
             keine_feiertag = bool(person_data.get("keine_feiertagssstunden", 0))
 
             if not kein_verpflegung:
-                name_cell.fill = openpyxl.styles.PatternFill(
-                    start_color=UNTER_8H_COLOR,
-                    end_color=UNTER_8H_COLOR,
-                    fill_type="solid",
-                )
+                apply_style(name_cell, fill=solid_fill(UNTER_8H_COLOR))
 
             # Apply thick border to name header
             set_create_border(
@@ -787,18 +719,18 @@ def export_to_excel(
                 max_row=4,
                 min_col=name_col,
                 max_col=name_col + 1,
-                side_style=Side(style="thick"),
+                side_style=THICK,
                 ws=ws,
             )
 
             # Write "Std." and "Bst." in row 4
             std_cell = ws.cell(row=4, column=name_col)
             std_cell.value = "Std."
-            std_cell.alignment = Alignment(horizontal="center", vertical="center")
+            apply_style(std_cell, alignment=ALIGN_CENTER)
 
             bst_cell = ws.cell(row=4, column=name_col + 1)
             bst_cell.value = "Bst."
-            bst_cell.alignment = Alignment(horizontal="center", vertical="center")
+            apply_style(bst_cell, alignment=ALIGN_CENTER)
 
             # Apply thick border around Std./Bst. Data
             set_create_border(
@@ -806,7 +738,7 @@ def export_to_excel(
                 max_row=5 + num_days - 1,
                 min_col=name_col,
                 max_col=name_col + 1,
-                side_style=Side(style="thick"),
+                side_style=THICK,
                 ws=ws,
             )
             # Fill in data for each day
@@ -846,7 +778,7 @@ def export_to_excel(
             max_row=summary_start_row + len(summary_labels) - 1,
             min_col=datum_col,
             max_col=datum_col,
-            side_style=Side(style="thick"),
+            side_style=THICK,
             ws=ws,
         )
 
@@ -855,8 +787,8 @@ def export_to_excel(
             row = summary_start_row + idx
             label_cell = ws.cell(row=row, column=datum_col)
             label_cell.value = label
-            label_cell.font = Font(bold=True)
-            label_cell.alignment = Alignment(horizontal="left", vertical="center")
+            apply_style(label_cell, font=FONT_BOLD)
+            apply_style(label_cell, alignment=ALIGN_LEFT)
 
             # Merge across both Datum columns
             ws.merge_cells(
@@ -871,23 +803,23 @@ def export_to_excel(
 
         cell = ws.cell(row=row, column=datum_col)
         cell.value = "Wochenende/Feiertag"
-        cell.font = Font(italic=True, color=FREE_DAY_COLOR)
-        cell.alignment = Alignment(horizontal="left", vertical="center")
+        apply_style(cell, font=legend_font(FREE_DAY_COLOR))
+        apply_style(cell, alignment=ALIGN_LEFT)
 
         cell = ws.cell(row=row + 1, column=datum_col)
         cell.value = "diesen Tag mit SKUG auffüllen"
-        cell.font = Font(italic=True, color=SKUG_COLOR)
-        cell.alignment = Alignment(horizontal="left", vertical="center")
+        apply_style(cell, font=legend_font(SKUG_COLOR))
+        apply_style(cell, alignment=ALIGN_LEFT)
 
         cell = ws.cell(row=row + 1, column=datum_col + 5)
         cell.value = "weniger oder gleich als 8 Stunden von zu Hause abwesend"
-        cell.font = Font(italic=True, color=UNTER_8H_COLOR)
-        cell.alignment = Alignment(horizontal="left", vertical="center")
+        apply_style(cell, font=legend_font(UNTER_8H_COLOR))
+        apply_style(cell, alignment=ALIGN_LEFT)
 
         cell = ws.cell(row=row + 1, column=datum_col + 11)
         cell.value = "An+Ab/>24"
-        cell.font = Font(italic=True, color=AN_AB_COLOR)
-        cell.alignment = Alignment(horizontal="left", vertical="center")
+        apply_style(cell, font=legend_font(AN_AB_COLOR))
+        apply_style(cell, alignment=ALIGN_LEFT)
 
         # Calculate and write summary values for each name
         for name_idx, name in enumerate(section_names):
@@ -899,7 +831,7 @@ def export_to_excel(
                 max_row=summary_start_row + len(summary_labels) - 1,
                 min_col=name_col,
                 max_col=name_col + 1,
-                side_style=Side(style="thick"),
+                side_style=THICK,
                 ws=ws,
             )
 
@@ -970,6 +902,25 @@ def export_to_excel(
         return False
 
 
+def box_merged_summary_cell(ws, row, name_col, borders: BorderPlan | None):
+    """
+    Thick border around a summary cell merged over both columns of a name.
+    The merged cell takes over the thick right edge of the summary box.
+    """
+    if borders is None:
+        set_create_border(
+            min_row=row,
+            max_row=row,
+            min_col=name_col,
+            max_col=name_col + 1,
+            side_style=THICK,
+            ws=ws,
+        )
+        return
+    borders.thick_box(row, row, name_col, name_col)
+    borders.thick_box(row, row, name_col, name_col + 1)
+
+
 def create_zeitarbeiter_summary(
     ws: Workbook,
     person_lookup,
@@ -980,16 +931,17 @@ def create_zeitarbeiter_summary(
     db: Database,
     summary_start_row: int = None,
     name_col: int = None,
-    
+    borders: BorderPlan | None = None,
 ):
     person_data = person_lookup.get(name, {})
     kein_fzk = bool(person_data.get("kein_fzk", 0))
     keine_feiertage = bool(person_data.get("keine_feiertagssstunden", 0))
+    aggregates = person_data.get("aggregates")
     for idx, value in enumerate(summary_values):
         row = summary_start_row + idx
         value_cell = ws.cell(row=row, column=name_col)
         value_cell.value = value if value != 0 else ""
-        value_cell.alignment = Alignment(horizontal="center", vertical="center")
+        apply_style(value_cell, alignment=ALIGN_CENTER)
         value_cell.number_format = "0.00"
         
         if idx == 1:
@@ -1008,13 +960,21 @@ def create_zeitarbeiter_summary(
             value_cell.value = "Tage"
 
             value_cell = ws.cell(row=row, column=name_col)
-            value_cell.value = get_days_of_urlaub(name, month, year, db)
+            value_cell.value = (
+                aggregates["urlaub_tage"]
+                if aggregates is not None
+                else get_days_of_urlaub(name, month, year, db)
+            )
         if idx == 3 and kein_fzk:  # Krankstunden
             value_cell = ws.cell(row=row, column=name_col + 1)
             value_cell.value = "Tage"
 
             value_cell = ws.cell(row=row, column=name_col)
-            value_cell.value = get_days_of_krank(name, month, year, db)
+            value_cell.value = (
+                aggregates["krank_tage"]
+                if aggregates is not None
+                else get_days_of_krank(name, month, year, db)
+            )
         if idx == 4 and kein_fzk:
             value_cell = ws.cell(row=row, column=name_col)
             value_cell.value = ""
@@ -1033,15 +993,8 @@ def create_zeitarbeiter_summary(
             )
             value_cell = ws.cell(row=row, column=name_col)
             value_cell.value = "Kein FZK"
-            value_cell.alignment = Alignment(horizontal="center", vertical="center")
-            set_create_border(
-                min_row=row,
-                max_row=row,
-                min_col=name_col,
-                max_col=name_col + 1,
-                side_style=Side(style="thick"),
-                ws=ws,
-            )
+            apply_style(value_cell, alignment=ALIGN_CENTER)
+            box_merged_summary_cell(ws, row, name_col, borders)
 
 
 def create_fest_summary(
@@ -1056,6 +1009,8 @@ def create_fest_summary(
     master_db: MasterDataDatabase,
     db: Database,
     weekly_hours: float = 0.0,
+    aggregates: dict | None = None,
+    borders: BorderPlan | None = None,
 ):
     stunden = summary_values[0]
     for idx, value in enumerate(summary_values):
@@ -1064,7 +1019,7 @@ def create_fest_summary(
         # Standard value writing first (can be overwritten)
         value_cell = ws.cell(row=row, column=name_col)
         value_cell.value = value if value != 0 else ""
-        value_cell.alignment = Alignment(horizontal="center", vertical="center")
+        apply_style(value_cell, alignment=ALIGN_CENTER)
         if idx == 0:
             value_cell.number_format = "0.00"
         if idx == 1:  # Feiertag
@@ -1078,13 +1033,21 @@ def create_fest_summary(
             value_cell.value = "Tage"
 
             value_cell = ws.cell(row=row, column=name_col)
-            value_cell.value = get_days_of_urlaub(name, month, year, db)
+            value_cell.value = (
+                aggregates["urlaub_tage"]
+                if aggregates is not None
+                else get_days_of_urlaub(name, month, year, db)
+            )
         if idx == 3:  # Krankstunden
             value_cell = ws.cell(row=row, column=name_col + 1)
             value_cell.value = "Tage"
 
             value_cell = ws.cell(row=row, column=name_col)
-            value_cell.value = get_days_of_krank(name, month, year, db)
+            value_cell.value = (
+                aggregates["krank_tage"]
+                if aggregates is not None
+                else get_days_of_krank(name, month, year, db)
+            )
         if idx == 5:
             value_cell.number_format = "0.00"
         if idx == 6:  # Mehr-/Minderstd
@@ -1099,18 +1062,11 @@ def create_fest_summary(
                 )
                 value_cell = ws.cell(row=row, column=name_col)
                 value_cell.value = worker_type
-                value_cell.alignment = Alignment(horizontal="center", vertical="center")
-                set_create_border(
-                    min_row=row,
-                    max_row=row,
-                    min_col=name_col,
-                    max_col=name_col + 1,
-                    side_style=Side(style="thick"),
-                    ws=ws,
-                )
+                apply_style(value_cell, alignment=ALIGN_CENTER)
+                box_merged_summary_cell(ws, row, name_col, borders)
             else:
                 # Just ensure formatting is correct for the value
                 value_cell = ws.cell(row=row, column=name_col)
                 value_cell.value = value
                 value_cell.number_format = "0.00"
-                value_cell.alignment = Alignment(horizontal="center", vertical="center")
+                apply_style(value_cell, alignment=ALIGN_CENTER)
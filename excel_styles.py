@@ -0,0 +1,162 @@
+"""
+Shared style objects of the Excel export.
+
+Every fill, font, alignment and border combination the export uses is
+created once here and assigned by reference with apply_style(). On openpyxl
+cells the index of each object in the workbook's style lists is looked up
+once per workbook and then written straight into the cell's style array, so
+openpyxl doesn't hash and dedupe a new style object for every cell.
+
+The objects are shared: never change them, ask the registry for another one.
+"""
+
+import weakref
+from functools import lru_cache
+
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+SKUG_COLOR = "92d050"
+UNTER_8H_COLOR = "b8cce4"
+AN_AB_COLOR = "ff0000"
+FREE_DAY_COLOR = "ffc000"  # Orange color for weekends and holidays
+
+THIN = Side(style="thin")
+THICK = Side(style="thick")
+
+ALIGN_CENTER = Alignment(horizontal="center", vertical="center")
+ALIGN_LEFT = Alignment(horizontal="left", vertical="center")
+
+FONT_BOLD = Font(bold=True)
+
+BORDER_SIDES = ("left", "right", "top", "bottom")
+
+
+@lru_cache(maxsize=None)
+def _side(style):
+    return Side(style=style)
+
+
+@lru_cache(maxsize=None)
+def border(left=None, right=None, top=None, bottom=None) -> Border:
+    """Border with the given side styles ("thin", "thick" or None)."""
+    return Border(
+        left=_side(left), right=_side(right), top=_side(top), bottom=_side(bottom)
+    )
+
+
+def border_key(value: Border) -> tuple:
+    """Styles of the four sides of a border (the export uses no colours)."""
+    sides = (getattr(value, side) for side in BORDER_SIDES)
+    return tuple(side.style if side is not None else None for side in sides)
+
+
+@lru_cache(maxsize=None)
+def _merged_border(key_one, key_two) -> Border:
+    return border(*(one or two for one, two in zip(key_one, key_two)))
+
+
+def merge_borders(border_one: Border, border_two: Border) -> Border:
+    """Sides of border_one, completed with the sides border_two has."""
+    return _merged_border(border_key(border_one), border_key(border_two))
+
+
+def edge_border(side: str, side_style: Side) -> Border:
+    """Border with only one side (e.g. edge_border("top", THICK))."""
+    return border(**{side: side_style.style})
+
+
+@lru_cache(maxsize=None)
+def solid_fill(color: str) -> PatternFill:
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+@lru_cache(maxsize=None)
+def legend_font(color: str) -> Font:
+    return Font(italic=True, color=color)
+
+
+THICK_BORDER = border("thick", "thick", "thick", "thick")
+LATTICE_BORDER = border("thin", "thin", "thin", "thin")
+
+# Style list indexes per workbook: {(collection, id(style)): (index, style)}
+_workbook_ids = weakref.WeakKeyDictionary()
+
+
+def _style_index(workbook, collection, value):
+    ids = _workbook_ids.get(workbook)
+    if ids is None:
+        ids = _workbook_ids[workbook] = {}
+    key = (collection, id(value))
+    index = ids.get(key)
+    if index is None:
+        index = getattr(workbook, collection).add(value)
+        # Keep the object so its id can't be reused while the workbook lives
+        ids[key] = (index, value)
+        return index
+    return index[0]
+
+
+def apply_style(cell, font=None, fill=None, border=None, alignment=None):
+    """Assign registry styles to an openpyxl cell or a SheetBuffer cell."""
+    style_array = getattr(cell, "_style", None)
+    if style_array is None:
+        # xlsx_stream.BufferedCell keeps the objects themselves
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if border is not None:
+            cell.border = border
+        if alignment is not None:
+            cell.alignment = alignment
+        return
+
+    workbook = cell.parent.parent
+    if font is not None:
+        style_array.fontId = _style_index(workbook, "_fonts", font)
+    if fill is not None:
+        style_array.fillId = _style_index(workbook, "_fills", fill)
+    if border is not None:
+        style_array.borderId = _style_index(workbook, "_borders", border)
+    if alignment is not None:
+        style_array.alignmentId = _style_index(workbook, "_alignments", alignment)
+
+
+# Planned borders by mask of thick sides: left 1, right 2, top 4, bottom 8
+_PLANNED_BORDERS = tuple(
+    border(*("thick" if mask & bit else "thin" for bit in (1, 2, 4, 8)))
+    for mask in range(16)
+)
+
+
+class BorderPlan:
+    """
+    Final borders of an area, collected before any border is drawn.
+
+    The layout registers its thick boxes with thick_box(); write() then gives
+    every cell of the area the thick sides of the boxes it lies on and thin
+    lines on all other sides, assigning each cell its border exactly once.
+    """
+
+    def __init__(self):
+        self._thick = {}
+
+    def thick_box(self, min_row, max_row, min_col, max_col):
+        """Thick outline around the cells of a range."""
+        thick = self._thick
+        for row in range(min_row, max_row + 1):
+            thick[(row, min_col)] = thick.get((row, min_col), 0) | 1
+            thick[(row, max_col)] = thick.get((row, max_col), 0) | 2
+        for col in range(min_col, max_col + 1):
+            thick[(min_row, col)] = thick.get((min_row, col), 0) | 4
+            thick[(max_row, col)] = thick.get((max_row, col), 0) | 8
+
+    def write(self, ws, min_row, max_row, min_col, max_col):
+        """Draw the borders of all cells in the area."""
+        thick = self._thick
+        for row in ws.iter_rows(
+            min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col
+        ):
+            for cell in row:
+                mask = thick.get((cell.row, cell.column), 0)
+                apply_style(cell, border=_PLANNED_BORDERS[mask])
@@ -6,8 +6,11 @@ from database import Database
 from excel_export import (
     export_to_excel,
     export_to_excel_top_to_bottom,
-    build_workbook_top_to_bottom,
+    draw_month_report,
+    draw_worker_cells,
 )
+from month_report import build_month_report, load_worker_patches
+from xlsx_stream import SheetBuffer
 from openpyxl.utils import get_column_letter
 from utils import validate_required_fields, get_next_day_skip_weekend, get_next_day
 from utils import get_weekday_abbr, parse_date_range, parse_multiple_names
@@ -18,12 +21,16 @@ from utils import (
     check_arbeitsstunden,
 )
 from datetime import datetime, timedelta
-from master_data import MasterDataDatabase
+from master_data import MasterDataCache
 from manager_dialogs import NameManagerDialog, BaustelleManagerDialog
 from autocomplete import AutocompleteEntry, BaustelleAutocomplete
 from settings_dialog import Settings, SettingsDialog
 from datatypes import TravelStatus, WorkerTypes
 from entry_service import EntryService
+from tree_sync import TreeSync
+
+# Delay after the last key release before the month/day trees are reloaded
+VIEW_UPDATE_DELAY_MS = 200
 
 
 class ExcelPreviewWindow:
@@ -45,10 +52,18 @@ class ExcelPreviewWindow:
         self.on_reset = on_reset
         self.on_modified = on_modified
         self.cell_map = {}
+        self.report = None
         self.preview_year = None
         self.preview_month = None
         self._suppress_edit_events = False
+        # Shown text of the editable cells as rendered, by sheet cell
         self.original_values = {}
+        self._shown_size = (0, 0)
+        # Cells changed by edit/paste events since the last take_dirty_cells()
+        self._dirty_cells = set()
+        self._dirty_unknown = False
+        # Cells currently highlighted as changed (mark_changed_cell)
+        self._changed_cells = set()
         self.base_status_text = ""
         self.window = tk.Toplevel(parent)
         self.window.title("Excel Vorschau")
@@ -99,17 +114,23 @@ class ExcelPreviewWindow:
         self.title_label.config(text=title_text)
         self.status_label.config(text=status_text)
         self.base_status_text = status_text
+        self.report = None
+        self._reset_change_tracking()
         self.clear()
         self._safe_sheet_call("headers", ["#"])
 
-    def render_workbook(self, workbook, year, month, cell_map=None):
+    def render_report(self, report, ws):
+        """
+        Show a month_report.MonthReport; ws is the report drawn into a
+        xlsx_stream.SheetBuffer (see StundenEingabeGUI.build_preview_report).
+        """
         self._suppress_edit_events = True
-        if workbook is None:
+        if report is None:
             self.show_message("Excel Vorschau", "Keine Daten zum Anzeigen vorhanden.")
             self._suppress_edit_events = False
             return
 
-        ws = workbook.active
+        year, month = report.year, report.month
         max_row = ws.max_row or 0
         max_col = ws.max_column or 0
 
@@ -122,32 +143,68 @@ class ExcelPreviewWindow:
             return
 
         headers = ["#"] + [get_column_letter(i) for i in range(1, max_col + 1)]
-        data = []
-        for row_idx in range(1, max_row + 1):
-            row_values = [row_idx]
-            for col_idx in range(1, max_col + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                row_values.append(self._format_preview_value(cell))
-            data.append(row_values)
+        # Only the cells the report drew; all others stay empty
+        cells = list(ws.iter_cells())
+        data = [[row_idx] + [""] * max_col for row_idx in range(1, max_row + 1)]
+        for cell in cells:
+            if cell.value is not None:
+                data[cell.row - 1][cell.column] = self._format_preview_value(cell)
 
         self._clear_all_highlights()
         self._set_sheet_data(data, headers)
         self._apply_dimensions(ws, data_col_offset=1)
         self._apply_merges(ws, data_col_offset=1)
-        self._apply_styles(ws, data_col_offset=1)
+        self._apply_styles(cells, data_col_offset=1)
+        self._safe_sheet_call("redraw")
 
         self.title_label.config(text=f"Excel Vorschau {month:02d}/{year}")
         self.base_status_text = (
             f"Blatt: {ws.title} | Zeilen: {max_row} | Spalten: {max_col}"
         )
         self.status_label.config(text=self.base_status_text)
-        self.cell_map = cell_map or {}
+        self.report = report
+        self.cell_map = report.cell_map
         self.preview_year = year
         self.preview_month = month
-        self.original_values = {}
-        for r_idx, row_data in enumerate(data):
-            for c_idx, cell_value in enumerate(row_data):
-                self.original_values[(r_idx, c_idx)] = cell_value
+        self.original_values = {
+            (wb_row - 1, wb_col): data[wb_row - 1][wb_col]
+            for wb_row, wb_col in report.cell_map
+        }
+        self._reset_change_tracking()
+        self._suppress_edit_events = False
+
+    def patch_cells(self, ws, coordinates):
+        """
+        Replace the shown cells at coordinates ((row, column) in the report)
+        with the cells of ws, a SheetBuffer with only these cells drawn.
+        """
+        self._suppress_edit_events = True
+        data_col_offset = 1
+        sheet_cells = [(row - 1, col - 1 + data_col_offset) for row, col in coordinates]
+        self._changed_cells.difference_update(sheet_cells)
+        if not self._safe_sheet_call("dehighlight_cells", cells=sheet_cells, redraw=False):
+            for row, col in sheet_cells:
+                self._safe_sheet_call("dehighlight_cells", row, col)
+        self._safe_sheet_call(
+            "align_cells", cells=dict.fromkeys(sheet_cells), redraw=False
+        )
+
+        drawn = []
+        for (row, col), (sheet_row, sheet_col) in zip(coordinates, sheet_cells):
+            cell = ws.cell(row=row, column=col)
+            text = self._format_preview_value(cell)
+            if self.get_cell_text(sheet_row, sheet_col) != text:
+                if not self._safe_sheet_call(
+                    "set_cell_data", sheet_row, sheet_col, text, redraw=False
+                ):
+                    self.set_cell_text(sheet_row, sheet_col, text)
+            if (row, col) in self.cell_map:
+                self.original_values[(sheet_row, sheet_col)] = text
+            if not cell.is_empty():
+                drawn.append(cell)
+
+        self._apply_styles(drawn, data_col_offset)
+        self._safe_sheet_call("redraw")
         self._suppress_edit_events = False
 
     def _format_preview_value(self, cell):
@@ -169,8 +226,14 @@ class ExcelPreviewWindow:
                 return
             except Exception:
                 pass
-        if hasattr(self.sheet, "dehighlight_cells"):
-            for row, col in list(self.original_values.keys()):
+        self._dehighlight_each_cell()
+
+    def _dehighlight_each_cell(self):
+        if not hasattr(self.sheet, "dehighlight_cells"):
+            return
+        num_rows, num_cols = self._shown_size
+        for row in range(num_rows):
+            for col in range(num_cols):
                 try:
                     self.sheet.dehighlight_cells(row, col)
                 except Exception:
@@ -232,6 +295,7 @@ class ExcelPreviewWindow:
             data = self.sheet.get_last_event()
         else:
             return
+        self._mark_dirty(data)
         row, col, value = self._parse_edit_event(data)
         if row is None or col is None:
             if callable(self.on_modified):
@@ -243,9 +307,43 @@ class ExcelPreviewWindow:
     def _on_sheet_paste(self, event):
         if self._suppress_edit_events:
             return
+        self._mark_dirty(event)
         if callable(self.on_modified):
             self.on_modified()
 
+    def _mark_dirty(self, event):
+        cells = self._event_cells(event)
+        if cells is None:
+            self._dirty_unknown = True
+        else:
+            self._dirty_cells.update(cells)
+
+    def _event_cells(self, event):
+        """(row, col) of the table cells an event changed; None if unknown."""
+        if isinstance(event, dict):
+            table = (event.get("cells") or {}).get("table")
+            if isinstance(table, dict):
+                return list(table)
+        row, col, _ = self._parse_edit_event(event)
+        if row is None or col is None:
+            return None
+        return [(row, col)]
+
+    def take_dirty_cells(self):
+        """
+        Cells changed by sheet events since the last call. None if an event
+        didn't tell which cells it changed, then all cells have to be checked.
+        """
+        cells = None if self._dirty_unknown else self._dirty_cells
+        self._dirty_cells = set()
+        self._dirty_unknown = False
+        return cells
+
+    def _reset_change_tracking(self):
+        self._dirty_cells = set()
+        self._dirty_unknown = False
+        self._changed_cells = set()
+
     def _parse_edit_event(self, event):
         if isinstance(event, dict):
             row = event.get("row")
@@ -271,14 +369,9 @@ class ExcelPreviewWindow:
         wb_row = row + 1
         wb_col = col
         cell_info = self.cell_map.get((wb_row, wb_col))
-        if not cell_info:
-            return
-        year = cell_info.get("year")
-        month = cell_info.get("month")
-        day = cell_info.get("day")
-        name = cell_info.get("name")
-        if not all([year, month, day, name]):
+        if cell_info is None:
             return
+        year, month, day, name = cell_info.day_key()
 
         has_work_entry = self._day_has_preview_work_entry(year, month, day, name)
 
@@ -373,17 +466,13 @@ class ExcelPreviewWindow:
 
     def _day_has_preview_work_entry(self, year, month, day, name):
         row_values = {}
+        day_key = (year, month, day, name)
         for (wb_row, wb_col), cell_info in self.cell_map.items():
-            if (
-                cell_info.get("year") == year
-                and cell_info.get("month") == month
-                and cell_info.get("day") == day
-                and cell_info.get("name") == name
-            ):
-                if cell_info.get("entry_id") is not None:
+            if cell_info.day_key() == day_key:
+                if cell_info.entry_id is not None:
                     return True
                 sheet_row = wb_row - 1
-                row_values.setdefault(sheet_row, {})[cell_info.get("field")] = (
+                row_values.setdefault(sheet_row, {})[cell_info.field] = (
                     self.get_cell_text(sheet_row, wb_col) or ""
                 )
         for values in row_values.values():
@@ -468,7 +557,12 @@ class ExcelPreviewWindow:
     def mark_changed_cell(self, row, col, is_changed):
         if self._suppress_edit_events:
             return
+        # Only cells whose highlight state changes go to the sheet
+        key = (row, col)
+        if is_changed == (key in self._changed_cells):
+            return
         if is_changed:
+            self._changed_cells.add(key)
             self._safe_sheet_call(
                 "highlight_cells",
                 row=row,
@@ -476,6 +570,7 @@ class ExcelPreviewWindow:
                 bg="#fff2cc",
             )
         else:
+            self._changed_cells.discard(key)
             if hasattr(self.sheet, "dehighlight_cells"):
                 try:
                     self.sheet.dehighlight_cells(row, col)
@@ -483,18 +578,14 @@ class ExcelPreviewWindow:
                     pass
 
     def clear_pending_highlights(self):
+        self._changed_cells = set()
         if hasattr(self.sheet, "dehighlight_all"):
             try:
                 self.sheet.dehighlight_all()
                 return
             except Exception:
                 pass
-        if hasattr(self.sheet, "dehighlight_cells"):
-            for row, col in list(self.original_values.keys()):
-                try:
-                    self.sheet.dehighlight_cells(row, col)
-                except Exception:
-                    pass
+        self._dehighlight_each_cell()
 
     def _set_sheet_data(self, data, headers):
         if not self._safe_sheet_call(
@@ -507,6 +598,7 @@ class ExcelPreviewWindow:
 
         if not self._safe_sheet_call("headers", headers):
             self._safe_sheet_call("set_header_data", headers)
+        self._shown_size = (len(data), len(headers))
 
     def _safe_sheet_call(self, method_name, *args, **kwargs):
         if not hasattr(self.sheet, method_name):
@@ -551,8 +643,9 @@ class ExcelPreviewWindow:
             )
 
         row_heights = []
+        row_dimensions = getattr(ws, "row_dimensions", {})
         for row_idx in range(1, ws.max_row + 1):
-            dim = ws.row_dimensions.get(row_idx)
+            dim = row_dimensions.get(row_idx)
             height = getattr(dim, "height", None) if dim else None
             if height is None:
                 row_heights.append(None)
@@ -566,11 +659,11 @@ class ExcelPreviewWindow:
             )
 
     def _apply_merges(self, ws, data_col_offset):
-        for merged in ws.merged_cells.ranges:
-            r0 = merged.min_row - 1
-            c0 = merged.min_col - 1 + data_col_offset
-            r1 = merged.max_row - 1
-            c1 = merged.max_col - 1 + data_col_offset
+        for min_row, min_col, max_row, max_col in ws.merged_ranges:
+            r0 = min_row - 1
+            c0 = min_col - 1 + data_col_offset
+            r1 = max_row - 1
+            c1 = max_col - 1 + data_col_offset
             if hasattr(self.sheet, "span"):
                 try:
                     self.sheet.span(r0, c0, r1, c1)
@@ -594,77 +687,97 @@ class ExcelPreviewWindow:
                 except Exception:
                     pass
 
-    def _apply_styles(self, ws, data_col_offset):
-        for row_idx in range(1, ws.max_row + 1):
-            for col_idx in range(1, ws.max_column + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                sheet_row = row_idx - 1
-                sheet_col = col_idx - 1 + data_col_offset
-
-                fill = getattr(cell, "fill", None)
-                if fill and getattr(fill, "fill_type", None) == "solid":
-                    fill_hex = self._excel_color_to_hex(
-                        getattr(fill, "start_color", None)
+    def _apply_styles(self, cells, data_col_offset):
+        """
+        Highlight, font and alignment of the drawn cells, collected per style
+        and applied with one sheet call per colour and alignment.
+        """
+        highlights = {}
+        fonts = {}
+        alignments = {}
+        # The report shares its style objects, so most cells hit this cache
+        preview_styles = {}
+        for cell in cells:
+            key = (id(cell.fill), id(cell.font), id(cell.alignment))
+            style = preview_styles.get(key)
+            if style is None:
+                style = preview_styles[key] = self._preview_style(cell)
+            colors, font, align_value = style
+            sheet_cell = (cell.row - 1, cell.column - 1 + data_col_offset)
+            if colors is not None:
+                highlights.setdefault(colors, []).append(sheet_cell)
+            if font is not None:
+                fonts.setdefault(font, []).append(sheet_cell)
+            if align_value is not None:
+                alignments[sheet_cell] = align_value
+
+        for (bg, fg), group in highlights.items():
+            colors = {"bg": bg or False, "fg": fg or False}
+            if not self._safe_sheet_call(
+                "highlight_cells", cells=group, redraw=False, **colors
+            ):
+                for row, col in group:
+                    self._safe_sheet_call(
+                        "highlight_cells", row=row, column=col, **colors
                     )
-                    if fill_hex:
-                        self._safe_sheet_call(
-                            "highlight_cells",
-                            row=sheet_row,
-                            column=sheet_col,
-                            bg=fill_hex,
-                        )
 
-                font = getattr(cell, "font", None)
-                if font is not None:
-                    font_color = self._excel_color_to_hex(getattr(font, "color", None))
-                    if font_color:
-                        self._safe_sheet_call(
-                            "highlight_cells",
-                            row=sheet_row,
-                            column=sheet_col,
-                            fg=font_color,
-                        )
-                    if getattr(font, "bold", False) or getattr(font, "italic", False):
-                        self._safe_sheet_call(
-                            "set_cell_font",
-                            sheet_row,
-                            sheet_col,
-                            bold=getattr(font, "bold", False),
-                            italic=getattr(font, "italic", False),
-                        )
+        if hasattr(self.sheet, "set_cell_font"):
+            for (bold, italic), group in fonts.items():
+                for row, col in group:
+                    self._safe_sheet_call(
+                        "set_cell_font", row, col, bold=bold, italic=italic
+                    )
 
-                alignment = getattr(cell, "alignment", None)
-                if alignment is not None:
-                    horizontal = getattr(alignment, "horizontal", None)
-                    if horizontal in {"center", "left", "right"}:
-                        align_value = (
-                            "center"
-                            if horizontal == "center"
-                            else "w"
-                            if horizontal == "left"
-                            else "e"
-                        )
-                        if not self._safe_sheet_call(
-                            "set_cell_align",
-                            sheet_row,
-                            sheet_col,
-                            align_value,
-                        ):
-                            self._safe_sheet_call(
-                                "align_cells",
-                                sheet_row,
-                                sheet_col,
-                                align=align_value,
-                            )
+        if alignments and not self._safe_sheet_call(
+            "align_cells", cells=alignments, redraw=False
+        ):
+            for (row, col), align_value in alignments.items():
+                if not self._safe_sheet_call("set_cell_align", row, col, align_value):
+                    self._safe_sheet_call("align_cells", row, col, align=align_value)
+
+    def _preview_style(self, cell):
+        """((bg, fg) or None, (bold, italic) or None, align or None) of a cell."""
+        bg = None
+        fill = getattr(cell, "fill", None)
+        if fill and getattr(fill, "fill_type", None) == "solid":
+            bg = self._excel_color_to_hex(getattr(fill, "start_color", None))
+
+        fg = None
+        font_style = None
+        font = getattr(cell, "font", None)
+        if font is not None:
+            fg = self._excel_color_to_hex(getattr(font, "color", None))
+            if getattr(font, "bold", False) or getattr(font, "italic", False):
+                font_style = (
+                    bool(getattr(font, "bold", False)),
+                    bool(getattr(font, "italic", False)),
+                )
+
+        align_value = None
+        alignment = getattr(cell, "alignment", None)
+        if alignment is not None:
+            horizontal = getattr(alignment, "horizontal", None)
+            if horizontal in {"center", "left", "right"}:
+                align_value = (
+                    "center"
+                    if horizontal == "center"
+                    else "w"
+                    if horizontal == "left"
+                    else "e"
+                )
+
+        colors = (bg, fg) if bg or fg else None
+        return colors, font_style, align_value
 
 
 class StundenEingabeGUI:
     def __init__(self, root):
         self.root = root
-        self.db = Database()
-        self.master_db = MasterDataDatabase()
-        self.db.set_master_db(self.master_db)
         self.settings = Settings()
+        sqlite_pragmas = self.settings.get("sqlite_pragmas")
+        self.db = Database(pragmas=sqlite_pragmas)
+        self.master_db = MasterDataCache(pragmas=sqlite_pragmas)
+        self.db.set_master_db(self.master_db)
         self.entry_service = EntryService(self.db, self.master_db)
         self.edit_mode_active = False
         self.edit_entry_id = None
@@ -683,6 +796,14 @@ class StundenEingabeGUI:
         self.preview_request_seq = 0
         self.preview_pending_edits = {}
         self.preview_pending_flags = {}
+        # Month and day trees are loaded here, see load_view()
+        self.view_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="tree_views"
+        )
+        self.view_jobs = {}
+        self.view_futures = {}
+        self.view_request_ids = {}
+        self.view_request_seq = 0
         self.setup_window()
         self.create_widgets()
         self.setup_bindings()
@@ -994,19 +1115,25 @@ class StundenEingabeGUI:
         self.day_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         day_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        # Refreshes only change the rows that differ, see load_view()
+        self.view_syncs = {
+            "month": TreeSync(self.month_tree),
+            "day": TreeSync(self.day_tree),
+        }
+
     def setup_bindings(self):
         self.entry_year.bind("<KeyRelease>", self.update_weekday)
         self.entry_month.bind("<KeyRelease>", self.update_weekday)
         self.entry_day.bind("<KeyRelease>", self.update_weekday)
 
-        self.entry_year.bind("<KeyRelease>", self.update_month_view, add="+")
-        self.entry_month.bind("<KeyRelease>", self.update_month_view, add="+")
-        self.entry_name.bind("<KeyRelease>", self.update_month_view, add="+")
+        self.entry_year.bind("<KeyRelease>", self.schedule_month_view, add="+")
+        self.entry_month.bind("<KeyRelease>", self.schedule_month_view, add="+")
+        self.entry_name.bind("<KeyRelease>", self.schedule_month_view, add="+")
 
-        self.entry_year.bind("<KeyRelease>", self.update_day_view, add="+")
-        self.entry_month.bind("<KeyRelease>", self.update_day_view, add="+")
-        self.entry_day.bind("<KeyRelease>", self.update_day_view, add="+")
-        self.entry_bst.bind("<KeyRelease>", self.update_day_view, add="+")
+        self.entry_year.bind("<KeyRelease>", self.schedule_day_view, add="+")
+        self.entry_month.bind("<KeyRelease>", self.schedule_day_view, add="+")
+        self.entry_day.bind("<KeyRelease>", self.schedule_day_view, add="+")
+        self.entry_bst.bind("<KeyRelease>", self.schedule_day_view, add="+")
 
         self.entry_year.bind("<KeyRelease>", self.check_edit_mode_abort, add="+")
         self.entry_month.bind("<KeyRelease>", self.check_edit_mode_abort, add="+")
@@ -1083,85 +1210,90 @@ class StundenEingabeGUI:
             except (ValueError, TypeError):
                 self.label_day.config(text="Tag(e):*")
 
-    def update_month_view(self, *args):
-        for item in self.month_tree.get_children():
-            self.month_tree.delete(item)
+    def schedule_month_view(self, event=None):
+        self._schedule_view_update("month", self.update_month_view)
+
+    def schedule_day_view(self, event=None):
+        self._schedule_view_update("day", self.update_day_view)
+
+    def _schedule_view_update(self, view, update):
+        # Typing restarts the delay, so only the last key loads the rows
+        self._cancel_view_job(view)
+        self.view_jobs[view] = self.root.after(VIEW_UPDATE_DELAY_MS, update)
 
+    def update_month_view(self, *args):
+        self._cancel_view_job("month")
         year = self.entry_year.get().strip()
         month = self.entry_month.get().strip()
         names_input = self.entry_name.get().strip()
 
-        if not (year and month):
-            return
-
         try:
             year_int = int(year)
             month_int = int(month)
+        except ValueError:
+            self.clear_view("month")
+            return
 
-            names = parse_multiple_names(names_input)
+        names = parse_multiple_names(names_input)
+        if not names:
+            self.clear_view("month")
+            return
 
-            if not names:
-                return
+        self.load_view("month", self.load_month_rows, year_int, month_int, names)
 
-            all_entries = []
-            for name in names:
-                entries = self.db.get_arbeitsstunden_for_month(
-                    year_int, month_int, name
-                )
-                all_entries.extend(entries)
+    def load_month_rows(self, year_int, month_int, names):
+        """Rows of the month tree as (values, tags); runs in the view loader."""
+        snapshot = self.db.load_month_snapshot(year_int, month_int)
+        all_entries = []
+        for name in names:
+            entries = snapshot.get_arbeitsstunden_for_month(year_int, month_int, name)
+            all_entries.extend(entries)
 
-            all_entries.sort(key=lambda x: x["tag"])
+        all_entries.sort(key=lambda x: x["tag"])
 
-            for i, entry in enumerate(all_entries):
-                tags = []
-                print(entry)
-                meta_data = (
-                    self.db.get_metadata_by_date(
-                        year_int, month_int, entry["tag"], entry["name"]
-                    )
-                    or {}
-                )
-                if meta_data.get("kg_8h"):
-                    tags.append("row_red")
-                else:
-                    tags.append("row_even" if i % 2 == 0 else "row_odd")
-
-                tags.append(f"entry_{entry['id']}")
-
-                self.month_tree.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        entry["tag"],
-                        entry["wochentag"] or "",
-                        entry["name"],
-                        entry["kostenstelle"] or "",
-                        entry["stunden"] or "",
-                        "X" if meta_data.get("fruehstueck") else "",
-                        "X" if meta_data.get("mittag") else "",
-                        meta_data.get("skug") or "",
-                        meta_data.get("travel_status") or "",
-                        "Ja"
-                        if meta_data.get("kg_8h")
-                        else ("" if meta_data.get("kg_8h") is None else "Nein"),
-                        "🗑",
-                    ),
-                    tags=tuple(tags),
+        rows = []
+        for i, entry in enumerate(all_entries):
+            tags = []
+            meta_data = (
+                snapshot.get_metadata_by_date(
+                    year_int, month_int, entry["tag"], entry["name"]
                 )
-
-        except (ValueError, TypeError):
-            pass
+                or {}
+            )
+            if meta_data.get("kg_8h"):
+                tags.append("row_red")
+            else:
+                tags.append("row_even" if i % 2 == 0 else "row_odd")
+
+            tags.append(f"entry_{entry['id']}")
+
+            values = (
+                entry["tag"],
+                entry["wochentag"] or "",
+                entry["name"],
+                entry["kostenstelle"] or "",
+                entry["stunden"] or "",
+                "X" if meta_data.get("fruehstueck") else "",
+                "X" if meta_data.get("mittag") else "",
+                meta_data.get("skug") or "",
+                meta_data.get("travel_status") or "",
+                "Ja"
+                if meta_data.get("kg_8h")
+                else ("" if meta_data.get("kg_8h") is None else "Nein"),
+                "🗑",
+            )
+            rows.append((values, tuple(tags)))
+        return rows
 
     def update_day_view(self, *args):
-        for item in self.day_tree.get_children():
-            self.day_tree.delete(item)
-
+        self._cancel_view_job("day")
         year = self.entry_year.get().strip()
         month = self.entry_month.get().strip()
         day_input = self.entry_day.get().strip()
         baustelle = self.entry_bst.get().strip()
 
         if not (year and month and day_input and baustelle):
+            self.clear_view("day")
             return
 
         try:
@@ -1174,57 +1306,97 @@ class StundenEingabeGUI:
             days = parse_date_range(
                 day_input, year_int, month_int, skip_weekends, skip_holidays
             )
+        except (ValueError, TypeError):
+            self.clear_view("day")
+            return
 
-            if days is None:
-                try:
-                    single_day = int(day_input)
-                    if 1 <= single_day <= 31:
-                        days = [single_day]
-                    else:
-                        return
-                except ValueError:
-                    return
+        if days is None:
+            try:
+                single_day = int(day_input)
+            except ValueError:
+                single_day = 0
+            if not 1 <= single_day <= 31:
+                self.clear_view("day")
+                return
+            days = [single_day]
 
-            all_entries = []
-            for day in days:
-                entries = self.db.get_entries_by_date_and_baustelle(
-                    year_int, month_int, day, baustelle
-                )
-                all_entries.extend(entries)
+        self.load_view(
+            "day", self.load_day_rows, year_int, month_int, days, baustelle
+        )
 
-            all_entries.sort(key=lambda x: x["tag"])
+    def load_day_rows(self, year_int, month_int, days, baustelle):
+        """Rows of the day tree as (values, tags); runs in the view loader."""
+        all_entries = self.db.get_entries_by_baustelle_in_range(
+            year_int, month_int, days, baustelle
+        )
 
-            for i, entry in enumerate(all_entries):
-                wochentag = (
-                    get_weekday_abbr(str(year_int), str(month_int), str(entry["tag"]))
-                    or ""
-                )
-                meta_data = (
-                    self.db.get_metadata_by_date(
-                        year_int, month_int, entry["tag"], entry["name"]
-                    )
-                    or {}
-                )
-                row_tag = "row_even" if i % 2 == 0 else "row_odd"
-                self.day_tree.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        entry["tag"],
-                        wochentag,
-                        entry["name"],
-                        entry["stunden"] or "",
-                        meta_data.get("skug") or "",
-                        meta_data.get("travel_status") or "",
-                        "Ja"
-                        if meta_data.get("kg_8h")
-                        else ("" if meta_data.get("kg_8h") is None else "Nein"),
-                    ),
-                    tags=(row_tag, f"entry_{entry['id']}"),
-                )
+        rows = []
+        for i, entry in enumerate(all_entries):
+            wochentag = (
+                get_weekday_abbr(str(year_int), str(month_int), str(entry["tag"]))
+                or ""
+            )
+            # The entries come with their resolved skug, kg_8h and travel_status
+            row_tag = "row_even" if i % 2 == 0 else "row_odd"
+            values = (
+                entry["tag"],
+                wochentag,
+                entry["name"],
+                entry["stunden"] or "",
+                entry.get("skug") or "",
+                entry.get("travel_status") or "",
+                "Ja"
+                if entry.get("kg_8h")
+                else ("" if entry.get("kg_8h") is None else "Nein"),
+            )
+            rows.append((values, (row_tag, f"entry_{entry['id']}")))
+        return rows
+
+    def load_view(self, view, load_rows, *args):
+        """
+        Run load_rows(*args) in the view loader and fill the tree of view
+        ("month" or "day") with its rows. Only the latest request of a view
+        is shown; an older one still waiting is cancelled, an older result is
+        dropped.
+        """
+        if self.view_executor is None:
+            return
+        self.view_request_seq += 1
+        request_id = self.view_request_seq
+        self.view_request_ids[view] = request_id
+        future = self.view_futures.get(view)
+        if future is not None:
+            future.cancel()
+        future = self.view_futures[view] = self.view_executor.submit(
+            load_rows, *args
+        )
+        future.add_done_callback(
+            lambda future: self.root.after(
+                0, self.on_view_rows_ready, view, future, request_id
+            )
+        )
 
-        except (ValueError, TypeError):
-            pass
+    def on_view_rows_ready(self, view, future, request_id):
+        if request_id != self.view_request_ids.get(view):
+            return
+        self.view_futures.pop(view, None)
+        try:
+            rows = future.result()
+        except Exception as exc:
+            print(f"Error loading {view} view: {exc}")
+            return
+        self.view_syncs[view].sync(rows)
+
+    def clear_view(self, view):
+        """Empty the tree of view and drop the rows still being loaded."""
+        self.view_request_seq += 1
+        self.view_request_ids[view] = self.view_request_seq
+        self.view_syncs[view].sync([])
+
+    def _cancel_view_job(self, view):
+        job = self.view_jobs.pop(view, None)
+        if job is not None:
+            self.root.after_cancel(job)
 
     def on_month_tree_click(self, event):
         region = self.month_tree.identify_region(event.x, event.y)
@@ -1533,6 +1705,10 @@ class StundenEingabeGUI:
         errors = []
         sorted_days = sorted(days)
         wants_day_metadata = input_fruehstueck or input_mittag or input_reise
+        # Changes are collected here and written in one transaction below
+        new_entries = []
+        entry_updates = []
+        metadata_rows = []
         try:
             if (
                 new_stunden is not None
@@ -1542,173 +1718,187 @@ class StundenEingabeGUI:
             ):
                 for name in names:
                     for day in sorted_days:
-                        existing_entries = self.db.get_arbeitsstunden_for_day(
-                            jahr_int, monat_int, day, name
-                        )
-                        if any(
-                            e.get("kostenstelle") in ["Krank", "900", "940"]
-                            for e in existing_entries
-                        ):
+                        if self.db.has_absence_entry(jahr_int, monat_int, day, name):
                             messagebox.showerror(
                                 "Fehler",
                                 "Stunden ohne Kostenstelle sind nicht erlaubt, wenn bereits Krank/Urlaub erfasst ist.",
                             )
                             return
 
-            for name in names:
-                for i, day in enumerate(sorted_days):
-                    if input_krank or input_urlaub:
-                        skug_settings = self.master_db.get_skug_settings()
-                        handle_krank_urlaub(
-                            jahr_int,
-                            monat_int,
-                            day,
-                            name,
-                            self.db,
-                            self.master_db,
-                            input_krank,
-                            input_urlaub,
-                            skug_settings,
-                        )
-                        total_entries += 1
-                        continue
+            with self.db.transaction():
+                for name in names:
+                    for i, day in enumerate(sorted_days):
+                        if input_krank or input_urlaub:
+                            skug_settings = self.master_db.get_skug_settings()
+                            handle_krank_urlaub(
+                                jahr_int,
+                                monat_int,
+                                day,
+                                name,
+                                self.db,
+                                self.master_db,
+                                input_krank,
+                                input_urlaub,
+                                skug_settings,
+                            )
+                            total_entries += 1
+                            continue
 
-                    if (
-                        edit_mode_for_submit
-                        and edit_entry_data
-                        and name == edit_entry_data.get("name")
-                        and day == int(edit_entry_data.get("tag"))
-                    ):
-                        target_entry_id = self.edit_entry_id
-                        entry_data = dict(edit_entry_data)
-                        errors = []
-                    else:
-                        target_entry_id, entry_data, errors = try_load_existing_entry(
-                            jahr_int, monat_int, day, name, baustelle_input, self.db
-                        )
-                    metadata_entry = self.db.get_stored_metadata_by_date(
-                        jahr_int, monat_int, day, name
-                    )
-                    if not metadata_entry:
-                        metadata_entry = {}
-                        wochentag = (
-                            get_weekday_abbr(jahr_int, monat_int, str(day)) or ""
-                        )
-                        metadata_entry.update(
-                            {
-                                "jahr": jahr_int,
-                                "monat": monat_int,
-                                "tag": str(day),
-                                "name": name,
-                                "wochentag": wochentag,
-                            }
+                        if (
+                            edit_mode_for_submit
+                            and edit_entry_data
+                            and name == edit_entry_data.get("name")
+                            and day == int(edit_entry_data.get("tag"))
+                        ):
+                            target_entry_id = self.edit_entry_id
+                            entry_data = dict(edit_entry_data)
+                            errors = []
+                        else:
+                            (
+                                target_entry_id,
+                                entry_data,
+                                errors,
+                            ) = try_load_existing_entry(
+                                jahr_int,
+                                monat_int,
+                                day,
+                                name,
+                                baustelle_input,
+                                self.db,
+                            )
+                        metadata_entry = self.db.get_stored_metadata_by_date(
+                            jahr_int, monat_int, day, name
                         )
+                        if not metadata_entry:
+                            metadata_entry = {}
+                            wochentag = (
+                                get_weekday_abbr(jahr_int, monat_int, str(day)) or ""
+                            )
+                            metadata_entry.update(
+                                {
+                                    "jahr": jahr_int,
+                                    "monat": monat_int,
+                                    "tag": str(day),
+                                    "name": name,
+                                    "wochentag": wochentag,
+                                }
+                            )
 
-                    if errors:
-                        continue
+                        if errors:
+                            continue
 
-                    has_existing_work_entry = self.day_has_work_entry(
-                        jahr_int, monat_int, day, name
-                    )
-                    creates_work_entry_now = new_stunden is not None and bool(
-                        baustelle_input or entry_data.get("Kostenstelle")
-                    )
-                    if wants_day_metadata and not (
-                        has_existing_work_entry or creates_work_entry_now
-                    ):
-                        errors.append(
-                            f"Fruehstueck, Mittag und Reise sind nur mit einem Arbeitseintrag erlaubt: {name} am {day}.{monat_int}.{jahr_int}."
+                        has_existing_work_entry = self.day_has_work_entry(
+                            jahr_int, monat_int, day, name
                         )
-                        continue
-
-                    if new_stunden is not None:
-                        entry_data["Stunden"] = new_stunden
-
-                    if baustelle_input:
-                        entry_data["Kostenstelle"] = baustelle_input
-                    elif (
-                        new_stunden is not None and not input_krank and not input_urlaub
-                    ):
-                        if not self.entry_service.is_valid_kostenstelle(
-                            entry_data.get("Kostenstelle")
+                        creates_work_entry_now = new_stunden is not None and bool(
+                            baustelle_input or entry_data.get("Kostenstelle")
+                        )
+                        if wants_day_metadata and not (
+                            has_existing_work_entry or creates_work_entry_now
                         ):
                             errors.append(
-                                "Kostenstelle fehlt oder ist ungültig. Bitte Baustelle auswählen."
+                                f"Fruehstueck, Mittag und Reise sind nur mit einem Arbeitseintrag erlaubt: {name} am {day}.{monat_int}.{jahr_int}."
                             )
                             continue
 
-                    if not target_entry_id:
-                        wochentag = (
-                            get_weekday_abbr(jahr_int, monat_int, str(day)) or ""
-                        )
-                        entry_data.update(
-                            {
-                                "jahr": jahr_int,
-                                "monat": monat_int,
-                                "tag": str(day),
-                                "name": name,
-                                "wochentag": wochentag,
-                                "stunden": new_stunden
-                                if new_stunden is not None
-                                else 0.0,
-                                "kostenstelle": baustelle_input,
-                            }
-                        )
+                        if new_stunden is not None:
+                            entry_data["Stunden"] = new_stunden
 
-                    if input_fruehstueck:
-                        metadata_entry["fruehstueck"] = True
-                    if input_mittag:
-                        metadata_entry["mittag"] = True
-
-                    if edit_mode_for_submit:
-                        metadata_entry["fruehstueck"] = input_fruehstueck
-                        metadata_entry["mittag"] = input_mittag
-                        metadata_entry["urlaub"] = None
-                        metadata_entry["krank"] = None
-
-                    if input_reise:
-                        final_travel_status = None
-                        if travel_type_input == TravelStatus.Auto:
-                            if len(sorted_days) == 1:
-                                final_travel_status = "Anreise"
-                            else:
-                                if i == 0:
-                                    final_travel_status = "Anreise"
-                                elif i == len(sorted_days) - 1:
-                                    final_travel_status = "Abreise"
-                                else:
-                                    final_travel_status = "24h_away"
-                        else:
-                            final_travel_status = travel_type_input
-                        metadata_entry["travel_status"] = final_travel_status
-                    elif edit_mode_for_submit:
-                        metadata_entry["travel_status"] = None
-
-                    metadata_entry["no_skug"] = input_no_skug
-
-                    if not check_arbeitsstunden(entry_data):
-                        pass
-                    elif target_entry_id:
-                        print("Update arbeitsentry")
-                        self.db.update_arbeitsstunden(target_entry_id, entry_data)
-                    elif new_stunden is None:
-                        pass
-                    else:
-                        print("Add new arbeitsentry")
-                        self.db.add_arbeitsstunden(entry_data)
+                        if baustelle_input:
+                            entry_data["Kostenstelle"] = baustelle_input
+                        elif (
+                            new_stunden is not None
+                            and not input_krank
+                            and not input_urlaub
+                        ):
+                            if not self.entry_service.is_valid_kostenstelle(
+                                entry_data.get("Kostenstelle")
+                            ):
+                                errors.append(
+                                    "Kostenstelle fehlt oder ist ungültig. Bitte Baustelle auswählen."
+                                )
+                                continue
+
+                        if not target_entry_id:
+                            wochentag = (
+                                get_weekday_abbr(jahr_int, monat_int, str(day)) or ""
+                            )
+                            entry_data.update(
+                                {
+                                    "jahr": jahr_int,
+                                    "monat": monat_int,
+                                    "tag": str(day),
+                                    "name": name,
+                                    "wochentag": wochentag,
+                                    "stunden": new_stunden
+                                    if new_stunden is not None
+                                    else 0.0,
+                                    "kostenstelle": baustelle_input,
+                                }
+                            )
 
-                    if delete_mode and not edit_mode_for_submit:
                         if input_fruehstueck:
-                            metadata_entry["fruehstueck"] = False
+                            metadata_entry["fruehstueck"] = True
                         if input_mittag:
-                            metadata_entry["mittag"] = False
-                        if input_no_skug:
-                            metadata_entry["no_skug"] = False
+                            metadata_entry["mittag"] = True
+
+                        if edit_mode_for_submit:
+                            metadata_entry["fruehstueck"] = input_fruehstueck
+                            metadata_entry["mittag"] = input_mittag
+                            metadata_entry["urlaub"] = None
+                            metadata_entry["krank"] = None
+
                         if input_reise:
+                            final_travel_status = None
+                            if travel_type_input == TravelStatus.Auto:
+                                if len(sorted_days) == 1:
+                                    final_travel_status = "Anreise"
+                                else:
+                                    if i == 0:
+                                        final_travel_status = "Anreise"
+                                    elif i == len(sorted_days) - 1:
+                                        final_travel_status = "Abreise"
+                                    else:
+                                        final_travel_status = "24h_away"
+                            else:
+                                final_travel_status = travel_type_input
+                            metadata_entry["travel_status"] = final_travel_status
+                        elif edit_mode_for_submit:
                             metadata_entry["travel_status"] = None
 
-                    total_entries += 1
-                    self.db.add_or_update_metadata(metadata_entry)
+                        metadata_entry["no_skug"] = input_no_skug
+
+                        if not check_arbeitsstunden(entry_data):
+                            pass
+                        elif target_entry_id:
+                            print("Update arbeitsentry")
+                            entry_updates.append((target_entry_id, entry_data))
+                        elif new_stunden is None:
+                            pass
+                        else:
+                            print("Add new arbeitsentry")
+                            new_entries.append(entry_data)
+
+                        if delete_mode and not edit_mode_for_submit:
+                            if input_fruehstueck:
+                                metadata_entry["fruehstueck"] = False
+                            if input_mittag:
+                                metadata_entry["mittag"] = False
+                            if input_no_skug:
+                                metadata_entry["no_skug"] = False
+                            if input_reise:
+                                metadata_entry["travel_status"] = None
+
+                        total_entries += 1
+                        metadata_rows.append(metadata_entry)
+
+                self.db.add_arbeitsstunden_many(new_entries)
+                for entry_id, entry_data in entry_updates:
+                    if not self.db.update_arbeitsstunden(entry_id, entry_data):
+                        raise RuntimeError(
+                            f"Eintrag {entry_id} konnte nicht aktualisiert werden."
+                        )
+                self.db.upsert_metadata_many(metadata_rows)
 
             if errors:
                 error_msg = (
@@ -1725,7 +1915,9 @@ class StundenEingabeGUI:
 
         self.update_month_view()
         self.update_day_view()
-        self.schedule_preview_refresh()
+        self.schedule_preview_patch(
+            {(jahr_int, monat_int, day, name) for name in names for day in days}
+        )
 
         if self.settings.get("auto_increment_day", False) and not delete_mode:
             last_day = max(days)
@@ -1835,6 +2027,9 @@ class StundenEingabeGUI:
 
     def on_app_close(self):
         self.shutdown_preview_executor()
+        self.shutdown_view_executor()
+        self.db.close()
+        self.master_db.close()
         self.root.destroy()
 
     def shutdown_preview_executor(self):
@@ -1846,6 +2041,18 @@ class StundenEingabeGUI:
             self.preview_executor.shutdown(wait=False)
         self.preview_executor = None
 
+    def shutdown_view_executor(self):
+        if self.view_executor is None:
+            return
+        for job in self.view_jobs.values():
+            self.root.after_cancel(job)
+        self.view_jobs = {}
+        try:
+            self.view_executor.shutdown(wait=False, cancel_futures=True)
+        except TypeError:
+            self.view_executor.shutdown(wait=False)
+        self.view_executor = None
+
     def schedule_preview_refresh(self, event=None):
         if self.preview_window is None or not self.preview_window.is_open():
             return
@@ -1913,7 +2120,7 @@ class StundenEingabeGUI:
             "Lade Vorschau...",
         )
         self.preview_task_future = self.preview_executor.submit(
-            self.build_preview_workbook, year_int, month_int
+            self.build_preview_report, year_int, month_int
         )
         self.preview_task_future.add_done_callback(
             lambda future: self.root.after(
@@ -1926,12 +2133,14 @@ class StundenEingabeGUI:
             )
         )
 
-    def build_preview_workbook(self, year_int, month_int):
-        cell_map = {}
-        workbook = build_workbook_top_to_bottom(
-            year_int, month_int, self.db, self.master_db, cell_map
-        )
-        return workbook, cell_map
+    def build_preview_report(self, year_int, month_int):
+        report = build_month_report(year_int, month_int, self.db, self.master_db)
+        if report is None:
+            return None, None
+        # Laid out here in the worker thread; the preview only copies the cells
+        sheet = SheetBuffer()
+        draw_month_report(sheet, report)
+        return report, sheet
 
     def on_preview_ready(self, future, request_id, year_int, month_int):
         if self.preview_window is None or not self.preview_window.is_open():
@@ -1940,20 +2149,21 @@ class StundenEingabeGUI:
             return
 
         try:
-            workbook, cell_map = future.result()
+            report, sheet = future.result()
         except Exception as exc:
             self.preview_window.show_message(
                 f"Excel Vorschau {month_int:02d}/{year_int}",
                 f"Fehler beim Laden der Vorschau: {exc}",
             )
-            workbook = None
-            cell_map = None
+            report = None
+            sheet = None
 
-        if workbook is not None:
-            self.preview_window.render_workbook(
-                workbook, year_int, month_int, cell_map=cell_map
-            )
+        if report is not None:
+            self.preview_window.render_report(report, sheet)
 
+        self.start_pending_preview_build()
+
+    def start_pending_preview_build(self):
         if self.preview_pending_request is not None:
             pending_request_id, pending_year, pending_month = (
                 self.preview_pending_request
@@ -1961,6 +2171,68 @@ class StundenEingabeGUI:
             self.preview_pending_request = None
             self.start_preview_build(pending_request_id, pending_year, pending_month)
 
+    def schedule_preview_patch(self, affected_days):
+        """
+        Update only the changed days ({(year, month, day, name)}) and the
+        summary values of their workers in the shown preview. Falls back to
+        a full refresh while no report is shown or another build is running.
+        """
+        if self.preview_window is None or not self.preview_window.is_open():
+            return
+        report = self.preview_window.report
+        if (
+            report is None
+            or self.preview_pending_edits
+            or self.preview_pending_flags
+            or self.preview_refresh_job is not None
+            or (
+                self.preview_task_future is not None
+                and not self.preview_task_future.done()
+            )
+        ):
+            self.schedule_preview_refresh()
+            return
+
+        self.preview_request_seq += 1
+        request_id = self.preview_request_seq
+        self.preview_inflight_request_id = request_id
+        self.preview_task_future = self.preview_executor.submit(
+            load_worker_patches, report, self.db, self.master_db, affected_days
+        )
+        self.preview_task_future.add_done_callback(
+            lambda future: self.root.after(
+                0, self.on_preview_patch_ready, future, request_id, report
+            )
+        )
+
+    def on_preview_patch_ready(self, future, request_id, report):
+        if self.preview_window is None or not self.preview_window.is_open():
+            return
+        if request_id != self.preview_inflight_request_id:
+            return
+
+        try:
+            patches = future.result()
+        except Exception as exc:
+            print(f"Error updating preview: {exc}")
+            patches = None
+
+        if self.preview_pending_request is not None:
+            # A full build was requested meanwhile and replaces the patch
+            self.start_pending_preview_build()
+        elif patches is None or self.preview_window.report is not report:
+            # Days got more or fewer lines: draw the month again
+            self.refresh_preview_from_entries()
+        elif patches:
+            report.apply_patches(patches)
+            sheet = SheetBuffer()
+            coordinates = []
+            for patch in patches:
+                coordinates.extend(
+                    draw_worker_cells(sheet, report, patch.name, patch.days)
+                )
+            self.preview_window.patch_cells(sheet, coordinates)
+
     def handle_preview_edit(self, row, col, value):
         if self.preview_window is None or not self.preview_window.is_open():
             return
@@ -1972,24 +2244,12 @@ class StundenEingabeGUI:
         wb_row = row + 1
         wb_col = col
         cell_info = self.preview_window.cell_map.get((wb_row, wb_col))
-        if not cell_info:
+        if cell_info is None:
             messagebox.showwarning("Hinweis", "Diese Zelle ist nicht editierbar.")
             self.schedule_preview_refresh()
             return
 
         raw_value = "" if value is None else str(value).strip()
-        field = cell_info.get("field")
-        year = cell_info.get("year")
-        month = cell_info.get("month")
-        day = cell_info.get("day")
-        name = cell_info.get("name")
-        entry_id = cell_info.get("entry_id")
-
-        if not all([year, month, day, name]):
-            messagebox.showerror("Fehler", "Ungültige Zellzuordnung.")
-            self.schedule_preview_refresh()
-            return
-
         original_value = self.preview_window.original_values.get((row, col))
         original_text = "" if original_value is None else str(original_value)
         is_changed = raw_value != original_text
@@ -2014,61 +2274,43 @@ class StundenEingabeGUI:
         if not self.preview_window.cell_map:
             return
 
-        previous_edits = self.preview_pending_edits
-        previous_keys = set(previous_edits.keys())
-        new_edits = {}
+        # Only the cells the sheet events reported as changed are compared
+        dirty_cells = self.preview_window.take_dirty_cells()
+        if dirty_cells is None:
+            dirty_cells = [
+                (wb_row - 1, wb_col)
+                for wb_row, wb_col in self.preview_window.cell_map
+            ]
 
-        for (wb_row, wb_col), cell_info in self.preview_window.cell_map.items():
-            row = wb_row - 1
-            col = wb_col
+        for row, col in dirty_cells:
             if row < 0 or col <= 0:
                 continue
-            flag_key = (
-                cell_info.get("year"),
-                cell_info.get("month"),
-                cell_info.get("day"),
-                cell_info.get("name"),
-            )
+            cell_info = self.preview_window.cell_map.get((row + 1, col))
+            if cell_info is None:
+                continue
+            flag_key = cell_info.day_key()
             pending_day_flags = self.preview_pending_flags.get(flag_key, {})
-            if cell_info.get("field") in ["Stunden", "Kostenstelle"] and (
-                pending_day_flags.get("krank") or pending_day_flags.get("urlaub")
+            is_changed = False
+            if not (
+                cell_info.field in ["Stunden", "Kostenstelle"]
+                and (pending_day_flags.get("krank") or pending_day_flags.get("urlaub"))
             ):
-                continue
-            current_value = self.preview_window.get_cell_text(row, col)
-            raw_value = "" if current_value is None else str(current_value).strip()
-            original_value = self.preview_window.original_values.get((row, col))
-            original_text = "" if original_value is None else str(original_value)
-            if raw_value != original_text:
-                new_edits[(row, col)] = {
+                current_value = self.preview_window.get_cell_text(row, col)
+                raw_value = "" if current_value is None else str(current_value).strip()
+                original_value = self.preview_window.original_values.get((row, col))
+                original_text = "" if original_value is None else str(original_value)
+                is_changed = raw_value != original_text
+
+            if is_changed:
+                self.preview_pending_edits[(row, col)] = {
                     "cell_info": cell_info,
                     "value": raw_value,
                 }
-
-        self.preview_pending_edits = new_edits
-
-        new_keys = set(new_edits.keys())
-        removed_keys = previous_keys - new_keys
-        for row, col in new_keys:
-            self.preview_window.mark_changed_cell(row, col, True)
-
-        for row, col in removed_keys:
-            cell_info = None
-            if (row, col) in previous_edits:
-                cell_info = previous_edits[(row, col)].get("cell_info")
-            if cell_info is None:
-                cell_info = self.preview_window.cell_map.get((row + 1, col))
-            keep_highlight = False
-            if cell_info:
-                flag_key = (
-                    cell_info.get("year"),
-                    cell_info.get("month"),
-                    cell_info.get("day"),
-                    cell_info.get("name"),
-                )
-                if flag_key in self.preview_pending_flags:
-                    keep_highlight = True
-            if not keep_highlight:
-                self.preview_window.mark_changed_cell(row, col, False)
+                self.preview_window.mark_changed_cell(row, col, True)
+            elif self.preview_pending_edits.pop((row, col), None) is not None:
+                # Cells of days with pending flags stay highlighted
+                if flag_key not in self.preview_pending_flags:
+                    self.preview_window.mark_changed_cell(row, col, False)
 
         self.preview_window.set_pending_count(
             len(self.preview_pending_edits) + len(self.preview_pending_flags)
@@ -2088,12 +2330,7 @@ class StundenEingabeGUI:
             )
 
         for (row, col), cell_info in self.preview_window.cell_map.items():
-            if (
-                cell_info.get("year") == year
-                and cell_info.get("month") == month
-                and cell_info.get("day") == day
-                and cell_info.get("name") == name
-            ):
+            if cell_info.day_key() == key:
                 sheet_row = row - 1
                 sheet_col = col
                 self.preview_window.mark_changed_cell(sheet_row, sheet_col, True)
@@ -2121,17 +2358,12 @@ class StundenEingabeGUI:
                     bst_value = "940"
             std_col = None
             bst_col = None
+            day_key = (year, month, day, name)
             for (wb_row, wb_col), info in self.preview_window.cell_map.items():
-                if (
-                    info.get("year") == year
-                    and info.get("month") == month
-                    and info.get("day") == day
-                    and info.get("name") == name
-                    and wb_row - 1 == row
-                ):
-                    if info.get("field") == "Stunden":
+                if wb_row - 1 == row and info.day_key() == day_key:
+                    if info.field == "Stunden":
                         std_col = wb_col
-                    elif info.get("field") == "Kostenstelle":
+                    elif info.field == "Kostenstelle":
                         bst_col = wb_col
 
             if std_col is None:
@@ -2149,22 +2381,26 @@ class StundenEingabeGUI:
             messagebox.showinfo("Hinweis", "Keine Änderungen zum Anwenden.")
             return
 
-        errors, _ = self.entry_service.apply_preview_changes(
+        errors, affected_days = self.entry_service.apply_preview_changes(
             self.preview_pending_edits, self.preview_pending_flags
         )
         if errors:
             messagebox.showerror("Fehler", "\n".join(errors[:10]))
             return
 
+        # The patch redraws every day with a pending change, which also
+        # removes its highlight; the rest of the sheet keeps its colours
+        affected_days = set(affected_days) | set(self.preview_pending_flags)
+        for edit in self.preview_pending_edits.values():
+            affected_days.add(edit["cell_info"].day_key())
         self.preview_pending_edits = {}
         self.preview_pending_flags = {}
         if self.preview_window is not None and self.preview_window.is_open():
             self.preview_window.set_pending_count(0)
-            self.preview_window.clear_pending_highlights()
 
         self.update_month_view()
         self.update_day_view()
-        self.schedule_preview_refresh()
+        self.schedule_preview_patch(affected_days)
 
     def reset_preview_changes(self):
         self.preview_pending_edits = {}
@@ -2304,10 +2540,10 @@ class StundenEingabeGUI:
             self.day_tree.heading(column, text=heading_text)
 
     def open_name_manager(self):
-        NameManagerDialog(self.root)
+        NameManagerDialog(self.root, self.master_db)
 
     def open_baustelle_manager(self):
-        BaustelleManagerDialog(self.root)
+        BaustelleManagerDialog(self.root, self.master_db, self.db)
 
     def open_settings(self):
         dialog = SettingsDialog(self.root, self.settings, self.master_db)
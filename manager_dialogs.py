@@ -8,9 +8,9 @@ from datatypes import WorkerTypes
 class NameManagerDialog:
     """Dialog for managing names."""
 
-    def __init__(self, parent):
+    def __init__(self, parent, master_db=None):
         self.parent = parent
-        self.db = MasterDataDatabase()
+        self.db = master_db if master_db is not None else MasterDataDatabase()
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Namen verwalten")
         self.dialog.geometry("400x400")
@@ -361,7 +361,7 @@ class NameManagerDialog:
             edit_dialog,
             text="Abweichungen verwalten",
             command=lambda: WorkerOverrideDialog(
-                edit_dialog, name_data["id"], old_name
+                edit_dialog, name_data["id"], old_name, self.db
             ),
         ).grid(row=8, column=0, columnspan=2, pady=10)
 
@@ -389,11 +389,11 @@ class NameManagerDialog:
 class WorkerOverrideDialog:
     """Dialog for managing worker-specific construction site overrides."""
 
-    def __init__(self, parent, worker_id, worker_name):
+    def __init__(self, parent, worker_id, worker_name, master_db=None):
         self.parent = parent
         self.worker_id = worker_id
         self.worker_name = worker_name
-        self.db = MasterDataDatabase()
+        self.db = master_db if master_db is not None else MasterDataDatabase()
 
         self.dialog = tk.Toplevel(parent)
         self.dialog.title(f"Abweichungen für {worker_name}")
@@ -611,11 +611,13 @@ class WorkerOverrideDialog:
 class BaustelleManagerDialog:
     """Dialog for managing baustellen."""
 
-    def __init__(self, parent):
+    def __init__(self, parent, master_db=None, hours_db=None):
         self.parent = parent
-        self.db = MasterDataDatabase()
-        self.hours_db = Database()
-        self.hours_db.set_master_db(self.db)
+        self.db = master_db if master_db is not None else MasterDataDatabase()
+        if hours_db is None:
+            hours_db = Database()
+            hours_db.set_master_db(self.db)
+        self.hours_db = hours_db
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Baustellen verwalten")
         self.dialog.geometry("600x500")
@@ -1,14 +1,27 @@
 import sqlite3
+import threading
 from typing import List, Dict, Optional
 
+from db_connection import ConnectionManager
+
+
 class MasterDataDatabase:
     """Database for managing master data (Names and Baustellen)."""
 
     SCHEMA_VERSION = 6  # Current database schema version
 
-    def __init__(self, db_file="master_data.db"):
+    def __init__(self, db_file="master_data.db", pragmas=None):
         self.db_file = db_file
         self.init_database()
+        self.connections = ConnectionManager(db_file, pragmas)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Return the persistent connection of the calling thread."""
+        return self.connections.get_connection()
+
+    def close(self):
+        """Close the connections of all threads."""
+        self.connections.close_all()
 
     def init_database(self):
         """Create tables if they don't exist."""
@@ -162,7 +175,7 @@ class MasterDataDatabase:
     def add_name(self, name: str, worker_type: str = 'Fest', kein_verpflegungsgeld: bool = False, 
                  keine_feiertagssstunden: bool = False, kein_fzk: bool = False, weekly_hours: float = 0.0, extra_table: bool = False) -> Optional[int]:
         """Add a new name. Returns ID or None if already exists."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -175,65 +188,56 @@ class MasterDataDatabase:
             return cursor.lastrowid
         except sqlite3.IntegrityError:
             # Name already exists
+            conn.rollback()
             return None
-        finally:
-            conn.close()
 
     def get_all_names(self) -> List[Dict]:
         """Get all names."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM names ORDER BY name ASC')
         rows = cursor.fetchall()
-        conn.close()
 
         return [dict(row) for row in rows]
     
     def get_all_names_list(self) -> List[str]:
         """Get all names as a list of strings."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT name FROM names ORDER BY name ASC')
         rows = cursor.fetchall()
-        conn.close()
 
         return [row[0] for row in rows]
     
     def get_worker_type_by_name(self, name: str) -> Optional[str]:
         """Get the worker_type of a name."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT worker_type FROM names WHERE name = ?', (name,))
         row = cursor.fetchone()
-        conn.close()
 
         return row[0] if row else None
     
     def get_worker_id_by_name(self, name: str) -> Optional[int]:
         """Get the ID of a worker by name."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT id FROM names WHERE name = ?', (name,))
         row = cursor.fetchone()
-        conn.close()
 
         return row[0] if row else None
     
     def get_name_by_name(self, name: str) -> Optional[Dict]:
         """Get a name by name."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM names WHERE name = ?', (name,))
         row = cursor.fetchone()
-        conn.close()
 
         return dict(row) if row else None
 
@@ -243,7 +247,7 @@ class MasterDataDatabase:
                     kein_verpflegungsgeld: bool = None, keine_feiertagssstunden: bool = None, 
                     kein_fzk: bool = None, weekly_hours: float = None, extra_table: bool = None) -> bool:
         """Update a name. Returns True if successful."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -283,13 +287,12 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.rowcount > 0
         except sqlite3.IntegrityError:
+            conn.rollback()
             return False
-        finally:
-            conn.close()
 
     def delete_name(self, name_id: int) -> bool:
         """Delete a name. Returns True if successful."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -297,14 +300,13 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.rowcount > 0
         except sqlite3.Error:
+            conn.rollback()
             return False
-        finally:
-            conn.close()
 
     # --- BAUSTELLEN Methods ---
     def add_baustelle(self, nummer: str, name: str, verpflegungsgeld: float = 0.0, fahrzeit: float = 0.0, distance_km: float = 0.0) -> Optional[int]:
         """Add a new baustelle. Returns ID or None if already exists."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -315,48 +317,42 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.lastrowid
         except sqlite3.IntegrityError:
+            conn.rollback()
             return None
-        finally:
-            conn.close()
 
     def get_all_baustellen(self) -> List[Dict]:
         """Get all baustellen."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM baustellen ORDER BY nummer ASC, name ASC')
         rows = cursor.fetchall()
-        conn.close()
 
         return [dict(row) for row in rows]
     
     def get_baustelle_by_nummer(self, baustelle_id: int) -> Optional[Dict]:
         """Get a baustelle by nummer."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM baustellen WHERE nummer = ?', (baustelle_id,))
         row = cursor.fetchone()
-        conn.close()
 
         return dict(row) if row else None
     
     def get_baustelle_id_by_nummer(self, nummer: str) -> Optional[int]:
         """Get the ID of a baustelle by nummer."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT id FROM baustellen WHERE nummer = ?', (nummer,))
         row = cursor.fetchone()
-        conn.close()
 
         return row[0] if row else None
 
     def update_baustelle(self, baustelle_id: int, nummer: str, name: str, verpflegungsgeld: float, fahrzeit: float = 0.0, distance_km: float = 0.0) -> bool:
         """Update a baustelle. Returns True if successful."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -367,13 +363,12 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.rowcount > 0
         except sqlite3.IntegrityError:
+            conn.rollback()
             return False
-        finally:
-            conn.close()
 
     def delete_baustelle(self, baustelle_id: int) -> bool:
         """Delete a baustelle. Returns True if successful."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -381,15 +376,14 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.rowcount > 0
         except sqlite3.Error:
+            conn.rollback()
             return False
-        finally:
-            conn.close()
 
     # --- BAUSTELLE WORKER OVERRIDES Methods ---
     def add_override(self, worker_id: int, baustelle_id: int, verpflegungsgeld: Optional[float] = None, 
                      fahrzeit: Optional[float] = None, distance_km: Optional[float] = None) -> bool:
         """Add or update an override for a worker on a baustelle."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -405,15 +399,13 @@ class MasterDataDatabase:
             conn.commit()
             return True
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"Error adding override: {e}")
             return False
-        finally:
-            conn.close()
 
     def get_overrides_for_worker(self, worker_id: int) -> List[Dict]:
         """Get all overrides for a worker."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -423,14 +415,12 @@ class MasterDataDatabase:
             WHERE o.worker_id = ?
         ''', (worker_id,))
         rows = cursor.fetchall()
-        conn.close()
 
         return [dict(row) for row in rows]
     
     def get_override(self, worker_id: int, baustelle_id: int) -> Optional[Dict]:
         """Get specific override for a worker and baustelle."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -438,13 +428,22 @@ class MasterDataDatabase:
             WHERE worker_id = ? AND baustelle_id = ?
         ''', (worker_id, baustelle_id))
         row = cursor.fetchone()
-        conn.close()
 
         return dict(row) if row else None
 
+    def get_all_overrides(self) -> List[Dict]:
+        """Get all overrides of all workers."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT * FROM baustelle_worker_overrides')
+        rows = cursor.fetchall()
+
+        return [dict(row) for row in rows]
+
     def delete_override(self, override_id: int) -> bool:
         """Delete an override."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -452,26 +451,23 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.rowcount > 0
         except sqlite3.Error:
+            conn.rollback()
             return False
-        finally:
-            conn.close()
 
     # --- SKUG SETTINGS Methods ---
     def get_skug_settings(self) -> Dict:
         """Get SKUG settings."""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM skug_settings WHERE id = 1')
         row = cursor.fetchone()
-        conn.close()
 
         return dict(row) if row else {}
 
     def update_skug_settings(self, settings: Dict) -> bool:
         """Update SKUG settings. Returns True if successful."""
-        conn = sqlite3.connect(self.db_file)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -504,6 +500,156 @@ class MasterDataDatabase:
             conn.commit()
             return cursor.rowcount > 0
         except sqlite3.Error:
+            conn.rollback()
             return False
+
+
+class MasterDataCache(MasterDataDatabase):
+    """
+    MasterDataDatabase that keeps names, baustellen, overrides and SKUG
+    settings in memory.
+
+    Each table is read once and served from dicts afterwards. Every
+    add_*/update_*/delete_* call goes to the database and then drops the
+    cached tables and increments `generation`, so the next read loads them
+    again. Changes made through another MasterDataDatabase instance are not
+    seen; share one instance (or call invalidate()).
+    """
+
+    SECTIONS = ("names", "baustellen", "overrides", "skug_settings")
+
+    def __init__(self, db_file="master_data.db", pragmas=None):
+        super().__init__(db_file, pragmas)
+        self.generation = 0
+        self.hits = {section: 0 for section in self.SECTIONS}
+        self.misses = {section: 0 for section in self.SECTIONS}
+        self._cache_lock = threading.Lock()
+        self._tables = {}
+
+    def invalidate(self):
+        """Drop all cached tables."""
+        with self._cache_lock:
+            self.generation += 1
+            self._tables = {}
+
+    def cache_stats(self) -> Dict:
+        """Generation and hit/miss counters per cached table."""
+        with self._cache_lock:
+            return {
+                "generation": self.generation,
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+            }
+
+    def _get_table(self, section: str):
+        with self._cache_lock:
+            table = self._tables.get(section)
+            if table is not None:
+                self.hits[section] += 1
+                return table
+            self.misses[section] += 1
+            generation = self.generation
+
+        table = getattr(self, f"_load_{section}")()
+
+        with self._cache_lock:
+            # Don't keep a table that was read before a concurrent write
+            if self.generation == generation:
+                self._tables[section] = table
+        return table
+
+    def _load_names(self) -> Dict:
+        rows = super().get_all_names()
+        return {"rows": rows, "by_name": {row["name"]: row for row in rows}}
+
+    def _load_baustellen(self) -> Dict:
+        rows = super().get_all_baustellen()
+        by_nummer = {}
+        # Same row as get_baustelle_by_nummer: first match by (nummer, name)
+        for row in rows:
+            by_nummer.setdefault(str(row["nummer"]), row)
+        return {"rows": rows, "by_nummer": by_nummer}
+
+    def _load_overrides(self) -> Dict:
+        rows = super().get_all_overrides()
+        return {
+            "rows": rows,
+            "by_key": {(row["worker_id"], row["baustelle_id"]): row for row in rows},
+        }
+
+    def _load_skug_settings(self) -> Dict:
+        return super().get_skug_settings()
+
+    def _write(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
         finally:
-            conn.close()
+            self.invalidate()
+
+    # --- Cached reads ---
+    def get_all_names(self) -> List[Dict]:
+        return [dict(row) for row in self._get_table("names")["rows"]]
+
+    def get_all_names_list(self) -> List[str]:
+        return [row["name"] for row in self._get_table("names")["rows"]]
+
+    def get_worker_type_by_name(self, name: str) -> Optional[str]:
+        row = self._get_table("names")["by_name"].get(name)
+        return row["worker_type"] if row else None
+
+    def get_worker_id_by_name(self, name: str) -> Optional[int]:
+        row = self._get_table("names")["by_name"].get(name)
+        return row["id"] if row else None
+
+    def get_name_by_name(self, name: str) -> Optional[Dict]:
+        row = self._get_table("names")["by_name"].get(name)
+        return dict(row) if row else None
+
+    def get_all_baustellen(self) -> List[Dict]:
+        return [dict(row) for row in self._get_table("baustellen")["rows"]]
+
+    def get_baustelle_by_nummer(self, baustelle_id: int) -> Optional[Dict]:
+        row = self._get_table("baustellen")["by_nummer"].get(str(baustelle_id))
+        return dict(row) if row else None
+
+    def get_baustelle_id_by_nummer(self, nummer: str) -> Optional[int]:
+        row = self._get_table("baustellen")["by_nummer"].get(str(nummer))
+        return row["id"] if row else None
+
+    def get_override(self, worker_id: int, baustelle_id: int) -> Optional[Dict]:
+        row = self._get_table("overrides")["by_key"].get((worker_id, baustelle_id))
+        return dict(row) if row else None
+
+    def get_all_overrides(self) -> List[Dict]:
+        return [dict(row) for row in self._get_table("overrides")["rows"]]
+
+    def get_skug_settings(self) -> Dict:
+        return dict(self._get_table("skug_settings"))
+
+    # --- Writes (invalidate the cache) ---
+    def add_name(self, *args, **kwargs):
+        return self._write(super().add_name, *args, **kwargs)
+
+    def update_name(self, *args, **kwargs):
+        return self._write(super().update_name, *args, **kwargs)
+
+    def delete_name(self, *args, **kwargs):
+        return self._write(super().delete_name, *args, **kwargs)
+
+    def add_baustelle(self, *args, **kwargs):
+        return self._write(super().add_baustelle, *args, **kwargs)
+
+    def update_baustelle(self, *args, **kwargs):
+        return self._write(super().update_baustelle, *args, **kwargs)
+
+    def delete_baustelle(self, *args, **kwargs):
+        return self._write(super().delete_baustelle, *args, **kwargs)
+
+    def add_override(self, *args, **kwargs):
+        return self._write(super().add_override, *args, **kwargs)
+
+    def delete_override(self, *args, **kwargs):
+        return self._write(super().delete_override, *args, **kwargs)
+
+    def update_skug_settings(self, *args, **kwargs):
+        return self._write(super().update_skug_settings, *args, **kwargs)
@@ -0,0 +1,438 @@
+"""
+Data of the monthly Stundenliste, independent of how it is shown.
+
+build_month_report() reads a month once (snapshot, aggregates, payroll) and
+returns a MonthReport: the sections of the sheet with their workers and day
+rows, the cell values and flags of every worker and day, the summary values
+of every worker and the cell_map of the editable cells (CellInfo records).
+The renderers (xlsx and CSV in excel_export, the preview in gui) only draw
+it and don't query the database again.
+"""
+
+import calendar
+import sys
+
+from database import Database
+from datatypes import WorkerTypes
+from master_data import MasterDataDatabase
+from payroll import PayrollEngine
+from utils import has_baustellen_arbeitsstunden, is_holiday, is_weekend
+
+NAMES_PER_SECTION = 99
+FIRST_DAY_ROW = 5
+SUMMARY_ROWS = 8
+
+
+class DayLine:
+    """Values of the Std. and Bst. cell of one line of a worker's day."""
+
+    def __init__(self, stunden=None, kostenstelle=None, number_format=None):
+        self.stunden = stunden
+        self.kostenstelle = kostenstelle
+        # Number format of the Std. cell, None to keep the cell's format
+        self.number_format = number_format
+
+
+class WorkerDay:
+    """
+    Cells of one worker on one day.
+
+    lines         one DayLine per entry, drawn from the first line of the day
+    holiday_line  DayLine of a holiday on a weekday, drawn on the last line of
+                  the day before the entries (None on other days)
+    flags         highlights of the entry lines in drawing order ("unter_8h",
+                  "skug", "an_ab"); the last one wins
+    """
+
+    def __init__(self, lines=(), holiday_line=None, flags=()):
+        self.lines = list(lines)
+        self.holiday_line = holiday_line
+        self.flags = tuple(flags)
+
+
+class ReportDay:
+    """A day of a section: its first sheet row and number of lines."""
+
+    def __init__(self, day, row, num_lines, free_day):
+        self.day = day
+        self.row = row
+        self.num_lines = num_lines
+        # Weekend or holiday, highlighted over the whole section
+        self.free_day = free_day
+
+
+class ReportSection:
+    """A block of workers side by side, starting at column col."""
+
+    def __init__(self, col, names, title=None):
+        self.col = col
+        self.names = list(names)
+        self.title = title
+        self.days = []
+        self.summary_row = FIRST_DAY_ROW
+        # Std. column of each worker, Bst. is the one after it
+        self.name_cols = {
+            name: col + 2 + i * 2 for i, name in enumerate(self.names)
+        }
+
+    @property
+    def max_col(self):
+        return self.col + len(self.names) * 2 + 1
+
+    @property
+    def max_row(self):
+        return self.summary_row + SUMMARY_ROWS - 1
+
+
+class CellInfo:
+    """
+    An editable cell of the report, the Std. or Bst. cell of a line of a
+    worker's day. period is the (year, month) tuple shared by all cells of
+    the report; entry_id is None on lines without an entry.
+    """
+
+    __slots__ = ("period", "day", "name", "field", "entry_id")
+
+    def __init__(self, period, day, name, field, entry_id):
+        self.period = period
+        self.day = day
+        self.name = name
+        self.field = field
+        self.entry_id = entry_id
+
+    @property
+    def year(self):
+        return self.period[0]
+
+    @property
+    def month(self):
+        return self.period[1]
+
+    def day_key(self):
+        """(year, month, day, name) of the cell's day."""
+        return self.period + (self.day, self.name)
+
+
+class WorkerReport:
+    """
+    A worker's month: person data (names row with aggregates, h_flag and
+    summary_values), days by day number and summary values.
+    """
+
+    def __init__(self, name, person):
+        self.name = name
+        self.person = person
+        self.days = {}
+
+    @property
+    def summary_values(self):
+        return self.person["summary_values"]
+
+
+class WorkerPatch:
+    """
+    New data of a worker after some of its days changed: person data with
+    new summary values, the WorkerDay of each changed day and the cell_map
+    entries of these days (see load_worker_patches).
+    """
+
+    def __init__(self, name, person):
+        self.name = name
+        self.person = person
+        self.days = {}
+        self.cell_map = {}
+
+
+class MonthReport:
+    """Everything the renderers need to draw the Stundenliste of a month."""
+
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        self.title = f"{year}-{month:02d}"
+        self.period = (year, month)
+        self.sections = []
+        self.section_by_name = {}
+        self.workers = {}
+        self.person_lookup = {}
+        self.cell_map = {}
+        # Columns 1 .. num_columns get the standard width
+        self.num_columns = 0
+
+    def apply_patches(self, patches):
+        """Take over the data of WorkerPatches loaded for this report."""
+        for patch in patches:
+            self.person_lookup[patch.name] = patch.person
+            worker = self.workers[patch.name]
+            worker.person = patch.person
+            worker.days.update(patch.days)
+            self.cell_map.update(patch.cell_map)
+
+
+def build_month_report(
+    year: int, month: int, db: Database, master_db: MasterDataDatabase
+) -> MonthReport | None:
+    """Read and compute the report of a month; None if there are no names."""
+    unique_names = master_db.get_all_names_list()
+
+    # All per-day reads below are served from this snapshot instead of
+    # querying the database once per day and worker.
+    snapshot = db.load_month_snapshot(year, month)
+    # Summary figures of all workers from one aggregate query
+    aggregates = db.load_monthly_aggregates(year, month)
+
+    all_persons = master_db.get_all_names()
+    person_lookup = {p["name"]: p for p in all_persons}
+    _add_month_figures(
+        year, month, snapshot, aggregates, master_db, person_lookup, unique_names
+    )
+
+    if not unique_names:
+        print("No names found in entries")
+        return None
+
+    report = MonthReport(year, month)
+    report.person_lookup = person_lookup
+    for name in unique_names:
+        report.workers[name] = WorkerReport(name, person_lookup[name])
+
+    names_for_normal_table = [
+        name for name in unique_names if not person_lookup[name]["extra_table"]
+    ]
+    names_for_extra_table = [
+        name for name in unique_names if person_lookup[name]["extra_table"]
+    ]
+
+    next_column = 1
+    num_sections = (
+        len(names_for_normal_table) + NAMES_PER_SECTION - 1
+    ) // NAMES_PER_SECTION
+    for section_idx in range(num_sections):
+        start_idx = section_idx * NAMES_PER_SECTION
+        end_idx = min(start_idx + NAMES_PER_SECTION, len(names_for_normal_table))
+        section_names = names_for_normal_table[start_idx:end_idx]
+        datum_col = section_idx * 2 * (NAMES_PER_SECTION + 1) + 1
+        report.sections.append(
+            ReportSection(
+                datum_col,
+                section_names,
+                title=f"Stundenliste - {calendar.month_name[month]} {year}",
+            )
+        )
+        next_column = datum_col + len(section_names) * 2 + 2
+
+    for i, name in enumerate(names_for_extra_table):
+        report.sections.append(ReportSection(next_column + 2 + i * 6, [name]))
+    report.num_columns = next_column + 1 + len(names_for_extra_table) * 6
+
+    for section in report.sections:
+        for name in section.names:
+            report.section_by_name[name] = section
+        _load_section_days(report, section, snapshot)
+    return report
+
+
+def _add_month_figures(
+    year, month, snapshot, aggregates, master_db, person_lookup, names
+):
+    """Add aggregates, h_flag and summary_values to the person data of names."""
+    for name in names:
+        person_lookup[name]["aggregates"] = aggregates.for_name(name)
+        person_lookup[name]["h_flag"] = has_baustellen_arbeitsstunden(
+            name, month, year, snapshot, master_db, exclude_baustellen=["900"]
+        ) and person_lookup[name]["worker_type"] == WorkerTypes.Fest
+    # Summary rows of all workers in one vectorized pass
+    summaries = PayrollEngine(
+        year, month, snapshot, master_db, person_lookup, names, aggregates
+    ).compute()
+    for name, summary_values in summaries.items():
+        person_lookup[name]["summary_values"] = summary_values
+
+
+def load_worker_patches(
+    report: MonthReport,
+    db: Database,
+    master_db: MasterDataDatabase,
+    affected_days,
+) -> list[WorkerPatch] | None:
+    """
+    Reload the days in affected_days ({(year, month, day, name)}, as returned
+    by EntryService.apply_preview_changes) and the summary values of their
+    workers. Days of other months are ignored. The report itself is not
+    changed, see MonthReport.apply_patches.
+
+    Returns None if the report has to be built again: a changed day needs
+    another number of lines or a worker is not part of the report.
+    """
+    changed_days = {}
+    for year, month, day, name in affected_days:
+        if (int(year), int(month)) != (report.year, report.month):
+            continue
+        if name not in report.workers:
+            return None
+        changed_days.setdefault(name, set()).add(int(day))
+    if not changed_days:
+        return []
+
+    year, month = report.year, report.month
+    snapshot = db.load_month_snapshot(year, month)
+    for name, days in changed_days.items():
+        section = report.section_by_name[name]
+        for report_day in section.days:
+            if report_day.day not in days:
+                continue
+            day = report_day.day
+            num_lines = max(
+                max(
+                    len(snapshot.get_arbeitsstunden_for_day(year, month, day, other))
+                    for other in section.names
+                ),
+                1,
+            )
+            if num_lines != report_day.num_lines:
+                return None
+
+    names = list(changed_days)
+    person_lookup = {name: dict(report.person_lookup[name]) for name in names}
+    _add_month_figures(
+        year,
+        month,
+        snapshot,
+        db.load_monthly_aggregates(year, month),
+        master_db,
+        person_lookup,
+        names,
+    )
+
+    patches = []
+    for name in names:
+        person = person_lookup[name]
+        days = changed_days[name]
+        if person["h_flag"] != report.person_lookup[name]["h_flag"]:
+            # Krank, Urlaub and holidays are shown differently on every day
+            days = report.workers[name].days.keys()
+        patch = WorkerPatch(name, person)
+        section = report.section_by_name[name]
+        for report_day in section.days:
+            day = report_day.day
+            if day not in days:
+                continue
+            entries = snapshot.get_arbeitsstunden_for_day(year, month, day, name)
+            patch.days[day] = build_worker_day(
+                person,
+                entries,
+                snapshot.get_metadata_by_date(year, month, day, name),
+                is_holiday(year, month, day) and not is_weekend(year, month, day),
+            )
+            _map_worker_day(
+                patch.cell_map,
+                report,
+                section,
+                name,
+                day,
+                report_day.row,
+                report_day.num_lines,
+                entries,
+            )
+        patches.append(patch)
+    return patches
+
+
+def _load_section_days(report: MonthReport, section: ReportSection, db):
+    year, month = report.year, report.month
+    row = FIRST_DAY_ROW
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        arbeits_entries = {
+            name: db.get_arbeitsstunden_for_day(year, month, day, name)
+            for name in section.names
+        }
+        num_lines = max(max(len(entries) for entries in arbeits_entries.values()), 1)
+        holiday = is_holiday(year, month, day)
+        weekend = is_weekend(year, month, day)
+        section.days.append(ReportDay(day, row, num_lines, weekend or holiday))
+
+        for name, entries in arbeits_entries.items():
+            worker = report.workers[name]
+            worker.days[day] = build_worker_day(
+                worker.person,
+                entries,
+                db.get_metadata_by_date(year, month, day, name),
+                holiday and not weekend,
+            )
+            _map_worker_day(
+                report.cell_map, report, section, name, day, row, num_lines, entries
+            )
+        row += num_lines
+    section.summary_row = row
+
+
+def build_worker_day(person_data, entries, meta_data, holiday_on_weekday):
+    """Cell values and flags of a worker's day (see WorkerDay)."""
+    if meta_data is None:
+        meta_data = {}
+    worker_type = person_data.get("worker_type", "Fest")
+    h_flag = person_data.get("h_flag", False)
+    weekly_hours = person_data.get("weekly_hours", 0.0)
+    kein_verpflegung = bool(person_data.get("kein_verpflegungsgeld", 0))
+
+    holiday_line = None
+    if holiday_on_weekday:
+        holiday_line = DayLine()
+        if (
+            worker_type == WorkerTypes.Gewerblich
+            and not person_data["keine_feiertagssstunden"]
+        ):
+            holiday_line = DayLine("F", "940")
+        elif h_flag:
+            holiday_line = DayLine(weekly_hours / 5.0, "F", "0.00")
+        elif worker_type == WorkerTypes.Fest:
+            holiday_line = DayLine("F", "900")
+
+    flags = []
+    if entries:
+        if meta_data.get("kg_8h", False) and not kein_verpflegung:
+            flags.append("unter_8h")
+        skug_value = meta_data.get("skug")
+        try:
+            skug_value = float(skug_value)
+        except (TypeError, ValueError):
+            skug_value = 0.0
+        if skug_value >= 1:
+            flags.append("skug")
+        if meta_data.get("travel_status", False):
+            flags.append("an_ab")
+
+    lines = []
+    for entry in entries:
+        if meta_data.get("krank", False):
+            if h_flag:
+                line = DayLine(weekly_hours / 5.0, "K", "0.00")
+            else:
+                line = DayLine("K", 900 if worker_type == WorkerTypes.Fest else "930")
+        elif meta_data.get("urlaub", False):
+            if h_flag:
+                line = DayLine(weekly_hours / 5.0, "U", "0.00")
+            else:
+                line = DayLine("U", 900 if worker_type == WorkerTypes.Fest else "940")
+        else:
+            line = DayLine(
+                entry.get("stunden", 0), int(entry["baustelle_nummer"]), "0.00"
+            )
+        lines.append(line)
+    return WorkerDay(lines, holiday_line, flags)
+
+
+def _map_worker_day(cell_map, report, section, name, day, row, num_lines, entries):
+    """Add the CellInfo of the editable cells of a worker's day to cell_map."""
+    name_col = section.name_cols[name]
+    # All cells of a worker share one name string
+    name = sys.intern(name)
+    for j in range(num_lines):
+        entry = entries[j] if j < len(entries) else None
+        entry_id = entry.get("id") if entry else None
+        cell_map[(row + j, name_col)] = CellInfo(
+            report.period, day, name, "Stunden", entry_id
+        )
+        cell_map[(row + j, name_col + 1)] = CellInfo(
+            report.period, day, name, "Kostenstelle", entry_id
+        )
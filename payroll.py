@@ -0,0 +1,257 @@
+"""
+Month summary figures (Gesamtstunden, Feiertag, Urlaub, Krank, SKUG, Summe,
+Mehr-/Minderstd, V.-Zuschuss) for all workers at once.
+
+The per-day inputs are laid out as dense workers x days arrays and the
+summary columns are computed with array operations instead of one Python
+loop per worker and function. The results are the numbers the scalar path
+(excel_export.compute_summary_values) produces: sums are added day by day in
+the same order and rounding goes through Python's round().
+"""
+
+import numpy as np
+
+from datatypes import TravelStatus, WorkerTypes
+from utils import AN_ODER_ABREISE_VERPFLEGUNG, AWAY_24H_VERPFLEGUNG
+from work_calendar import WINTER_MONTHS, WorkCalendar
+
+TRAVEL_NONE = 0
+TRAVEL_AN_AB = 1
+TRAVEL_24H = 2
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """round(value, 2) for every element, with Python's rounding."""
+    rounded = np.round(values, 2)
+    # np.round scales by 100 and can be off by one ulp; values that already
+    # have at most two decimals come out the same either way.
+    inexact = (rounded != values) & ~np.isnan(values)
+    if inexact.any():
+        rounded[inexact] = [round(float(v), 2) for v in values[inexact]]
+    return rounded
+
+
+def _sum_days(values: np.ndarray) -> np.ndarray:
+    """Row sums added day by day (np.sum adds pairwise, i.e. in another order)."""
+    if values.shape[1] == 0:
+        return np.zeros(values.shape[0])
+    return np.cumsum(values, axis=1)[:, -1]
+
+
+class PayrollEngine:
+    """
+    Summary values of one month for a list of workers.
+
+    snapshot is the MonthSnapshot of the month, aggregates its
+    MonthlyAggregates and person_lookup the names rows by name.
+    """
+
+    def __init__(
+        self, year, month, snapshot, master_db, person_lookup, names, aggregates
+    ):
+        self.year = int(year)
+        self.month = int(month)
+        self.snapshot = snapshot
+        self.master_db = master_db
+        self.person_lookup = person_lookup
+        self.names = list(names)
+        self.aggregates = aggregates
+        self.load()
+
+    def load(self):
+        year, month = self.year, self.month
+        work_calendar = WorkCalendar.for_year(year, self.master_db.get_skug_settings())
+        days = work_calendar.month_slice(month)
+        num_days = work_calendar.month_days[month]
+
+        # Days
+        self.weekend = np.array(work_calendar.weekend[days], dtype=bool)
+        self.holiday = np.array(work_calendar.holiday[days], dtype=bool) & ~self.weekend
+        # Target hours as calculate_skug (NaN if the setting is missing) reads them
+        self.target = np.array(work_calendar.target[days])
+        self.normal_hours_total = work_calendar.normal_hours[month]
+
+        # Workers
+        persons = [self.person_lookup.get(name, {}) for name in self.names]
+        self.fest = np.array(
+            [p.get("worker_type", "Fest") == WorkerTypes.Fest for p in persons],
+            dtype=bool,
+        )
+        self.weekly_hours = np.array(
+            [float(p.get("weekly_hours") or 0.0) for p in persons]
+        )
+        self.keine_feiertag = np.array(
+            [bool(p.get("keine_feiertagssstunden", 0)) for p in persons], dtype=bool
+        )
+        self.kein_fzk = np.array(
+            [bool(p.get("kein_fzk", False)) for p in persons], dtype=bool
+        )
+        self.kein_verpflegung = np.array(
+            [bool(p.get("kein_verpflegungsgeld", 0)) for p in persons], dtype=bool
+        )
+        self.figures = [self.aggregates.for_name(name) for name in self.names]
+        for key in (
+            "stunden",
+            "arbeitsstunden",
+            "urlaub_stunden",
+            "krank_stunden",
+        ):
+            setattr(self, key, np.array([float(f[key]) for f in self.figures]))
+        self.hat_baustellenarbeit = np.array(
+            [f["hat_baustellenarbeit"] for f in self.figures], dtype=bool
+        )
+
+        # Workers x days
+        shape = (len(self.names), num_days)
+        self.hours = np.zeros(shape)
+        self.has_metadata = np.zeros(shape, dtype=bool)
+        self.no_skug = np.zeros(shape, dtype=bool)
+        self.absent = np.zeros(shape, dtype=bool)
+        self.travel = np.full(shape, TRAVEL_NONE, dtype=np.int8)
+        self.fruehstueck = np.zeros(shape, dtype=bool)
+        self.mittag = np.zeros(shape, dtype=bool)
+        self.fahrzeit = np.zeros(shape)
+        self.verpflegung_rate = np.zeros(shape)
+
+        index = {name: i for i, name in enumerate(self.names)}
+
+        def cell(name, day):
+            if name in index and 1 <= day <= num_days:
+                return index[name], day - 1
+            return None
+
+        for (name, day), total in self.snapshot.day_totals.items():
+            pos = cell(name, day)
+            if pos:
+                self.hours[pos] = total
+        for (name, day), metadata in self.snapshot.metadata.items():
+            pos = cell(name, day)
+            if not pos:
+                continue
+            self.has_metadata[pos] = True
+            self.no_skug[pos] = bool(metadata.get("no_skug"))
+            self.absent[pos] = bool(metadata.get("krank") or metadata.get("urlaub"))
+            self.fruehstueck[pos] = bool(metadata.get("fruehstueck"))
+            self.mittag[pos] = bool(metadata.get("mittag"))
+            travel_status = metadata.get("travel_status")
+            if travel_status:
+                self.travel[pos] = (
+                    TRAVEL_24H
+                    if travel_status == TravelStatus.Away24h.value
+                    else TRAVEL_AN_AB
+                )
+        if self.snapshot.master_db is not None:
+            rates = self.snapshot.get_baustelle_rates_for_month(year, month)
+            for (name, day), rate in rates.items():
+                pos = cell(name, day)
+                if pos:
+                    self.fahrzeit[pos] = rate["fahrzeit"]
+                    self.verpflegung_rate[pos] = rate["verpflegungsgeld"]
+
+    def skug_hours(self) -> np.ndarray:
+        """get_skug_hours_for_name per worker (0 outside the winter months)."""
+        if self.month not in WINTER_MONTHS:
+            return np.zeros(len(self.names))
+        skug = np.where(self.weekend, 0.0, _round2(self.target - self.hours))
+        counted = (
+            self.has_metadata
+            & ~self.no_skug
+            & ~self.kein_fzk[:, None]
+            & (skug >= 1)
+        )
+        return _sum_days(np.where(counted, skug, 0.0))
+
+    def feiertag_hours(self) -> np.ndarray:
+        """get_hours_of_feiertag per worker."""
+        per_day = np.where(
+            self.fest[:, None],
+            (self.weekly_hours / 5.0)[:, None],
+            _round2(self.target[None, :] - self.weekly_hours[:, None]),
+        )
+        hours = _sum_days(np.where(self.holiday[None, :], per_day, 0.0))
+        return np.where(self.keine_feiertag, 0.0, hours)
+
+    def verpflegungsgeld(self) -> np.ndarray:
+        """get_verpflegungsgeld_for_name per worker (before rounding)."""
+        # kg_8h: travel and Krank/Urlaub days have none
+        day_hours = (
+            self.hours
+            + self.fahrzeit
+            + np.where(self.fruehstueck, 0.25, 0.0)
+            + np.where(self.mittag, 0.5, 0.0)
+        )
+        kg_8h = ~self.absent & (self.travel == TRAVEL_NONE) & (day_hours <= 8.0)
+        per_day = np.where(
+            self.travel == TRAVEL_24H,
+            float(AWAY_24H_VERPFLEGUNG),
+            np.where(
+                self.travel == TRAVEL_AN_AB,
+                float(AN_ODER_ABREISE_VERPFLEGUNG),
+                np.where(kg_8h, 0.0, self.verpflegung_rate),
+            ),
+        )
+        return _sum_days(np.where(self.has_metadata, per_day, 0.0))
+
+    def normal_hours(self) -> float:
+        """get_normal_hours_per_month without h_flag."""
+        return self.normal_hours_total
+
+    def compute(self) -> dict:
+        """Summary values (the summary_labels columns) by name."""
+        feiertag_days = int(self.holiday.sum())
+        feiertag_hours = self.feiertag_hours()
+        skug_total = self.skug_hours()
+        verpflegungsgeld = self.verpflegungsgeld()
+        normal_hours = self.normal_hours()
+
+        h_case = self.fest & self.hat_baustellenarbeit
+        daily_target = np.where(self.weekly_hours != 0, self.weekly_hours / 5.0, 0.0)
+        feiertag = np.where(self.keine_feiertag, 0.0, feiertag_days)
+        urlaub_tage = np.array([float(f["urlaub_tage"]) for f in self.figures])
+        krank_tage = np.array([float(f["krank_tage"]) for f in self.figures])
+
+        gesamtstunden = np.where(
+            h_case,
+            self.arbeitsstunden
+            + urlaub_tage * daily_target
+            + krank_tage * daily_target
+            + feiertag * daily_target,
+            self.stunden - self.urlaub_stunden - self.krank_stunden,
+        )
+        summe = np.where(
+            h_case,
+            self.weekly_hours * 52.0 / 12.0,
+            gesamtstunden
+            + feiertag_hours
+            + skug_total
+            + self.urlaub_stunden
+            + self.krank_stunden,
+        )
+        summe = np.where(self.fest & (gesamtstunden == 0), 0.0, summe)
+        mehr_minder = np.where(
+            h_case, gesamtstunden - summe, summe - normal_hours
+        )
+
+        summaries = {}
+        for i, name in enumerate(self.names):
+            figures = self.figures[i]
+            fest = bool(self.fest[i])
+            if self.keine_feiertag[i]:
+                feiertag_value = 0
+            elif fest:
+                feiertag_value = feiertag_days
+            else:
+                feiertag_value = float(feiertag_hours[i])
+            summaries[name] = [
+                float(gesamtstunden[i]),
+                feiertag_value,
+                figures["urlaub_tage"] if fest else figures["urlaub_stunden"],
+                figures["krank_tage"] if fest else figures["krank_stunden"],
+                float(skug_total[i]) if self.month in WINTER_MONTHS else 0,
+                float(summe[i]),
+                float(mehr_minder[i]),
+                0
+                if self.kein_verpflegung[i]
+                else round(float(verpflegungsgeld[i]), 2),
+            ]
+        return summaries
@@ -13,7 +13,10 @@ class Settings:
             "auto_increment_day": False,
             "skip_weekends": True,
             "skip_holidays": True,
-            "cursor_jump_target": "Tag"
+            "cursor_jump_target": "Tag",
+            # Overrides for ConnectionManager.DEFAULT_PRAGMAS, e.g. {"journal_mode": "WAL"}
+            # on a local disk
+            "sqlite_pragmas": {}
         }
         self.current_settings = self.load()
 
@@ -244,7 +247,8 @@ class SettingsDialog:
             "auto_increment_day": self.auto_increment_var.get(),
             "skip_weekends": self.skip_weekends_var.get(),
             "skip_holidays": self.skip_holidays_var.get(),
-            "cursor_jump_target": self.cursor_target_var.get()
+            "cursor_jump_target": self.cursor_target_var.get(),
+            "sqlite_pragmas": self.settings_manager.get("sqlite_pragmas", {})
         }
         self.settings_manager.save(settings_dict)
 
@@ -0,0 +1,90 @@
+"""
+Incremental updates of the month and day Treeviews.
+
+The rows of a tree are keyed by their entry_{id} tag, which is also used as
+the item ID. TreeSync.sync() compares the new rows with the items the tree
+shows and only inserts, updates, moves and deletes the items that changed,
+so selection and scroll position survive a refresh and a one-row edit
+touches one item.
+"""
+
+ENTRY_TAG_PREFIX = "entry_"
+
+
+def row_key(tags):
+    """The entry_{id} tag of a row, None if it has none."""
+    for tag in tags:
+        if isinstance(tag, str) and tag.startswith(ENTRY_TAG_PREFIX):
+            return tag
+    return None
+
+
+class TreeSync:
+    """Keeps a ttk.Treeview in sync with rows of (values, tags) tuples."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        # (values, tags) last set on each item; Tk returns values as strings
+        self._shown = {}
+
+    def sync(self, rows):
+        """Show rows in this order; returns the number of items touched."""
+        tree = self.tree
+        rows = self._keyed_rows(rows)
+        new_keys = {key for key, _, _ in rows}
+
+        children = tree.get_children()
+        # Forget items deleted by others (e.g. the delete column of month_tree)
+        self._shown = {
+            key: self._shown[key] for key in children if key in self._shown
+        }
+        stale = [key for key in children if key not in new_keys]
+        if stale:
+            tree.delete(*stale)
+            for key in stale:
+                self._shown.pop(key, None)
+        touched = len(stale)
+
+        # Items that stay, in their current order. The first index items of
+        # the tree are always rows[:index]; the items after them are the
+        # remaining ones of order, so order[position] is at index.
+        order = [key for key in children if key in new_keys]
+        existing = set(order)
+        placed = set()
+        position = 0
+        for index, (key, values, tags) in enumerate(rows):
+            if key not in existing:
+                tree.insert("", index, iid=key, values=values, tags=tags)
+                self._shown[key] = (values, tags)
+                touched += 1
+                continue
+
+            while position < len(order) and order[position] in placed:
+                position += 1
+            placed.add(key)
+            changed = False
+            if position < len(order) and order[position] == key:
+                position += 1
+            else:
+                tree.move(key, "", index)
+                changed = True
+            if self._shown.get(key) != (values, tags):
+                tree.item(key, values=values, tags=tags)
+                self._shown[key] = (values, tags)
+                changed = True
+            touched += changed
+        return touched
+
+    def _keyed_rows(self, rows):
+        """(key, values, tags) of the rows with a unique item ID each."""
+        keyed = []
+        seen = {}
+        for values, tags in rows:
+            key = row_key(tags) or "row"
+            count = seen.get(key, 0)
+            seen[key] = count + 1
+            if count:
+                # The same entry shown twice (a name given twice)
+                key = f"{key}#{count}"
+            keyed.append((key, tuple(values), tuple(tags)))
+        return keyed
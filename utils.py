@@ -1,29 +1,30 @@
 from datetime import datetime, timedelta
 import locale
 from datetime import datetime
-import holidays
-import calendar
 
 from database import Database
 from master_data import MasterDataDatabase
-from datatypes import TravelStatus
-from datatypes import WorkerTypes
+from datatypes import EntryKind, WorkerTypes
+from work_calendar import WorkCalendar
 
 
 locale.setlocale(locale.LC_TIME, "de_DE")
 
-# Initialize German holidays
-german_holidays = holidays.country_holidays("DE", subdiv="SH")
-
 AN_ODER_ABREISE_VERPFLEGUNG = 14
 AWAY_24H_VERPFLEGUNG = 28
 
 
+def _calendar_day(year, month, day):
+    """WorkCalendar of the year and index of the day; ValueError if invalid."""
+    work_calendar = WorkCalendar.for_year(year)
+    return work_calendar, work_calendar.day_index(month, day)
+
+
 def get_weekday_abbr(year, month, day):
     """Returns abbreviated weekday name or None if invalid date."""
     try:
-        d = datetime(int(year), int(month), int(day))
-        return d.strftime("%a")
+        work_calendar, index = _calendar_day(year, month, day)
+        return work_calendar.weekday_abbr[index]
     except (ValueError, TypeError):
         return None
 
@@ -31,7 +32,7 @@ def get_weekday_abbr(year, month, day):
 def validate_date(year, month, day):
     """Validates if the given date is valid."""
     try:
-        datetime(int(year), int(month), int(day))
+        _calendar_day(year, month, day)
         return True
     except (ValueError, TypeError):
         return False
@@ -40,8 +41,8 @@ def validate_date(year, month, day):
 def is_holiday(year, month, day):
     """Check if a given date is a German holiday."""
     try:
-        date = datetime(int(year), int(month), int(day))
-        return date in german_holidays
+        work_calendar, index = _calendar_day(year, month, day)
+        return bool(work_calendar.holiday[index])
     except (ValueError, TypeError):
         return False
 
@@ -49,9 +50,8 @@ def is_holiday(year, month, day):
 def is_weekend(year, month, day):
     """Check if a given date is a weekend (Saturday or Sunday)."""
     try:
-        date = datetime(int(year), int(month), int(day))
-        # weekday() returns 5 for Saturday, 6 for Sunday
-        return date.weekday() >= 5
+        work_calendar, index = _calendar_day(year, month, day)
+        return bool(work_calendar.weekend[index])
     except (ValueError, TypeError):
         return False
 
@@ -221,29 +221,14 @@ def calculate_skug(year, month, day, hours_worked, skug_settings):
         - Summer (April-November): Use summer settings
         - SKUG = target_hours - hours_worked
     """
-    # Get weekday (0=Monday, 6=Sunday)
-    date = datetime(int(year), int(month), int(day))
-    weekday = date.weekday()
+    work_calendar, index = _calendar_day(year, month, day)
 
-    # Only calculate for Monday-Friday (0-4)
-    if weekday > 4:
+    # Only calculate for Monday-Friday
+    if work_calendar.weekend[index]:
         return 0.0
 
-    # Determine season (winter: Dec-Mar, summer: Apr-Nov)
-    is_winter = month in [12, 1, 2, 3]
-
-    # Map weekday to setting key
-    weekday_map = {
-        0: "monday",
-        1: "tuesday",
-        2: "wednesday",
-        3: "thursday",
-        4: "friday",
-    }
-
-    day_name = weekday_map[weekday]
-    season = "winter" if is_winter else "summer"
-    setting_key = f"{season}_{day_name}"
+    # Setting of the weekday in its season (winter: Dec-Mar)
+    setting_key = work_calendar.setting_key[index]
     if setting_key not in skug_settings:
         print("SKUG setting not found for key:", setting_key)
         return None
@@ -304,49 +289,8 @@ def get_fahrstunden_for_name(
     """
 
     print("Getting Fahrstunden for name:", name, "month:", month, "year:", year)
-    # Get all arbeitsstunden entries for the person in the specified month and year
-    worker_id = master_db.get_worker_id_by_name(name)
-
-    # Query arbeitsstunden table
-    conn = db.db_file
-    import sqlite3
-
-    connection = sqlite3.connect(conn)
-    connection.row_factory = sqlite3.Row
-    cursor = connection.cursor()
-
-    cursor.execute(
-        """
-        SELECT kostenstelle FROM arbeitsstunden
-        WHERE jahr = ? AND monat = ? AND name = ?
-    """,
-        (year, month, name),
-    )
-
-    entries = cursor.fetchall()
-    connection.close()
-
-    total_fahrstunden = 0.0
-    for entry in entries:
-        kostenstelle = entry["kostenstelle"]
-        if kostenstelle and kostenstelle not in ["Krank", "900", "940"]:
-            # Extract baustelle number (format: "number - name")
-            baustelle_nummer = (
-                kostenstelle.split("-")[0].strip()
-                if "-" in kostenstelle
-                else kostenstelle
-            )
-            baustelle_data = master_db.get_baustelle_by_nummer(baustelle_nummer)
-            if baustelle_data:
-                fahrzeit = get_effective_fahrzeit(
-                    master_db,
-                    worker_id,
-                    baustelle_data["id"],
-                    baustelle_data.get("fahrzeit", 0.0),
-                )
-                total_fahrstunden += fahrzeit * 2  # round trip
-
-    return round(total_fahrstunden, 2)
+    # Resolved in SQL over the attached master data (see Database._STAMMDATEN_VIEWS)
+    return db.get_fahrstunden_for_month(year, month, name).get(name, 0.0)
 
 
 def get_skug_hours_for_name(name, month, year, db: Database):
@@ -383,8 +327,7 @@ def has_baustellen_arbeitsstunden(
     }
 
     for entry in arbeitsstunden:
-        kostenstelle = (entry.get("kostenstelle") or "").strip()
-        baustelle_nummer = kostenstelle.split("-", 1)[0].strip()
+        baustelle_nummer = entry.get("baustelle_nummer")
         if baustelle_nummer in baustellen_nummern and baustelle_nummer not in exclude_baustellen:
             return True
 
@@ -394,48 +337,8 @@ def has_baustellen_arbeitsstunden(
 def get_verpflegungsgeld_for_name(
     name, month, year, master_db: MasterDataDatabase, db: Database
 ):
-    # Get all entries for the person in the specified month and year
-    metadata = db.get_metadata_for_month(year, month, name)
-    if not metadata:
-        return 0.0
-
-    worker_id = master_db.get_worker_id_by_name(name)
-
-    total_verpflegungsgeld = 0.0
-
-    for m_entry in metadata:
-        travel_status = m_entry.get("travel_status")
-
-        if travel_status:
-            if travel_status == TravelStatus.Away24h:
-                total_verpflegungsgeld += AWAY_24H_VERPFLEGUNG
-            else:
-                total_verpflegungsgeld += AN_ODER_ABREISE_VERPFLEGUNG
-        elif m_entry.get("kg_8h"):
-            continue
-        else:
-            arbeitsstunden_data = db.get_arbeitsstunden_for_day(
-                year, month, m_entry.get("tag"), name
-            )
-            highest_verpflegungsgeld = 0.0
-            for arbeits_entry in arbeitsstunden_data:
-                kostenstelle = arbeits_entry.get(
-                    "kostenstelle"
-                )  # stunden not needed here
-                if kostenstelle and kostenstelle not in ["940", "900", "Krank"]:
-                    baustelle_id_str = kostenstelle.split("-")[0].strip()
-                    baustelle = master_db.get_baustelle_by_nummer(baustelle_id_str)
-                    if baustelle:
-                        verpflegungsgeld = get_effective_verpflegungsgeld(
-                            master_db,
-                            worker_id,
-                            baustelle["id"],
-                            baustelle.get("verpflegungsgeld", 0.0),
-                        )
-                        if highest_verpflegungsgeld < verpflegungsgeld:
-                            highest_verpflegungsgeld = verpflegungsgeld
-            total_verpflegungsgeld += highest_verpflegungsgeld
-    return round(total_verpflegungsgeld, 2)
+    # Resolved in SQL over the attached master data (see Database._STAMMDATEN_VIEWS)
+    return db.get_verpflegungsgeld_for_month(year, month, name).get(name, 0.0)
 
 
 def get_normal_hours_per_month(
@@ -452,69 +355,29 @@ def get_normal_hours_per_month(
         Float representing total normal working hours for the month
     """
 
-    skug_settings = master_db.get_skug_settings()
-    total_hours = 0.0
-
-    # Get number of days in the month
-    if month == 12:
-        next_month = 1
-        next_year = year + 1
-    else:
-        next_month = month + 1
-        next_year = year
-
-    first_day = datetime(year, month, 1)
-    if next_month == 1:
-        first_day_next_month = datetime(next_year, next_month, 1)
-    else:
-        first_day_next_month = datetime(year, next_month, 1)
-
-    num_days = (first_day_next_month - first_day).days
-
-    for day in range(1, num_days + 1):
-        date = datetime(year, month, day)
-        weekday = date.weekday()
-
-        # Only consider Monday to Friday
-        if weekday <= 4:
-            is_winter = month in [12, 1, 2, 3]
-            weekday_map = {
-                0: "monday",
-                1: "tuesday",
-                2: "wednesday",
-                3: "thursday",
-                4: "friday",
-            }
-            day_name = weekday_map[weekday]
-            season = "winter" if is_winter else "summer"
-            setting_key = f"{season}_{day_name}"
-
-            target_hours = float(skug_settings.get(setting_key, 8.0))
-            if h_flag:
-                target_hours = weekly_hours / 5.0
-            total_hours += target_hours
+    work_calendar = WorkCalendar.for_year(year, master_db.get_skug_settings())
+    if not h_flag:
+        return work_calendar.normal_hours[month]
 
+    # Only consider Monday to Friday
+    total_hours = 0.0
+    for _ in work_calendar.workdays[month]:
+        total_hours += weekly_hours / 5.0
     return round(total_hours, 2)
 
 def get_days_of_urlaub(name, month, year, db: Database):
     """Get the number of Urlaub days for a person in a specific month."""
-    import sqlite3
-
-    conn = sqlite3.connect(db.db_file)
-    cursor = conn.cursor()
+    cursor = db.get_connection().cursor()
 
     cursor.execute(
         """
         SELECT COUNT(*) FROM tages_metadaten
-        WHERE jahr = ? AND monat = ? AND name = ?
-          AND urlaub IS NOT NULL AND TRIM(urlaub) != ''
-          AND CAST(urlaub AS REAL) > 0
+        WHERE jahr = ? AND monat = ? AND name = ? AND urlaub > 0
     """,
         (year, month, name),
     )
 
     result = cursor.fetchone()
-    conn.close()
 
     urlaub_days = result[0] if result else 0
     return urlaub_days
@@ -522,22 +385,17 @@ def get_days_of_urlaub(name, month, year, db: Database):
 
 def get_hours_of_urlaub(name, month, year, db: Database):
     """Get the number of hours for a person in a specific month."""
-    import sqlite3
-
-    conn = sqlite3.connect(db.db_file)
-    cursor = conn.cursor()
+    cursor = db.get_connection().cursor()
 
     cursor.execute(
         """
-        SELECT SUM(CAST(urlaub AS REAL)) FROM tages_metadaten
-        WHERE jahr = ? AND monat = ? AND name = ?
-          AND urlaub IS NOT NULL AND TRIM(urlaub) != ''
+        SELECT SUM(urlaub) FROM tages_metadaten
+        WHERE jahr = ? AND monat = ? AND name = ? AND urlaub > 0
     """,
         (year, month, name),
     )
 
     result = cursor.fetchone()
-    conn.close()
 
     urlaub_hours = result[0] if result else 0
     if urlaub_hours == None:
@@ -547,23 +405,17 @@ def get_hours_of_urlaub(name, month, year, db: Database):
 
 def get_days_of_krank(name, month, year, db: Database):
     """Get the number of Krank days for a person in a specific month."""
-    import sqlite3
-
-    conn = sqlite3.connect(db.db_file)
-    cursor = conn.cursor()
+    cursor = db.get_connection().cursor()
 
     cursor.execute(
         """
         SELECT COUNT(*) FROM tages_metadaten
-        WHERE jahr = ? AND monat = ? AND name = ?
-          AND krank IS NOT NULL AND TRIM(krank) != ''
-          AND CAST(krank AS REAL) > 0
+        WHERE jahr = ? AND monat = ? AND name = ? AND krank > 0
     """,
         (year, month, name),
     )
 
     result = cursor.fetchone()
-    conn.close()
 
     krank_days = result[0] if result else 0
     return krank_days
@@ -571,22 +423,17 @@ def get_days_of_krank(name, month, year, db: Database):
 
 def get_hours_of_krank(name, month, year, db: Database):
     """Get the number of hours for a person in a specific month."""
-    import sqlite3
-
-    conn = sqlite3.connect(db.db_file)
-    cursor = conn.cursor()
+    cursor = db.get_connection().cursor()
 
     cursor.execute(
         """
-        SELECT SUM(CAST(krank AS REAL)) FROM tages_metadaten
-        WHERE jahr = ? AND monat = ? AND name = ?
-          AND krank IS NOT NULL AND TRIM(krank) != ''
+        SELECT SUM(krank) FROM tages_metadaten
+        WHERE jahr = ? AND monat = ? AND name = ? AND krank > 0
     """,
         (year, month, name),
     )
 
     result = cursor.fetchone()
-    conn.close()
 
     krank_hours = result[0] if result else 0
     if krank_hours == None:
@@ -595,28 +442,22 @@ def get_hours_of_krank(name, month, year, db: Database):
 
 
 def get_days_of_feiertag(month, year):
-    num_days = calendar.monthrange(year, month)[1]
-    days = 0
-    for day in range(1, num_days + 1):
-        if is_holiday(year, month, day) and not is_weekend(year, month, day):
-            days += 1
-    return days
+    return len(WorkCalendar.for_year(year).feiertage[month])
 
 
 def get_hours_of_feiertag(name, month, year, skug_settings, person_data):
-    num_days = calendar.monthrange(year, month)[1]
     hours = 0
     weekly_hours = person_data.get("weekly_hours", 0.0)
     worker_type = person_data.get("worker_type", WorkerTypes.Fest)
     b_keine_feiertagsstunden = person_data.get("keine_feiertagssstunden", False)
-    for day in range(1, num_days + 1):
-        if is_holiday(year, month, day) and not is_weekend(year, month, day):
-            if b_keine_feiertagsstunden:
-                continue
-            if worker_type == WorkerTypes.Fest:
-                hours += weekly_hours / 5.0
-            else:
-                hours += calculate_skug(year, month, day, weekly_hours, skug_settings)
+    if b_keine_feiertagsstunden:
+        return hours
+    # Holidays on Monday to Friday
+    for day in WorkCalendar.for_year(year).feiertage[month]:
+        if worker_type == WorkerTypes.Fest:
+            hours += weekly_hours / 5.0
+        else:
+            hours += calculate_skug(year, month, day, weekly_hours, skug_settings)
 
     return hours
 
@@ -687,17 +528,17 @@ def handle_krank_urlaub(
 ):
     db.clear_entries_for_day(jahr_int, monat_int, day, name)
     wochentag = get_weekday_abbr(jahr_int, monat_int, str(day)) or ""
-    final_urlaub_val = ""
-    final_krank_val = ""
+    final_urlaub_val = None
+    final_krank_val = None
     kostenstelle = ""
 
     if input_krank:
         krank_value = calculate_skug(jahr_int, monat_int, day, 0, skug_settings)
-        final_krank_val = str(krank_value) if krank_value != 0.0 else ""
+        final_krank_val = krank_value if krank_value != 0.0 else None
         kostenstelle = "Krank"
     elif input_urlaub:
         urlaub_value = calculate_skug(jahr_int, monat_int, day, 0, skug_settings)
-        final_urlaub_val = str(urlaub_value) if urlaub_value != 0.0 else ""
+        final_urlaub_val = urlaub_value if urlaub_value != 0.0 else None
         worker_type = master_db.get_worker_type_by_name(name) or WorkerTypes.Fest
         kostenstelle = "900" if worker_type == WorkerTypes.Fest else "940"
 
@@ -711,7 +552,7 @@ def handle_krank_urlaub(
         "urlaub": final_urlaub_val,
         "krank": final_krank_val,
         "kg_8h": None,
-        "skug": "",
+        "skug": None,
         "kostenstelle": kostenstelle,
         "fruehstueck": False,
         "mittag": False,
@@ -754,8 +595,7 @@ def try_load_existing_entry(
             entry_data = dict(match)
         else:
             for e in existing_entries:
-                kostenstelle = e.get("kostenstelle", None)
-                if kostenstelle in ["Krank", "940", "900"]:
+                if e.get("entry_kind") != EntryKind.Work:
                     db.delete_arbeitsstunden(e["id"])
             target_entry_id = None
             entry_data = {}
@@ -775,9 +615,8 @@ def determine_kg_8h_flag(
     highest_fahrzeit = 0.0
     for e in day_entries:
         h = float(e.get("stunden") or 0.0)
-        bst_name = e.get("kostenstelle")
-        if bst_name:
-            bst_nummer = bst_name.split("-")[0].strip() if "-" in bst_name else bst_name
+        bst_nummer = e.get("baustelle_nummer")
+        if bst_nummer:
             bst_data = master_db.get_baustelle_by_nummer(bst_nummer)
             if bst_data:
                 worker_id = master_db.get_worker_id_by_name(name)
@@ -0,0 +1,137 @@
+"""
+Per-day calendar facts of a year (weekday, weekend, SH holiday, season and
+SKUG target hours), computed once and then answered by array lookups.
+"""
+
+import calendar
+from array import array
+from datetime import date
+from functools import lru_cache
+from itertools import repeat
+
+import holidays
+
+# Initialize German holidays
+german_holidays = holidays.country_holidays("DE", subdiv="SH")
+
+WINTER_MONTHS = (12, 1, 2, 3)
+WEEKDAY_KEYS = ("monday", "tuesday", "wednesday", "thursday", "friday")
+SETTING_KEYS = tuple(
+    f"{season}_{weekday}"
+    for season in ("winter", "summer")
+    for weekday in WEEKDAY_KEYS
+)
+DEFAULT_TARGET_HOURS = 8.0
+_MISSING = object()
+
+
+def settings_version(skug_settings) -> tuple:
+    """
+    Key of the SKUG settings a calendar's target hours were built from.
+    Two settings dicts with the same target hours share their calendars.
+    """
+    if not skug_settings:
+        return ()
+    return tuple(map(skug_settings.get, SETTING_KEYS, repeat(_MISSING)))
+
+
+class WorkCalendar:
+    """
+    Calendar of one year as flat per-day arrays, indexed by day of the year
+    (0 = 1 January, see day_index).
+
+    weekday     0 = Monday ... 6 = Sunday
+    weekend     1 for Saturday and Sunday
+    holiday     1 for SH holidays (also when they fall on a weekend)
+    winter      1 for the SKUG winter months (December to March)
+    target      SKUG target hours (0.0 on weekends, NaN if the setting is
+                missing) as calculate_skug reads them
+    normal      target hours with the 8.0 default of get_normal_hours_per_month
+    setting_key SKUG settings key of the day ("winter_monday", None on weekends)
+
+    Use WorkCalendar.for_year(); calendars are shared and must not be changed.
+    """
+
+    def __init__(self, year: int, version: tuple = ()):
+        self.year = year
+        self.version = version
+        settings = {
+            key: value
+            for key, value in zip(SETTING_KEYS, version)
+            if value is not _MISSING
+        }
+
+        # month_start[m] is the day index of the 1st of month m
+        self.month_start = array("H", [0] * 14)
+        self.month_days = array("B", [0] * 13)
+        for month in range(1, 13):
+            self.month_days[month] = calendar.monthrange(year, month)[1]
+            self.month_start[month + 1] = (
+                self.month_start[month] + self.month_days[month]
+            )
+        num_days = self.month_start[13]
+
+        self.weekday = array("B", bytes(num_days))
+        self.weekday_abbr = [None] * num_days
+        self.setting_key = [None] * num_days
+        self.weekend = bytearray(num_days)
+        self.holiday = bytearray(num_days)
+        self.winter = bytearray(num_days)
+        self.target = array("d", bytes(8 * num_days))
+        self.normal = array("d", bytes(8 * num_days))
+        # Per month: workdays and holidays that are not on a weekend
+        self.workdays = [[] for _ in range(13)]
+        self.feiertage = [[] for _ in range(13)]
+        self.normal_hours = array("d", bytes(8 * 13))
+
+        for month in range(1, 13):
+            season = "winter" if month in WINTER_MONTHS else "summer"
+            total_hours = 0.0
+            for day in range(1, self.month_days[month] + 1):
+                index = self.month_start[month] + day - 1
+                current = date(year, month, day)
+                weekday = current.weekday()
+                self.weekday[index] = weekday
+                self.weekday_abbr[index] = current.strftime("%a")
+                self.weekend[index] = weekday >= 5
+                self.holiday[index] = current in german_holidays
+                self.winter[index] = month in WINTER_MONTHS
+                if weekday >= 5:
+                    continue
+
+                key = f"{season}_{WEEKDAY_KEYS[weekday]}"
+                self.setting_key[index] = key
+                self.target[index] = (
+                    float(settings[key]) if key in settings else float("nan")
+                )
+                self.normal[index] = float(
+                    settings.get(key, DEFAULT_TARGET_HOURS)
+                )
+                total_hours += self.normal[index]
+                self.workdays[month].append(day)
+                if self.holiday[index]:
+                    self.feiertage[month].append(day)
+            self.normal_hours[month] = round(total_hours, 2)
+
+    @staticmethod
+    def for_year(year, skug_settings=None) -> "WorkCalendar":
+        """Shared calendar of a year for the given SKUG settings."""
+        return _calendar_for(int(year), settings_version(skug_settings))
+
+    def day_index(self, month, day) -> int:
+        """Index of a date into the per-day arrays; ValueError if invalid."""
+        month = int(month)
+        day = int(day)
+        if not 1 <= month <= 12 or not 1 <= day <= self.month_days[month]:
+            raise ValueError(f"Invalid date: {self.year}-{month}-{day}")
+        return self.month_start[month] + day - 1
+
+    def month_slice(self, month) -> slice:
+        """Slice of the per-day arrays covering a month."""
+        month = int(month)
+        return slice(self.month_start[month], self.month_start[month + 1])
+
+
+@lru_cache(maxsize=64)
+def _calendar_for(year: int, version: tuple) -> WorkCalendar:
+    return WorkCalendar(year, version)
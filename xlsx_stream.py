@@ -0,0 +1,252 @@
+"""
+Streaming backend for the Excel export.
+
+The layout functions in excel_export draw a month into a SheetBuffer instead
+of an openpyxl Worksheet. The buffer only keeps values and references to the
+style objects per cell, so drawing (and redrawing borders) never touches the
+workbook's style tables. SheetBuffer.write_to() then appends the rows in
+order to a write-only workbook. Every distinct combination of font, fill,
+border, alignment and number format is registered with the workbook once and
+its style ID reused for all cells that have it.
+
+Only one month is held in memory at a time; finished sheets are streamed to
+the temporary files of the write-only workbook.
+"""
+
+from openpyxl.cell.cell import Cell
+from openpyxl.descriptors.serialisable import Serialisable
+from openpyxl.styles import Alignment, Border, Font, PatternFill
+from openpyxl.worksheet.cell_range import CellRange
+
+DEFAULT_FONT = Font()
+DEFAULT_FILL = PatternFill()
+DEFAULT_BORDER = Border()
+DEFAULT_ALIGNMENT = Alignment()
+DEFAULT_NUMBER_FORMAT = "General"
+
+
+class BufferedCell:
+    """Value and style objects of one cell in a SheetBuffer."""
+
+    __slots__ = (
+        "row",
+        "column",
+        "value",
+        "font",
+        "fill",
+        "border",
+        "alignment",
+        "number_format",
+    )
+
+    def __init__(self, row, column):
+        self.row = row
+        self.column = column
+        self.value = None
+        self.font = DEFAULT_FONT
+        self.fill = DEFAULT_FILL
+        self.border = DEFAULT_BORDER
+        self.alignment = DEFAULT_ALIGNMENT
+        self.number_format = DEFAULT_NUMBER_FORMAT
+
+    def style_key(self):
+        return (
+            self.font,
+            self.fill,
+            self.border,
+            self.alignment,
+            self.number_format,
+        )
+
+    def is_empty(self):
+        return self.value is None and all(
+            value is default
+            for value, default in zip(self.style_key(), DEFAULT_STYLE_KEY)
+        )
+
+
+DEFAULT_STYLE_KEY = (
+    DEFAULT_FONT,
+    DEFAULT_FILL,
+    DEFAULT_BORDER,
+    DEFAULT_ALIGNMENT,
+    DEFAULT_NUMBER_FORMAT,
+)
+
+
+class ColumnDimension:
+    __slots__ = ("width",)
+
+    def __init__(self):
+        self.width = None
+
+
+class ColumnDimensions(dict):
+    def __missing__(self, key):
+        dimension = self[key] = ColumnDimension()
+        return dimension
+
+
+class SheetBuffer:
+    """
+    Stand-in for the part of the openpyxl Worksheet API the export layout
+    uses: cell(), iter_rows(), merge_cells(), column_dimensions and title.
+    Merging copies the edge borders of the top left cell onto the merged
+    cells like openpyxl does, so the written sheet looks the same.
+    """
+
+    def __init__(self, title="Sheet"):
+        self.title = title
+        self._cells = {}
+        self.merged_ranges = []
+        self.column_dimensions = ColumnDimensions()
+        self.max_row = 0
+        self.max_column = 0
+
+    def cell(self, row, column):
+        cell = self._cells.get((row, column))
+        if cell is None:
+            cell = self._cells[(row, column)] = BufferedCell(row, column)
+            if row > self.max_row:
+                self.max_row = row
+            if column > self.max_column:
+                self.max_column = column
+        return cell
+
+    def iter_rows(self, min_row, max_row, min_col, max_col):
+        for row in range(min_row, max_row + 1):
+            yield tuple(
+                self.cell(row, column) for column in range(min_col, max_col + 1)
+            )
+
+    def iter_cells(self):
+        """The cells that have a value or a style, in no particular order."""
+        return (cell for cell in self._cells.values() if not cell.is_empty())
+
+    def merge_cells(self, start_row, start_column, end_row, end_column):
+        self.merged_ranges.append((start_row, start_column, end_row, end_column))
+        start_cell = self.cell(start_row, start_column)
+        end_cell = self._cells.get((end_row, end_column))
+        if end_cell is not None and end_cell is not start_cell:
+            start_cell.border = start_cell.border + Border(
+                right=end_cell.border.right, bottom=end_cell.border.bottom
+            )
+
+        # All but the top left cell lose their content
+        for row in range(start_row, end_row + 1):
+            for column in range(start_column, end_column + 1):
+                if (row, column) != (start_row, start_column):
+                    self._cells[(row, column)] = BufferedCell(row, column)
+                    self.max_row = max(self.max_row, row)
+                    self.max_column = max(self.max_column, column)
+
+        # The cells on the edges get the border of the top left cell
+        edges = {
+            "top": [(start_row, c) for c in range(start_column, end_column + 1)],
+            "left": [(r, start_column) for r in range(start_row, end_row + 1)],
+            "right": [(r, end_column) for r in range(start_row, end_row + 1)],
+            "bottom": [(end_row, c) for c in range(start_column, end_column + 1)],
+        }
+        for name, coords in edges.items():
+            side = getattr(start_cell.border, name)
+            if side and side.style is None:
+                continue
+            border = Border(**{name: side})
+            for coord in coords:
+                cell = self._cells[coord]
+                cell.border = cell.border + border
+
+    def write_to(self, workbook, styles=None):
+        """
+        Append this sheet to a write-only workbook. styles maps style keys
+        to style IDs of the workbook; pass the same dict for all sheets of a
+        workbook.
+        """
+        if styles is None:
+            styles = {}
+        ws = workbook.create_sheet(title=self.title)
+        for key, dimension in self.column_dimensions.items():
+            if dimension.width is not None:
+                ws.column_dimensions[key].width = dimension.width
+        for start_row, start_column, end_row, end_column in self.merged_ranges:
+            ws.merged_cells.add(
+                CellRange(
+                    min_row=start_row,
+                    min_col=start_column,
+                    max_row=end_row,
+                    max_col=end_column,
+                )
+            )
+
+        # Style IDs and frozen style objects by id(); only valid as long as
+        # the cells of this buffer are alive
+        known = {}
+        rows = {}
+        for (row, column), cell in self._cells.items():
+            if not cell.is_empty():
+                rows.setdefault(row, []).append(cell)
+
+        for row in range(1, self.max_row + 1):
+            line = [None] * self.max_column
+            for cell in rows.get(row, ()):
+                line[cell.column - 1] = Cell(
+                    ws,
+                    row=row,
+                    column=cell.column,
+                    value=cell.value,
+                    style_array=_style_id(ws, styles, known, cell),
+                )
+            ws.append(line)
+        return ws
+
+
+_FIELDS = {}
+
+
+def _freeze(value, known):
+    """
+    Plain hashable tuple of a style object (its own __hash__ is slow).
+    known caches the tuples of the (nested) objects by id().
+    """
+    frozen = known.get(id(value))
+    if frozen is not None:
+        return frozen
+    cls = type(value)
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        if not issubclass(cls, Serialisable):
+            if cls is list:
+                return tuple(_freeze(item, known) for item in value)
+            return value
+        fields = _FIELDS[cls] = cls.__attrs__ + cls.__elements__
+    frozen = known[id(value)] = (cls,) + tuple(
+        [_freeze(getattr(value, name), known) for name in fields]
+    )
+    return frozen
+
+
+def _style_id(ws, styles, known, cell):
+    """Style array of the cell's style, registered once per workbook."""
+    style_objects = cell.style_key()
+    ids = tuple(map(id, style_objects))
+    style = known.get(ids)
+    if style is not None:
+        return style
+
+    key = tuple(_freeze(value, known) for value in style_objects)
+    style = styles.get(key)
+    if style is None:
+        template = Cell(ws)
+        if cell.font is not DEFAULT_FONT:
+            template.font = cell.font
+        if cell.fill is not DEFAULT_FILL:
+            template.fill = cell.fill
+        if cell.border is not DEFAULT_BORDER:
+            template.border = cell.border
+        if cell.alignment is not DEFAULT_ALIGNMENT:
+            template.alignment = cell.alignment
+        if cell.number_format != DEFAULT_NUMBER_FORMAT:
+            template.number_format = cell.number_format
+        style = styles[key] = template._style
+    known[ids] = style
+    return style